@@ -0,0 +1,119 @@
+"""
+Local stand-in for crt.sh for benchmarks: serves synthetic certificate JSON.
+
+    GET /?q=%25.<domain>&output=json[&rows=N]
+
+returns a JSON array of N rows (default --rows) streamed with chunked transfer
+encoding, gzip-compressed unless --no-gzip. Each row names `--names-per-row` hosts
+under <domain> (h<i>.<domain>, plus wildcard and duplicate names the way real CT
+data has them). `?status=503` answers with that status, to exercise retries.
+
+    python benchmarks/fake_crtsh.py --port 8765 --rows 5000
+    RECON_CT_URL='http://127.0.0.1:8765/?q=%25.{domain}&output=json&rows=20000' recon run ...
+"""
+from __future__ import annotations
+
+import argparse
+import http.server
+import json
+import time
+import zlib
+from urllib.parse import parse_qs, urlparse
+
+ISSUER = "C=US, O=Bench CA, CN=Bench Issuing CA R1"
+
+
+def rows(domain: str, n: int, names_per_row: int):
+    for i in range(n):
+        names = [f"h{i}.{domain}"]
+        for k in range(1, names_per_row):
+            # wildcards and hosts repeated across certificates, as in real CT logs
+            names.append(f"*.w{(i + k) % 50}.{domain}" if k % 2 else f"h{(i * 7 + k) % n}.{domain}")
+        yield {
+            "issuer_ca_id": 1,
+            "issuer_name": ISSUER,
+            "common_name": names[0],
+            "name_value": "\n".join(names),
+            "id": i + 1,
+            "entry_timestamp": "2025-01-01T00:00:00.000",
+            "not_before": "2025-01-01T00:00:00",
+            "not_after": "2025-04-01T00:00:00",
+            "serial_number": f"{i:032x}",
+        }
+
+
+def make_handler(default_rows: int, names_per_row: int, gzip: bool, delay: float):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _chunk(self, data: bytes) -> None:
+            if data:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            status = int(params.get("status", ["200"])[0])
+            if status != 200:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            domain = params.get("q", ["%.example.test"])[0].lstrip("%").lstrip(".")
+            n = int(params.get("rows", [default_rows])[0])
+            if delay:
+                time.sleep(delay)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+            encode = z.compress if z else (lambda b: b)
+            buf = [b"["]
+            size = 1
+            for i, row in enumerate(rows(domain, n, names_per_row)):
+                piece = (b"," if i else b"") + json.dumps(row).encode()
+                buf.append(piece)
+                size += len(piece)
+                if size >= 64 * 1024:
+                    self._chunk(encode(b"".join(buf)))
+                    buf, size = [], 0
+            buf.append(b"]")
+            self._chunk(encode(b"".join(buf)))
+            if z:
+                self._chunk(z.flush())
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+class Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients dropping keep-alive connections is normal here
+        pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--rows", type=int, default=1000, help="rows per domain unless ?rows= is given")
+    ap.add_argument("--names-per-row", type=int, default=3)
+    ap.add_argument("--delay", type=float, default=0.0, help="seconds before each response starts")
+    ap.add_argument("--no-gzip", dest="gzip", action="store_false")
+    args = ap.parse_args()
+    handler = make_handler(args.rows, args.names_per_row, args.gzip, args.delay)
+    server = Server((args.host, args.port), handler)
+    print(f"fake crt.sh on http://{args.host}:{args.port}/ ({args.rows} rows/domain)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
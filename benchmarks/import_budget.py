@@ -0,0 +1,152 @@
+"""
+Import-time budget for the CLI: `recon diff`, `recon query`, `recon monitor-ctl` and
+`--help` must not pay for the run stack. Runs `python -X importtime` on the entry
+points (diff and query over two small fixture runs, so their output paths run too)
+and fails (exit 1) when
+
+  - a heavy dependency is imported (requests, dnspython, jinja2, yaml, rich, the CT/DNS
+    modules, render), with the import chain that pulled it in, or
+  - importing recon_pilot.cli takes longer than --budget-ms (median of --repeat runs)
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 80 --repeat 9 -v
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+
+# top-level packages / modules that only `recon run` (and merge, monitor) may load
+HEAVY = (
+    "requests", "urllib3", "dns", "jinja2", "yaml", "rich", "tldextract", "zstandard",
+    "recon_pilot.render", "recon_pilot.scope", "recon_pilot.rules_loader", "recon_pilot.reference",
+    "recon_pilot.modules.ct", "recon_pilot.modules.ct_index", "recon_pilot.modules.ct_scheduler",
+    "recon_pilot.modules.ct_sources", "recon_pilot.modules.dns", "recon_pilot.modules.dns_async",
+    "recon_pilot.modules.dns_adaptive", "recon_pilot.modules.dns_cache", "recon_pilot.modules.dns_pool",
+)
+
+# (label, python args) of what is checked; the CLI ones run a real command
+PROBES = (
+    ("import recon_pilot.cli", ["-c", "import recon_pilot.cli"]),
+    ("recon diff", ["-m", "recon_pilot.cli", "diff", "--a", "{tmp}/runs/run-a", "--b", "{tmp}/runs/run-b",
+                    "--out", "{tmp}/diff.md"]),
+    ("recon query", ["-m", "recon_pilot.cli", "query", "--out", "{tmp}/runs"]),
+    ("recon query --host", ["-m", "recon_pilot.cli", "query", "--out", "{tmp}/runs", "--host", "www.example.test"]),
+    ("recon monitor-ctl", ["-m", "recon_pilot.cli", "monitor-ctl", "status", "--socket", "{tmp}/none.sock"]),
+)
+
+# two runs a day apart: one host gone, one new, one with changed records
+FIXTURE_RUNS = {
+    "run-a": {"www.example.test": ["192.0.2.1"], "mail.example.test": ["192.0.2.2"], "old.example.test": ["192.0.2.3"]},
+    "run-b": {"www.example.test": ["192.0.2.10"], "mail.example.test": ["192.0.2.2"], "new.example.test": ["192.0.2.4"]},
+}
+
+Line = Tuple[int, int, str]  # (depth, cumulative µs, module)
+
+
+def _fixtures(tmp: str) -> None:
+    """Write FIXTURE_RUNS as run directories under tmp/runs (the artifacts diff and query read)."""
+    sys.path.insert(0, str(ROOT))
+    from recon_pilot.utils import write_artifact
+
+    for name, hosts in FIXTURE_RUNS.items():
+        artifacts = Path(tmp) / "runs" / name / "artifacts"
+        write_artifact(artifacts, "inventory_hosts", sorted(hosts))
+        write_artifact(artifacts, "dns_records", [{"host": h, "records": {"A": a}} for h, a in sorted(hosts.items())])
+
+
+def _importtime(args: List[str], tmp: str) -> List[Line]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *[a.replace("{tmp}", tmp) for a in args]],
+        cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    lines: List[Line] = []
+    for raw in proc.stderr.splitlines():
+        if not raw.startswith("import time:") or "|" not in raw:
+            continue
+        _, cumulative, name = raw.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header
+        lines.append(((len(name) - len(name.lstrip())) // 2, int(cumulative), name.strip()))
+    return lines
+
+
+def _heavy(name: str) -> bool:
+    return any(name == h or name.startswith(h + ".") for h in HEAVY)
+
+
+def _chain(lines: List[Line], i: int) -> List[str]:
+    """Who imported lines[i]: children are printed before their parent, one level shallower."""
+    chain = [lines[i][2]]
+    depth = lines[i][0]
+    for d, _, name in lines[i + 1:]:
+        if d < depth:
+            chain.append(name)
+            depth = d
+    return chain
+
+
+def check(lines: List[Line]) -> List[str]:
+    problems = []
+    reported = set()
+    for i, (_, _, name) in enumerate(lines):
+        if not _heavy(name):
+            continue
+        chain = _chain(lines, i)
+        # report the outermost heavy module of each chain once
+        top = [m for m in chain if _heavy(m)][-1]
+        if top not in reported:
+            reported.add(top)
+            problems.append(" <- ".join(chain[chain.index(top):]))
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("RECON_IMPORT_BUDGET_MS", "150")),
+                    help="max median time to import recon_pilot.cli")
+    ap.add_argument("--repeat", type=int, default=5, help="imports timed; the median is compared")
+    ap.add_argument("-v", "--verbose", action="store_true", help="list the slowest imports")
+    args = ap.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="recon-import-") as tmp:
+        _fixtures(tmp)
+        for label, probe in PROBES:
+            problems = check(_importtime(probe, tmp))
+            for p in problems:
+                print(f"FAIL {label}: imports {p}")
+            failed |= bool(problems)
+            if not problems:
+                print(f"ok   {label}: no heavy imports")
+
+        times: List[float] = []
+        slowest: Dict[str, int] = {}
+        for _ in range(max(args.repeat, 1)):
+            lines = _importtime(PROBES[0][1], tmp)
+            total = next((us for d, us, name in lines if name == "recon_pilot.cli"), 0)
+            times.append(total / 1000)
+            for d, us, name in lines:
+                slowest[name] = max(slowest.get(name, 0), us)
+    median = statistics.median(times)
+    verdict = "ok  " if median <= args.budget_ms else "FAIL"
+    print(f"{verdict} import recon_pilot.cli: {median:.1f} ms median (budget {args.budget_ms:g} ms)")
+    failed |= median > args.budget_ms
+    if args.verbose:
+        for name, us in sorted(slowest.items(), key=lambda kv: -kv[1])[:15]:
+            print(f"     {us / 1000:8.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
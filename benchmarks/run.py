@@ -0,0 +1,204 @@
+"""
+End-to-end benchmark: starts the stub DNS server and fake crt.sh, then drives
+`recon run` over a matrix of worker counts and scope sizes and reports hosts/s,
+per-host DNS latency (p50/p99) and peak memory, read from each run's metrics.json.
+
+    python benchmarks/run.py                                    # default matrix
+    python benchmarks/run.py --workers 1,20,100 --sizes 1000,10000 --latency-ms 20
+    python benchmarks/run.py --mode async --workers 100,500 --save bench.json
+    python benchmarks/run.py --compare bench.json               # exit 1 on a regression
+
+Nothing leaves the machine: DNS goes to 127.0.0.1:<port>, CT to the local stand-in.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_tcp(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"nothing listening on 127.0.0.1:{port}")
+
+
+def _start(args: List[str], port: int) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, *args], stdout=subprocess.DEVNULL)
+    _wait_tcp(port)
+    return proc
+
+
+def _scope(path: Path, domains: List[str], dns_port: int) -> None:
+    lines = ["org: Bench", "domains:"] + [f"  - {d}" for d in domains]
+    lines += ["resolvers:", f"  - 127.0.0.1:{dns_port}", "seeds:", "  hosts: []"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _metric(snapshot: dict, kind: str, name: str) -> List[dict]:
+    return snapshot.get(kind, {}).get(name, [])
+
+
+def run_case(
+    workdir: Path, mode: str, workers: int, size: int, domains: int,
+    dns_port: int, ct_port: int, extra: List[str],
+) -> dict:
+    """One `recon run`; returns its numbers."""
+    case = workdir / f"{mode}-w{workers}-n{size}"
+    case.mkdir(parents=True, exist_ok=True)
+    scope = case / "scope.yaml"
+    _scope(scope, [f"d{i}.bench.test" for i in range(domains)], dns_port)
+    cmd = [sys.executable, "-m", "recon_pilot.cli", "run", "--scope", str(scope), "--out", str(case / "runs"),
+           "--no-history", "--no-journal", "--ct-rps", "1000", "--ct-workers", str(min(domains, 8))]
+    if mode == "async":
+        cmd += ["--dns-async", "--dns-concurrency", str(workers)]
+    else:
+        cmd += ["--dns-workers", str(workers)]
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        RECON_CACHE_DIR=str(case / "cache"),
+        RECON_CT_URL=f"http://127.0.0.1:{ct_port}/?q=%25.{{domain}}&output=json&rows={size}",
+    )
+    started = time.perf_counter()
+    proc = subprocess.run(cmd + extra, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"recon run failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+
+    metrics_path = next((case / "runs").glob("run-*/artifacts/metrics.json"))
+    m = json.loads(metrics_path.read_text(encoding="utf-8"))
+    gauges = {name: gs[0]["value"] for name, gs in m.get("gauges", {}).items() if gs}
+    host_lat = (_metric(m, "histograms", "dns_host_seconds") or [{}])[0]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "size": size * domains,
+        "hosts": gauges.get("hosts_total", 0),
+        "hosts_per_s": gauges.get("hosts_per_second", 0.0),
+        "host_p50_ms": round((host_lat.get("p50") or 0) * 1000, 1),
+        "host_p99_ms": round((host_lat.get("p99") or 0) * 1000, 1),
+        "dns_s": m.get("phases", {}).get("dns", {}).get("wall_s"),
+        "wall_s": round(wall, 2),
+        "peak_rss_mb": round(gauges.get("peak_rss_bytes", 0) / 2**20, 1),
+    }
+
+
+def _median(results: List[dict]) -> dict:
+    """Median of each number over repeats of one case."""
+    out = dict(results[0])
+    for k, v in results[0].items():
+        if isinstance(v, (int, float)) and k not in ("workers", "size", "hosts"):
+            out[k] = round(statistics.median(r[k] for r in results), 3)
+    return out
+
+
+def _table(rows: List[dict]) -> str:
+    cols = ["mode", "workers", "size", "hosts", "hosts_per_s", "host_p50_ms", "host_p99_ms", "dns_s", "wall_s", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r.get(c))) for r in rows)) for c in cols}
+    lines = ["  ".join(c.rjust(widths[c]) for c in cols)]
+    lines += ["  ".join(str(r.get(c)).rjust(widths[c]) for c in cols) for r in rows]
+    return "\n".join(lines)
+
+
+def compare(rows: List[dict], baseline_path: Path, tolerance: float) -> List[str]:
+    """Cases whose hosts/s dropped, or peak RSS grew, by more than `tolerance` vs the baseline."""
+    baseline = {(b["mode"], b["workers"], b["size"]): b for b in json.loads(baseline_path.read_text())["results"]}
+    problems = []
+    for r in rows:
+        b = baseline.get((r["mode"], r["workers"], r["size"]))
+        if b is None:
+            continue
+        case = f"{r['mode']} workers={r['workers']} size={r['size']}"
+        if b["hosts_per_s"] and r["hosts_per_s"] < b["hosts_per_s"] * (1 - tolerance):
+            problems.append(f"{case}: {r['hosts_per_s']} hosts/s vs {b['hosts_per_s']} baseline")
+        if b["peak_rss_mb"] and r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{case}: {r['peak_rss_mb']} MB peak RSS vs {b['peak_rss_mb']} baseline")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=("threads", "async"), default="threads",
+                    help="threads: --dns-workers N; async: --dns-async --dns-concurrency N")
+    ap.add_argument("--workers", default="1,20,50", help="comma-separated worker counts (or async concurrency)")
+    ap.add_argument("--sizes", default="500,2000", help="comma-separated CT rows per scope domain")
+    ap.add_argument("--domains", type=int, default=1, help="scope domains per run")
+    ap.add_argument("--repeat", type=int, default=1, help="runs per case; the median is reported")
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="stub DNS latency per answer")
+    ap.add_argument("--jitter-ms", type=float, default=2.0)
+    ap.add_argument("--loss", type=float, default=0.0, help="share of UDP queries the stub drops")
+    ap.add_argument("--nxdomain", type=float, default=0.3)
+    ap.add_argument("--save", type=Path, help="write results as JSON (usable as a --compare baseline)")
+    ap.add_argument("--compare", type=Path, help="baseline JSON from --save; exit 1 on a regression")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown / memory growth vs baseline")
+    ap.add_argument("--keep", action="store_true", help="keep the run directories")
+    ap.add_argument("recon_args", nargs="*", help="extra `recon run` flags, after --")
+    args = ap.parse_args(argv)
+
+    dns_port, ct_port = _free_port(), _free_port()
+    servers = [
+        subprocess.Popen([
+            sys.executable, str(HERE / "stub_dns.py"), "--port", str(dns_port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--loss", str(args.loss), "--nxdomain", str(args.nxdomain), "--wildcard", "w0.d0.bench.test",
+        ], stdout=subprocess.DEVNULL),
+        _start([str(HERE / "fake_crtsh.py"), "--port", str(ct_port)], ct_port),
+    ]
+    _wait_tcp(dns_port)
+    workdir = Path(tempfile.mkdtemp(prefix="recon-bench-"))
+    rows: List[dict] = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            for workers in (int(w) for w in args.workers.split(",")):
+                results = [
+                    run_case(workdir / f"r{i}", args.mode, workers, size, args.domains, dns_port, ct_port, args.recon_args)
+                    for i in range(args.repeat)
+                ]
+                rows.append(_median(results))
+                print(f"  {args.mode} workers={workers} size={size}: {rows[-1]['hosts_per_s']} hosts/s", file=sys.stderr)
+    finally:
+        for p in servers:
+            p.terminate()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"run directories kept in {workdir}", file=sys.stderr)
+
+    print(_table(rows))
+    settings: Dict[str, object] = {k: getattr(args, k) for k in ("mode", "domains", "latency_ms", "jitter_ms", "loss", "nxdomain")}
+    if args.save:
+        args.save.write_text(json.dumps({"settings": settings, "results": rows}, indent=2), encoding="utf-8")
+    if args.compare:
+        problems = compare(rows, args.compare, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
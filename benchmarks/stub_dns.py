@@ -0,0 +1,190 @@
+"""
+Local stub DNS server for benchmarks (UDP and TCP on the same port).
+
+Every name answers deterministically from a hash of the name, so runs are repeatable:
+
+  apex of a zone        MX, NS, TXT (and A)
+  under --wildcard Z    A 10.99.0.1 for any name below Z (a wildcard zone)
+  other names           NXDOMAIN for a `--nxdomain` share of them, CNAME to a CDN
+                        name for a `--cname` share, else A (+ AAAA for every other name)
+
+Latency is added per query (--latency-ms, ± --jitter-ms) without holding a thread,
+and a `--loss` share of UDP queries is dropped to exercise timeouts and retries.
+
+    python benchmarks/stub_dns.py --port 5353 --latency-ms 20 --loss 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import random
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+TTL = 300
+NEGATIVE_TTL = 60
+CDN_TARGET = "edge.bench-cdn.net."
+WILDCARD_A = "10.99.0.1"
+
+
+class Zone:
+    def __init__(self, nxdomain: float, cname: float, wildcards):
+        self.nxdomain = nxdomain
+        self.cname = cname
+        self.wildcards = [w.lower().strip(".") + "." for w in wildcards]
+
+    def _apex(self, name: str) -> str:
+        labels = name.rstrip(".").split(".")
+        return ".".join(labels[-2:]) + "."
+
+    def answer(self, query: dns.message.Message) -> dns.message.Message:
+        r = dns.message.make_response(query)
+        r.flags |= dns.flags.RA
+        q = query.question[0]
+        name = q.name.to_text().lower()
+        rtype = dns.rdatatype.to_text(q.rdtype)
+        apex = self._apex(name)
+        h = zlib.crc32(name.encode())
+
+        def add(rt: str, *values: str, ttl: int = TTL) -> None:
+            r.answer.append(dns.rrset.from_text(name, ttl, "IN", rt, *values))
+
+        if any(name.endswith("." + w) for w in self.wildcards):
+            if rtype == "A":
+                add("A", WILDCARD_A, ttl=60)
+            return r
+        if name == apex:
+            values = {
+                "A": [f"10.0.{h % 250}.1"],
+                "MX": [f"10 mail.{apex}"],
+                "NS": [f"ns1.{apex}", f"ns2.{apex}"],
+                "TXT": ['"v=spf1 -all"'],
+            }.get(rtype)
+            if values:
+                add(rtype, *values)
+            return r
+        if (h % 1000) < self.nxdomain * 1000:
+            r.set_rcode(dns.rcode.NXDOMAIN)
+            r.authority.append(dns.rrset.from_text(
+                apex, NEGATIVE_TTL, "IN", "SOA", f"ns1.{apex} hostmaster.{apex} 1 3600 600 86400 {NEGATIVE_TTL}",
+            ))
+            return r
+        if ((h >> 10) % 1000) < self.cname * 1000:
+            add("CNAME", CDN_TARGET)
+            return r
+        if rtype == "A":
+            add("A", f"10.{(h >> 8) % 250}.{(h >> 16) % 250}.{h % 250}")
+        elif rtype == "AAAA" and h % 2:
+            add("AAAA", f"fd00::{h % 65535:x}")
+        return r
+
+
+class Delayer(threading.Thread):
+    """Sends replies once their due time has come (one thread, a heap of deadlines)."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._heap = []
+        self._cv = threading.Condition()
+        self._seq = 0
+
+    def later(self, due: float, fn) -> None:
+        with self._cv:
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, fn))
+            self._cv.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cv.wait(None if not self._heap else self._heap[0][0] - time.monotonic())
+                _, _, fn = heapq.heappop(self._heap)
+            try:
+                fn()
+            except OSError:
+                pass
+
+
+def serve(host: str, port: int, zone: Zone, latency: float, jitter: float, loss: float) -> None:
+    delayer = Delayer()
+    delayer.start()
+    rng = random.Random(port)
+    stats = {"udp": 0, "tcp": 0, "dropped": 0}
+
+    def _delay() -> float:
+        return max(0.0, latency + rng.uniform(-jitter, jitter))
+
+    class TCPHandler(socketserver.BaseRequestHandler):
+        def handle(self):
+            sock = self.request
+            while True:
+                head = sock.recv(2)
+                if len(head) < 2:
+                    return
+                want = int.from_bytes(head, "big")
+                data = b""
+                while len(data) < want:
+                    chunk = sock.recv(want - len(data))
+                    if not chunk:
+                        return
+                    data += chunk
+                stats["tcp"] += 1
+                wire = zone.answer(dns.message.from_wire(data)).to_wire()
+                time.sleep(_delay())
+                sock.sendall(len(wire).to_bytes(2, "big") + wire)
+
+    class TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    tcp = TCPServer((host, port), TCPHandler)
+    threading.Thread(target=tcp.serve_forever, daemon=True).start()
+
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    udp.bind((host, port))
+    print(f"stub DNS on {host}:{port} (udp+tcp), latency {latency * 1000:.0f}ms, loss {loss:.1%}", flush=True)
+    while True:
+        data, addr = udp.recvfrom(4096)
+        stats["udp"] += 1
+        if loss and rng.random() < loss:
+            stats["dropped"] += 1
+            continue
+        try:
+            wire = zone.answer(dns.message.from_wire(data)).to_wire()
+        except Exception:
+            continue
+        delay = _delay()
+        if delay:
+            delayer.later(time.monotonic() + delay, lambda w=wire, a=addr: udp.sendto(w, a))
+        else:
+            udp.sendto(wire, addr)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5353)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every answer")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="± uniform jitter around --latency-ms")
+    ap.add_argument("--loss", type=float, default=0.0, help="share of UDP queries dropped (0..1)")
+    ap.add_argument("--nxdomain", type=float, default=0.3, help="share of names that do not exist")
+    ap.add_argument("--cname", type=float, default=0.1, help="share of existing names that are CNAMEs")
+    ap.add_argument("--wildcard", action="append", default=[], help="zone answering for any name below it")
+    args = ap.parse_args()
+    zone = Zone(args.nxdomain, args.cname, args.wildcard)
+    serve(args.host, args.port, zone, args.latency_ms / 1000, args.jitter_ms / 1000, args.loss)
+
+
+if __name__ == "__main__":
+    main()
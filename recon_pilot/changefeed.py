@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import json
+import shutil
+import tempfile
+
+from .utils import external_sort, find_artifact, iter_artifact
+
+# record types in report order; anything else follows alphabetically
+RECORD_ORDER = ("A", "AAAA", "CNAME", "MX", "TXT", "NS")
+
+Records = Dict[str, List[str]]
+
+
+def _run_lines(artifacts_dir: Path) -> Iterator[str]:
+    """
+    One sortable line per inventory host ("host\\t") and per DNS item ("host\\t{records}").
+    The tab sorts below every character of a name, so sorting the lines groups each host
+    and keeps hosts in plain string order.
+    """
+    inv = find_artifact(artifacts_dir, "inventory_hosts")
+    if inv is not None:
+        for h in iter_artifact(inv):
+            h = str(h).strip().lower()
+            if h:
+                yield h + "\t"
+    recs = find_artifact(artifacts_dir, "dns_records")
+    if recs is not None:
+        for item in iter_artifact(recs):
+            if not isinstance(item, dict) or not item.get("host"):
+                continue
+            records = {
+                rt: sorted({str(v) for v in values})
+                for rt, values in (item.get("records") or {}).items()
+                if values
+            }
+            yield str(item["host"]).strip().lower() + "\t" + json.dumps(records, sort_keys=True)
+
+
+def iter_run(artifacts_dir: Path, chunk_size: int = 200_000) -> Iterator[Tuple[str, Records]]:
+    """(host, records) for every host of a run in host order, with bounded memory."""
+    lines = external_sort(_run_lines(artifacts_dir), chunk_size=chunk_size, unique=True)
+    for host, group in groupby(lines, key=lambda s: s.split("\t", 1)[0]):
+        records: Records = {}
+        for line in group:
+            payload = line.split("\t", 1)[1]
+            if payload:
+                for rt, values in json.loads(payload).items():
+                    records.setdefault(rt, [])
+                    records[rt] = sorted(set(records[rt]) | set(values))
+        yield host, records
+
+
+def _rtypes(*records: Records) -> List[str]:
+    seen = set().union(*records)
+    return [rt for rt in RECORD_ORDER if rt in seen] + sorted(seen - set(RECORD_ORDER))
+
+
+def record_changes(old: Records, new: Records) -> Dict[str, Dict[str, List[str]]]:
+    """Per record type: values added and removed between two record sets (unchanged types omitted)."""
+    out: Dict[str, Dict[str, List[str]]] = {}
+    for rt in _rtypes(old, new):
+        a, b = set(old.get(rt, [])), set(new.get(rt, []))
+        if a != b:
+            out[rt] = {"added": sorted(b - a), "removed": sorted(a - b)}
+    return out
+
+
+def iter_changes(a_dir: Path, b_dir: Path, chunk_size: int = 200_000) -> Iterator[Dict[str, object]]:
+    """
+    Merge-join two runs' artifacts (both sides streamed in host order) and yield one
+    event per host that differs:
+      {"host", "change": "added", "records"}      host only in the newer run
+      {"host", "change": "removed", "records"}    host only in the older run
+      {"host", "change": "changed", "records": {rtype: {"added", "removed"}}}
+    """
+    a_it, b_it = iter_run(a_dir, chunk_size), iter_run(b_dir, chunk_size)
+    a, b = next(a_it, None), next(b_it, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[0] < b[0]):
+            yield {"host": a[0], "change": "removed", "records": a[1]}
+            a = next(a_it, None)
+        elif a is None or b[0] < a[0]:
+            yield {"host": b[0], "change": "added", "records": b[1]}
+            b = next(b_it, None)
+        else:
+            changes = record_changes(a[1], b[1])
+            if changes:
+                yield {"host": a[0], "change": "changed", "records": changes}
+            a, b = next(a_it, None), next(b_it, None)
+
+
+def _summary(records: Records) -> str:
+    return "; ".join(f"{rt}: {', '.join(records[rt])}" for rt in _rtypes(records))
+
+
+def write_diff(a_dir: Path, b_dir: Path, md_path: Path, json_path: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Stream the record-level diff of two runs to Markdown (and JSON). Each Markdown section
+    is spooled to a temporary file so the counts can head it without holding the events;
+    the JSON document lists the events first and the counts last. Returns the counts.
+    """
+    counts = {"added": 0, "removed": 0, "changed": 0}
+    sections = {k: tempfile.TemporaryFile("w+", encoding="utf-8") for k in counts}
+    jf = open(json_path, "w", encoding="utf-8") if json_path else None
+    try:
+        if jf:
+            jf.write('{"a": %s, "b": %s, "changes": [' % (json.dumps(str(a_dir)), json.dumps(str(b_dir))))
+        for ev in iter_changes(a_dir / "artifacts", b_dir / "artifacts"):
+            kind = ev["change"]
+            if jf:
+                jf.write(("," if any(counts.values()) else "") + "\n  " + json.dumps(ev, sort_keys=True))
+            counts[kind] += 1
+            out = sections[kind]
+            if kind == "changed":
+                out.write(f"- `{ev['host']}`\n")
+                for rt, ch in ev["records"].items():
+                    bits = [f"+ {v}" for v in ch["added"]] + [f"− {v}" for v in ch["removed"]]
+                    out.write(f"  - {rt}: {', '.join(bits)}\n")
+            else:
+                rec = _summary(ev["records"])
+                out.write(f"- `{ev['host']}`" + (f" ({rec})" if rec else "") + "\n")
+        if jf:
+            jf.write('\n], "counts": %s}\n' % json.dumps(counts))
+
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write("# ReconPilot Diff\n")
+            for kind, title in (("added", "New hosts"), ("removed", "Removed hosts"), ("changed", "Changed records")):
+                f.write(f"\n**{title}:** {counts[kind]}\n")
+                sections[kind].seek(0)
+                shutil.copyfileobj(sections[kind], f)
+    finally:
+        if jf:
+            jf.close()
+        for s in sections.values():
+            s.close()
+    return counts
@@ -1,256 +1,81 @@
 # ReconPilot CLI — verbose mode, DNS fast path (opt-in), internal-host skipping (opt-in),
-# parallel DNS workers (opt-in), and a comprehensive --help that embeds the full
-# "ReconPilot Command Reference (dev-box edition)".
+# parallel DNS workers (opt-in), asyncio DNS engine (opt-in), and a comprehensive --help that
+# embeds the full "ReconPilot Command Reference (dev-box edition)" (reference.py, loaded for --help only).
 
 from __future__ import annotations
 
 import logging
 import json
 import re
-from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import signal
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Set, Tuple, Dict, List
+from typing import TYPE_CHECKING, Optional, List
 
 import typer
-from rich.console import Console
-
-from .scope import Scope
-from .modules.ct import fetch_ct_domains
-from .modules.dns import query_dns
-from .render import render_casefile, write_casefile_html
-from .rules_loader import load_rules
-from .utils import write_json, read_json
-
-
-APP_HELP = """\
-ReconPilot Command Reference (dev-box edition)
-
-Run from the repo root and use `./recon` in all examples below. Only if you explicitly
-make it global (see the end of this help) can you omit the `./` prefix.
-
-──────────────────────────────── Core ────────────────────────────────
-• Health check
-  ./recon doctor
-
-• Run (interactive prompts)
-  ./recon run -i --out runs --tag normal
-
-• Run (from a scope file)
-  ./recon run --scope scope.yaml --out runs --tag LABEL
-
-• Diff two runs
-  ./recon diff --a runs/run-OLD --b runs/run-NEW --out runs/diff.md
-
-──────────────────── New Opt-In Flags (Speed & Visibility) ────────────────────
-• Verbose progress
-  -v / --verbose — live spinner + periodic progress (heartbeats).
-
-• DNS fast path (A/AAAA only)
-  --dns-fast — only A and AAAA records are stored (faster I/O + less query volume).
-
-• Skip internal-looking hosts
-  --skip-internal — ignores internal-looking names (e.g., *.corp.*, .internal, .local, .lan).
-
-• Parallel DNS workers
-  --dns-workers N — run DNS lookups in parallel (e.g., 10–50).
-  Default behavior is unchanged unless you opt in.
-
-Tip: when you don’t use any speed flags, the CLI hints:
-“Tip: for faster results, try --dns-fast, --skip-internal, or --dns-workers N.”
-
-──────────────────────────── Ready-Made Run Recipes ────────────────────────────
-• Normal (baseline, comprehensive)
-  ./recon run -i --out runs --tag normal
-
-• Normal + visibility (adds heartbeats/spinner only)
-  ./recon run -i -v --out runs --tag vis
-
-• DNS fast path + concurrency (keep everything in scope)
-  ./recon run -i -v --dns-fast --dns-workers 20 --out runs --tag turbo
-
-• Turbo + skip internal-looking (fastest on large orgs)
-  ./recon run -i -v --dns-fast --skip-internal --dns-workers 20 --out runs --tag turbo-skip
-
-• Scoped file + speed flags (skip prompts)
-  ./recon run --scope scope.yaml -v --dns-fast --dns-workers 20 --out runs --tag scoped-fast
-
-──────────────────── Opening Reports (Newest or Specific) ──────────────────────
-• Open the newest HTML casefile — default browser (preferred)
-  xdg-open "$(ls -td runs/* | head -1)/casefile.html"
-
-• Open the newest HTML casefile — Firefox explicitly
-  firefox --new-window "$(ls -td runs/* | head -1)/casefile.html"
-
-• Open the newest Markdown casefile
-  xdg-open "$(ls -td runs/* | head -1)/casefile.md"
-  # or:
-  less "$(ls -td runs/* | head -1)/casefile.md"
-
-• Work with a specific run
-  RUN="runs/run-YYYYMMDD-HHMMSSZ[-tag]"
-  xdg-open "$RUN/casefile.html"
-  # artifacts folder:
-  ls -lh "$RUN/artifacts"
-
-──────────────────── Helpful “During Run” & Diagnostics ────────────────────────
-• Watch newest run’s artifacts appear/grow
-  watch -n 1 -d 'ls -lh "$(ls -td runs/* | head -1)"/artifacts'
-
-• Time a run (wall/CPU/RSS)
-  /usr/bin/time -f 'Elapsed: %E  CPU: %P  RSS: %M KB' ./recon run -i --out runs --tag bench
-
-• Measure DNS phase duration (newest run)
-  RUN="$(ls -td runs/* | head -1)"; \
-  CT_TS=$(stat -c %Y $(printf "%s\\n" "$RUN"/artifacts/ct_*.json | head -1)); \
-  DNS_TS=$(stat -c %Y "$RUN"/artifacts/dns_records.json); \
-  echo "$((DNS_TS-CT_TS)) seconds"
-
-• Diff two runs (what’s new/removed)
-  ./recon diff --a runs/run-OLD --b runs/run-NEW --out runs/diff.md
-  xdg-open runs/diff.md
-
-────────────────── Make `recon` Globally Available (no ./) ────────────────────
-This is optional, but a nice QoL improvement. After this, you can type `recon` from any directory.
-
-• Per-user symlink into ~/.local/bin (recommended)
-  mkdir -p ~/.local/bin
-  ln -sf "$(pwd)/recon" ~/.local/bin/recon
-
-  # ensure ~/.local/bin is on PATH for your shell:
-  grep -q 'export PATH="$HOME/.local/bin:$PATH"' ~/.bashrc || \
-    echo 'export PATH="$HOME/.local/bin:$PATH"' >> ~/.bashrc
-  source ~/.bashrc
-  # now you can run globally:
-  recon doctor
-
-  # undo:
-  rm -f ~/.local/bin/recon
-
-• Temporary PATH for current shell (session-only)
-  export PATH="$(pwd):$PATH"
-  recon doctor
-
-Keep the symlink pointing at your dev-box repo. If you move the repo folder, update or recreate the link.
-
-──────────────────────────── Troubleshooting (Fast Answers) ───────────────────────────
-• “recon: command not found” → use ./recon from repo root, or add the symlink above.
-• “ModuleNotFoundError: typer” → run via the project’s venv (./setup_venv.sh again if needed).
-• “Run finished too fast / 0 hosts” → -v will show if crt.sh returned 503. Re-try when:
-  curl -s -o /dev/null -w '%{http_code}\n' 'https://crt.sh/?q=%25.google.com&output=json'
-  returns 200.
-• DNS feels slow → try --dns-workers 20 and/or --dns-fast. Keep default for full coverage runs.
-"""
+from typer.core import TyperGroup
+
+# Only modules without third-party imports up here: yaml, requests, dnspython, jinja2
+# and rich load inside the commands that use them, so `recon diff`, `recon query` and
+# `--help` start fast (benchmarks/import_budget.py keeps it that way).
+from .changefeed import write_diff
+from .console import console
+from .history import HistoryDB, history_path
+from .incremental import keep_last
+from .journal import Journal, JournalState
+from .metrics import METRICS
+from .monitor import OWN_OPTIONS, ControlServer, Job, Monitor, parse_interval, send
+from .runner import (
+    RunOptions, RunState, discover, dns_phase, finish_run, print_done, probe_zones, write_metrics, write_report,
+)
+from .shard import Shard, merge_shards, read_marker, write_marker
+from .modules.dns_planner import DEFAULT_CONCURRENCY
+from .rule_engine import RuleEngine
+from .utils import ARTIFACT_FORMATS, COMPRESSIONS
 
+if TYPE_CHECKING:
+    from .scope import Scope
 
-console = Console()
 
 def _stamp() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%SZ")
 
 
-def _list_runs(out_dir: Path):
-    """Return run directories like run-YYYYMMDD-HHMMSSZ (oldest→newest)."""
-    return sorted([p for p in out_dir.glob("run-*") if p.is_dir()])
-
-
-def _load_hosts(artifacts_dir: Path) -> Set[str]:
-    """
-    Load inventory_hosts.json from a run's artifacts directory.
-    Accepts either a list of hosts or a dict with a 'hosts'/'items' list.
-    Returns an empty set on any error.
-    """
-    inv = artifacts_dir / "inventory_hosts.json"
-    if not inv.exists():
-        return set()
-    try:
-        data = json.loads(inv.read_text(encoding="utf-8"))
-    except Exception:
-        return set()
-
-    if isinstance(data, list):
-        return set(str(x).strip().lower() for x in data if str(x).strip())
-    if isinstance(data, dict):
-        for k in ("hosts", "items"):
-            v = data.get(k)
-            if isinstance(v, list):
-                return set(str(x).strip().lower() for x in v if str(x).strip())
-    return set()
-
-
-def _compute_delta(current_artifacts: Path, out_dir: Path):
-    """
-    Compare the current run's hosts to the previous run in `out_dir`.
-    Returns a dict:
-      {
-        "prev_run": "run-YYYYMMDD-HHMMSSZ[-tag]" | None,
-        "counts": {"new": int, "removed": int},
-        "new_hosts": [...], "removed_hosts": [...]
-      }
-    """
-    runs = _list_runs(out_dir)
-    if not runs or len(runs) < 2:
-        return {
-            "prev_run": None,
-            "counts": {"new": 0, "removed": 0},
-            "new_hosts": [],
-            "removed_hosts": [],
-        }
-
-    prev_run = runs[-2]
-    prev_hosts = _load_hosts(prev_run / "artifacts")
-    curr_hosts = _load_hosts(current_artifacts)
-
-    new_hosts = sorted(curr_hosts - prev_hosts)
-    removed_hosts = sorted(prev_hosts - curr_hosts)
-
-    return {
-        "prev_run": prev_run.name,
-        "counts": {"new": len(new_hosts), "removed": len(removed_hosts)},
-        "new_hosts": new_hosts,
-        "removed_hosts": removed_hosts,
-    }
-
-
 def _setup_logging(verbose: bool):
     level = logging.DEBUG if verbose else logging.INFO
     logging.basicConfig(level=level, format="%(message)s")
 
 
-def _looks_internal(host: str) -> bool:
-    """
-    Heuristic for internal-looking hosts.
-    Conservative defaults: match *.corp.* or obvious internal suffixes.
-    (Skipped only when --skip-internal is set.)
-    """
-    h = host.lower()
-    if ".corp." in h:
-        return True
-    if h.endswith(".internal") or h.endswith(".local") or h.endswith(".lan"):
-        return True
-    return False
-
-
-def _filter_records_dns_fast(records: Dict[str, list]) -> Dict[str, list]:
-    """Keep only A/AAAA when --dns-fast is set (output-only fast path)."""
-    return {k: v for k, v in records.items() if k in ("A", "AAAA") and v}
-
-
-def _dns_worker(host: str, resolvers: List[str]) -> Tuple[str, Dict[str, list]]:
-    """Call the existing query_dns for a single host (worker wrapper)."""
-    recs = query_dns(host, resolvers)
-    return host, recs
+class _ReconGroup(TyperGroup):
+    def format_help(self, ctx, formatter) -> None:
+        # the command reference is only needed when it is shown
+        if self.help is None:
+            from .reference import APP_HELP
+            self.help = APP_HELP
+        super().format_help(ctx, formatter)
 
 
 app = typer.Typer(
-    help=APP_HELP,
+    cls=_ReconGroup,
     add_completion=False,
     no_args_is_help=True,
     rich_markup_mode="markdown",
 )
 
 
+def _load_engine(scope_obj: Scope) -> RuleEngine:
+    from .rules_loader import load_rules
+    try:
+        rules = load_rules(Path(__file__).parent / "rules" / "recon_rules.yaml")
+    except FileNotFoundError:
+        rules = {"findings": {}}
+    # match conditions compiled once: every host is checked against all rules in one pass
+    engine = RuleEngine(rules, scope_obj.domains)
+    logging.info(f"Rules: {len(engine.rules)} rule(s), {engine.fingerprints} fingerprint(s).")
+    return engine
+
+
 @app.command(help="Run passive recon against the defined scope.")
 def run(
     scope: Optional[Path] = typer.Option(
@@ -273,14 +98,127 @@ def run(
     skip_internal: bool = typer.Option(
         False, "--skip-internal", help="(Opt-in) Skip internal-looking hosts (e.g., *.corp.*, .internal, .local, .lan)."
     ),
+    ct_workers: int = typer.Option(
+        1, "--ct-workers", help="Concurrent crt.sh requests across scope domains (default 1 = one at a time)."
+    ),
+    ct_rps: float = typer.Option(
+        1.0, "--ct-rps", help="Politeness budget: crt.sh request starts per second across all CT workers."
+    ),
+    ct_index: bool = typer.Option(
+        False, "--ct-index", help="(Opt-in) Local CT certificate index; after the first full pull, only unexpired certificates are requested."
+    ),
+    ct_offline: bool = typer.Option(
+        False, "--ct-offline", help="Replay CT names from the local index only (no crt.sh requests)."
+    ),
+    ct_index_path: Optional[Path] = typer.Option(
+        None, "--ct-index-path", help="SQLite file for --ct-index/--ct-offline (default: ~/.cache/recon-pilot/ct_index.sqlite)."
+    ),
+    ct_bulk: Optional[List[Path]] = typer.Option(
+        None, "--ct-bulk", help="(Opt-in) Read CT names from local JSONL/CSV cert dumps instead of crt.sh (repeatable)."
+    ),
     dns_workers: int = typer.Option(
         0, "--dns-workers", help="(Opt-in) Parallel DNS worker threads (e.g., 10–50). Default 0/1 = serial."
     ),
+    dns_async: bool = typer.Option(
+        False, "--dns-async", help="(Opt-in) Resolve on an asyncio engine; all record types per host at once."
+    ),
+    dns_concurrency: int = typer.Option(
+        DEFAULT_CONCURRENCY, "--dns-concurrency", help="Queries in flight for --dns-async (keep below `ulimit -n`)."
+    ),
+    dns_adaptive: bool = typer.Option(
+        False, "--dns-adaptive",
+        help="(Opt-in) Find the concurrency the resolvers tolerate (AIMD, capped by --dns-workers or "
+        "--dns-concurrency) and retry hosts whose lookups failed transiently.",
+    ),
+    dns_balance: bool = typer.Option(
+        False, "--dns-balance",
+        help="(Opt-in) Spread queries over the scope's resolvers by health/latency, hedge slow queries "
+        "on a second resolver and bench failing ones for a while.",
+    ),
+    dns_cache: bool = typer.Option(
+        False, "--dns-cache", help="(Opt-in) Reuse DNS answers across runs while their TTL is valid."
+    ),
+    dns_cache_path: Optional[Path] = typer.Option(
+        None, "--dns-cache-path", help="SQLite file for --dns-cache (default: ~/.cache/recon-pilot/dns_cache.sqlite)."
+    ),
+    artifact_format: str = typer.Option(
+        "json", "--artifact-format", help="List artifacts as 'json' (default) or 'ndjson' (one record per line, streamed)."
+    ),
+    compress: str = typer.Option(
+        "none", "--compress", help="Compress list artifacts: none | gzip | zstd (zstd needs the 'zstandard' package)."
+    ),
+    wildcard_detect: bool = typer.Option(
+        False, "--wildcard-detect", help="(Opt-in) Probe base domains for wildcard DNS and mark hosts that only match it."
+    ),
+    collapse_wildcard: bool = typer.Option(
+        False, "--collapse-wildcard", help="With --wildcard-detect: drop wildcard-answered hosts from the inventory."
+    ),
+    cname_check: bool = typer.Option(
+        False, "--cname-check",
+        help="(Opt-in) Resolve each distinct CNAME target once and confirm dangling-CNAME findings (NXDOMAIN).",
+    ),
+    incremental: bool = typer.Option(
+        False, "--incremental", help="(Opt-in) Re-resolve only new, TTL-expired and sampled hosts; carry the rest from the last run."
+    ),
+    refresh_sample: float = typer.Option(
+        0.1, "--refresh-sample", help="With --incremental: share of carried hosts re-checked per run, in rotation (0 = none)."
+    ),
+    pipeline: bool = typer.Option(
+        False, "--pipeline", help="(Opt-in) Start resolving hosts as each CT domain finishes instead of after all of CT."
+    ),
+    history: bool = typer.Option(
+        True, "--history/--no-history", help="Index each run into OUT/history.sqlite (used for the delta and `recon query`)."
+    ),
+    metrics_textfile: Optional[Path] = typer.Option(
+        None, "--metrics-textfile", help="Also write run metrics in Prometheus text format (node_exporter textfile collector)."
+    ),
+    journal: bool = typer.Option(
+        True, "--journal/--no-journal", help="Checkpoint finished CT domains and hosts to RUN_DIR/journal.ndjson (removed when the run completes)."
+    ),
+    resume: Optional[Path] = typer.Option(
+        None, "--resume", help="Finish an interrupted run in RUN_DIR, skipping the work in its journal."
+    ),
+    shard: Optional[str] = typer.Option(
+        None, "--shard",
+        help="(Opt-in) Run only slice i of N (e.g. 2/8): CT for the scope domains and DNS for the hosts "
+        "assigned to it by hash; combine the shard directories with `recon merge`.",
+    ),
 ):
+    from .scope import Scope
+    from .modules.dns import RECORD_TYPES
+
     _setup_logging(verbose)
+    METRICS.reset()
+    run_started = METRICS.clock()
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise typer.BadParameter(f"expected one of {', '.join(ARTIFACT_FORMATS)}", param_hint="--artifact-format")
+    if compress not in COMPRESSIONS:
+        raise typer.BadParameter(f"expected one of {', '.join(COMPRESSIONS)}", param_hint="--compress")
+    opts = RunOptions(
+        verbose=verbose, dns_fast=dns_fast, skip_internal=skip_internal, ct_workers=ct_workers, ct_rps=ct_rps,
+        ct_index=ct_index, ct_offline=ct_offline, ct_index_path=ct_index_path, ct_bulk=list(ct_bulk or []),
+        dns_workers=dns_workers, dns_async=dns_async, dns_concurrency=dns_concurrency, dns_adaptive=dns_adaptive,
+        dns_balance=dns_balance, dns_cache=dns_cache, dns_cache_path=dns_cache_path,
+        artifact_format=artifact_format, compress=compress, wildcard_detect=wildcard_detect,
+        collapse_wildcard=collapse_wildcard, cname_check=cname_check, incremental=incremental,
+        refresh_sample=refresh_sample, pipeline=pipeline, history=history, metrics_textfile=metrics_textfile,
+    )
+
+    # --resume: what the interrupted run already finished (its scope is stored in the journal)
+    state = JournalState()
+    if resume is not None:
+        state = Journal.load(resume)
+        if state.done or (state.scope is None and (resume / "artifacts" / "metrics.json").exists()):
+            typer.echo(f"{resume} already completed.")
+            raise typer.Exit(0)
+        if state.scope is None:
+            typer.echo(f"No journal in {resume}; nothing to resume.")
+            raise typer.Exit(2)
 
     # Build Scope from prompts if interactive; otherwise load from YAML path.
-    if interactive:
+    if resume is not None and scope is None:
+        scope_obj = Scope.from_dict(state.scope)
+    elif interactive:
         org = typer.prompt("Organization", default="Local Lab")
 
         domains_str = typer.prompt("Domain(s) (comma or space separated)", default="")
@@ -311,203 +249,270 @@ def run(
             raise typer.Exit(2)
         scope_obj = Scope.load(str(scope))
 
-    run_dir = out / f"run-{_stamp()}{('-' + tag) if tag else ''}"
-    artifacts_dir = run_dir / "artifacts"
-    run_dir.mkdir(parents=True, exist_ok=True)
-    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    shard_obj: Optional[Shard] = None
+    marker = read_marker(resume) if resume is not None else None
+    if shard or marker:
+        try:
+            shard_obj = Shard.parse(shard) if shard else Shard(marker["shard"], marker["of"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise typer.BadParameter(str(e), param_hint="--shard")
+
+    if resume is not None:
+        run_dir = resume
+        out = resume.parent
+    elif shard_obj is not None:
+        # not run-*: shards are not runs of their own for the delta, history or --incremental
+        run_dir = out / f"shard-{_stamp()}-{shard_obj.label}{('-' + tag) if tag else ''}"
+    else:
+        run_dir = out / f"run-{_stamp()}{('-' + tag) if tag else ''}"
+    (run_dir / "artifacts").mkdir(parents=True, exist_ok=True)
+
+    journal_log = Journal(run_dir) if journal or resume is not None else None
+    if journal_log is not None and resume is None:
+        journal_log.start(scope_obj.to_dict())
+    if shard_obj is not None and marker is None:
+        write_marker(run_dir, shard_obj, scope_obj.to_dict())
+    if resume is not None:
+        console.print(
+            f"[cyan]resume:[/] {run_dir.name}: {len(state.ct)}/{len(scope_obj.domains)} CT domain(s) and "
+            f"{len(state.hosts)} host(s) already done"
+        )
 
     console.rule("ReconPilot v0 — Passive run")
     console.print(f"[bold]Org:[/] {scope_obj.org}")
     console.print(f"[bold]Domains:[/] {', '.join(scope_obj.domains)}\n")
 
     # Hint only when user didn't opt-in to any speed-ups
-    if not (dns_fast or skip_internal or (dns_workers and dns_workers > 1)):
-        console.print("[dim]Tip: for faster results, try --dns-fast, --skip-internal, or --dns-workers N.[/dim]")
-
-    all_hosts: Set[str] = set()
-
-    # 1) CT discovery
-    logging.info("CT: starting certificate transparency discovery...")
-    for base in scope_obj.domains:
-        console.print(f"[cyan]ct:[/] querying crt.sh for {base}...")
-        hosts = fetch_ct_domains(base)
-        hosts = [h for h in hosts if scope_obj.in_scope_domain(h)]
-        console.print(f"  found {len(hosts)} hosts in-scope")
-        write_json(artifacts_dir / f"ct_{base}.json", hosts)
-        all_hosts.update(hosts)
-    logging.info("CT: done.")
-
-    # Include seed hosts from scope (filtered to in-scope)
-    seed_hosts = {h.strip().lower() for h in scope_obj.seeds.get("hosts", []) if h.strip()}
-    seed_hosts = {h for h in seed_hosts if scope_obj.in_scope_domain(h)}
-    all_hosts.update(seed_hosts)
-    write_json(artifacts_dir / "seed_hosts.json", sorted(list(seed_hosts)))
-
-    # Optional host filtering (skip internal-looking hosts) — opt-in only
-    if skip_internal:
-        before = len(all_hosts)
-        all_hosts = {h for h in all_hosts if not _looks_internal(h)}
-        skipped = before - len(all_hosts)
-        logging.info(f"Scope filter: skipped {skipped} internal-looking host(s).")
-
-    all_hosts = sorted(all_hosts)
-    write_json(artifacts_dir / "inventory_hosts.json", all_hosts)
-
-    # 2) DNS records
-    logging.info("DNS: starting resolution pipeline...")
-    inventory: List[Dict[str, object]] = []
-    dns_issues: List[Dict[str, object]] = []
-
-    def _process_host(h: str) -> Tuple[str, Dict[str, list], Optional[dict]]:
-        recs = query_dns(h, scope_obj.resolvers)
-        if dns_fast:
-            recs = _filter_records_dns_fast(recs)
-
-        issue = None
-        # simple heuristics for potential dangling CNAMEs
-        if any(
-            v
-            for v in recs.get("CNAME", [])
-            if any(s in v.lower() for s in ["amazonaws.com", "github.io", "herokuapp.com", "azurewebsites.net"])
-        ):
-            issue = {"host": h, "type": "dangling_cname_potential", "evidence": recs.get("CNAME", [])}
-        return h, recs, issue
-
-    if dns_workers and dns_workers > 1:
-        logging.info(f"DNS: parallel mode enabled with {dns_workers} worker(s).")
-        with console.status("Resolving DNS (parallel)…", spinner="dots"):
-            with ThreadPoolExecutor(max_workers=dns_workers) as ex:
-                futures = {ex.submit(_process_host, h): h for h in all_hosts}
-                done = 0
-                for fut in as_completed(futures):
-                    h, recs, issue = fut.result()
-                    inventory.append({"host": h, "records": recs})
-                    if issue:
-                        dns_issues.append(issue)
-                    done += 1
-                    if verbose and (done % 25 == 0):
-                        logging.debug(f"DNS progress: {done}/{len(all_hosts)} hosts")
-    else:
-        with console.status("Resolving DNS…", spinner="dots"):
-            for idx, h in enumerate(all_hosts, 1):
-                h, recs, issue = _process_host(h)
-                inventory.append({"host": h, "records": recs})
-                if issue:
-                    dns_issues.append(issue)
-                if verbose and (idx % 25 == 0):
-                    logging.debug(f"DNS progress: {idx}/{len(all_hosts)} hosts")
-
-    write_json(artifacts_dir / "dns_records.json", inventory)
-    write_json(artifacts_dir / "dns_issues.json", dns_issues)
-    logging.info("DNS: done.")
-
-    # 3) Findings: map to rules/explanations (with safe fallback)
-    logging.info("Findings: analyzing artifacts…")
+    if not (dns_fast or skip_internal or dns_async or dns_adaptive or (dns_workers and dns_workers > 1)):
+        console.print("[dim]Tip: for faster results, try --dns-fast, --skip-internal, --dns-workers N, or --dns-async.[/dim]")
+
+    st = RunState(
+        scope=scope_obj, opts=opts, run_dir=run_dir, out=out,
+        # rules up front: per-host findings are built as DNS results arrive
+        engine=_load_engine(scope_obj),
+        # --dns-fast skips the other record types on the wire, not just in the output
+        record_types=("A", "AAAA") if dns_fast else RECORD_TYPES,
+        shard=shard_obj, journal=journal_log, resumed=state, started=run_started,
+    )
+    if wildcard_detect:
+        probe_zones(st)
+    # 1) CT discovery, 2) DNS records (with --pipeline, DNS starts while CT runs), 3) report
+    dns_hosts, producer = discover(st)
+    dns_phase(st, dns_hosts, producer)
+    finish_run(st)
+
+
+@app.command(help="Combine the shard directories of a `run --shard i/N` set into one run.")
+def merge(
+    shards: List[Path] = typer.Argument(
+        ..., exists=True, file_okay=False, help="Shard directories (shard-*), one for each i of N."
+    ),
+    out: Optional[Path] = typer.Option(None, help="Output directory base (default: the shards' directory)."),
+    tag: str = typer.Option("", help="Optional run tag, appended to run folder name."),
+    history: bool = typer.Option(
+        True, "--history/--no-history", help="Index the merged run into OUT/history.sqlite."
+    ),
+    artifact_format: str = typer.Option("json", "--artifact-format", help="List artifacts as 'json' or 'ndjson'."),
+    compress: str = typer.Option("none", "--compress", help="Compress list artifacts: none | gzip | zstd."),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show detailed progress messages."),
+):
+    _setup_logging(verbose)
+    METRICS.reset()
+    started = METRICS.clock()
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise typer.BadParameter(f"expected one of {', '.join(ARTIFACT_FORMATS)}", param_hint="--artifact-format")
+    if compress not in COMPRESSIONS:
+        raise typer.BadParameter(f"expected one of {', '.join(COMPRESSIONS)}", param_hint="--compress")
+
+    out = out or shards[0].parent
+    run_dir = out / f"run-{_stamp()}{('-' + tag) if tag else ''}"
     try:
-        rules = load_rules(Path(__file__).parent / "rules" / "recon_rules.yaml")
-    except FileNotFoundError:
-        rules = {"findings": {}}
-    findings = []
-
-    # wildcard exposure hint (naive): if many subdomains for a base
-    counts = Counter([h.split(".", maxsplit=1)[1] if "." in h else h for h in all_hosts])
-    for base, cnt in counts.items():
-        if cnt >= 30 and base in scope_obj.domains:
-            rule = rules["findings"].get("wildcard_cert", {})
-            findings.append({
-                "title": "Potential Wildcard Exposure",
-                "asset": base,
-                "why": rule.get("why", ""),
-                "evidence": f"{cnt} subdomains observed in CT for {base}",
-                "next_steps": rule.get("next_steps", [])
-            })
-
-    for issue in dns_issues:
-        rule = rules["findings"].get("dangling_cname", {})
-        findings.append({
-            "title": "Potential Dangling CNAME",
-            "asset": issue["host"],
-            "why": rule.get("why", ""),
-            "evidence": ", ".join(issue.get("evidence", [])),
-            "next_steps": rule.get("next_steps", [])
-        })
-
-    # Inventory summary lines (respect dns_fast output)
-    inv_summary = []
-    for item in inventory:
-        host = item["host"]
-        recs = item["records"]
-        summary_bits = []
-        for rt in ["A", "AAAA", "CNAME", "MX", "TXT", "NS"]:
-            if recs.get(rt):
-                summary_bits.append(f"{rt}:{len(recs[rt])}")
-        inv_summary.append({"host": host, "records_summary": ", ".join(summary_bits) if summary_bits else "(no records)"})
-
-    # 4) Compute simple stats + delta vs previous run
-    delta = _compute_delta(artifacts_dir, out)
-    write_json(artifacts_dir / "delta.json", delta)
-
-    stats = {
-        "total_subdomains": len(all_hosts),
-        "new_subdomains": delta["counts"]["new"],
-        "dns_issues": dns_issues,
-    }
-
-    # 5) Render casefile (Markdown + HTML)
-    logging.info("Render: generating casefile.md…")
-    context = {
-        "org": scope_obj.org,
-        "run_time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-        "scope_domains": scope_obj.domains,
-        "stats": stats,
-        "findings": findings,
-        "inventory": inv_summary,
-        "delta": delta,  # so templates can show what's new/removed
-    }
-
-    template_dir = Path(__file__).parent / "templates"
-    report_md = render_casefile(template_dir, context)
-    with open(run_dir / "casefile.md", "w", encoding="utf-8") as f:
-        f.write(report_md)
-
-    logging.info("Render: generating casefile.html…")
-    write_casefile_html(run_dir / "casefile.html", template_dir, context)
-
-    console.print(f"\n[green]✔[/] Wrote artifacts → {artifacts_dir}")
-    console.print(f"[green]✔[/] Wrote report → {run_dir / 'casefile.md'}")
-    console.print(f"[green]✔[/] Wrote HTML → {run_dir / 'casefile.html'}")
-    if delta["prev_run"]:
-        console.print(
-            f"[bold]Δ since {delta['prev_run']}:[/] +{delta['counts']['new']} new, -{delta['counts']['removed']} removed"
-        )
-    else:
-        console.print(f"[bold]Δ:[/] first run — no prior data")
+        with METRICS.phase("merge"):
+            merged = merge_shards(shards, run_dir / "artifacts", artifact_format, compress)
+    except ValueError as e:
+        typer.echo(f"Cannot merge: {e}")
+        raise typer.Exit(2)
+
+    from .scope import Scope
+    scope_obj = Scope.from_dict(merged.scope)
+    console.rule("ReconPilot v0 — Merge")
+    console.print(f"[bold]Org:[/] {scope_obj.org}")
+    console.print(
+        f"[cyan]merge:[/] {len(shards)} shard(s) → {len(merged.hosts)} host(s), "
+        f"{len(merged.inventory)} DNS record set(s)"
+    )
+    engine = _load_engine(scope_obj)
+    for h in merged.hosts:
+        engine.observe(h, {})  # zone-level rules count every host
+    delta = write_report(
+        run_dir, out, scope_obj, engine, merged.hosts, merged.inventory, merged.wildcards,
+        merged.wildcard_hosts, merged.dns_issues, history,
+    )
+    METRICS.end_phase("total", started)
+    write_metrics(run_dir / "artifacts", None, len(merged.hosts), merged.queries)
+    print_done(run_dir, delta)
+
+
+@app.command(
+    help="Run scopes on a jittered schedule in one long-lived process (warm caches); "
+    "extra options are passed to every `recon run`.",
+    context_settings={"allow_extra_args": True, "ignore_unknown_options": True},
+)
+def monitor(
+    ctx: typer.Context,
+    scope: List[Path] = typer.Option(..., "--scope", exists=True, dir_okay=False, help="Scope file (repeatable)."),
+    out: Path = typer.Option(Path("runs"), help="Output directory base (one subdirectory per scope if several)."),
+    every: str = typer.Option("24h", "--every", help="Time between runs of a scope (e.g. 30m, 6h, 1d)."),
+    jitter: float = typer.Option(0.1, "--jitter", help="Spread each interval by up to this share of it, either way."),
+    ct_every: str = typer.Option(
+        "24h", "--ct-every", help="Pull crt.sh (through the CT index) this often; runs in between replay the index."
+    ),
+    socket_path: Optional[Path] = typer.Option(
+        None, "--socket", help="Control socket (default: OUT/monitor.sock); see `recon monitor-ctl`."
+    ),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show detailed progress messages."),
+):
+    _setup_logging(verbose)
+    extra = list(ctx.args) + (["-v"] if verbose else [])
+    try:
+        interval, ct_interval = parse_interval(every), parse_interval(ct_every)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--every/--ct-every")
+    if interval <= 0 or not 0 <= jitter < 1:
+        raise typer.BadParameter("needs --every > 0 and 0 <= --jitter < 1", param_hint="--every/--jitter")
+    own = [a for a in extra if a.split("=", 1)[0] in OWN_OPTIONS]
+    if own:
+        raise typer.BadParameter(f"set by the monitor, not per run: {', '.join(own)}")
+
+    run_cmd = typer.main.get_command(app).get_command(ctx, "run")
+    try:
+        # bad run options fail now, not at the first cycle
+        run_cmd.make_context("run", ["--scope", str(scope[0])] + extra)
+    except Exception as e:  # click's usage errors (typer may vendor click)
+        typer.echo(f"Run options: {e}")
+        raise typer.Exit(2)
+
+    def _run_once(args: List[str]) -> int:
+        return run_cmd.main(args, prog_name="recon run", standalone_mode=False)
+
+    names = [s.stem for s in scope]
+    if len(set(names)) != len(names):
+        raise typer.BadParameter("scope files need distinct names (each gets OUT/<name>)", param_hint="--scope")
+    jobs = [
+        Job(s, out / s.stem if len(scope) > 1 else out, interval, jitter, ct_interval)
+        for s in scope
+    ]
+    # what stays warm between cycles: the DNS cache (in memory) and the last inventory
+    from .modules.dns_cache import keep_open
+    keep_open()
+    keep_last()
+    mon = Monitor(jobs, _run_once, extra)
+    sock = socket_path or out / "monitor.sock"
+    try:
+        server = ControlServer(sock, mon)
+    except RuntimeError as e:
+        typer.echo(str(e))
+        raise typer.Exit(2)
+    server.start()
+    signal.signal(signal.SIGTERM, lambda *_: mon.stop())
+
+    console.rule("ReconPilot v0 — Monitor")
+    console.print(f"[bold]Scopes:[/] {', '.join(names)} every {every} (±{jitter:.0%}), CT every {ct_every}")
+    console.print(f"[dim]Control: recon monitor-ctl status|run|stop --socket {sock}[/dim]")
+    try:
+        mon.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[yellow]monitor:[/] interrupted; an unfinished run can be completed with --resume.")
+    finally:
+        server.close()
+    console.print("[green]✔[/] Monitor stopped.")
+
+
+@app.command("monitor-ctl", help="Talk to a running `recon monitor`: status, run [SCOPE], stop.")
+def monitor_ctl(
+    command: List[str] = typer.Argument(..., help="status | run [SCOPE] | stop"),
+    out: Path = typer.Option(Path("runs"), help="Output directory base of the monitor."),
+    socket_path: Optional[Path] = typer.Option(None, "--socket", help="Control socket (default: OUT/monitor.sock)."),
+):
+    sock = socket_path or out / "monitor.sock"
+    try:
+        reply = send(sock, " ".join(command))
+    except OSError as e:
+        typer.echo(f"No monitor on {sock} ({e}).")
+        raise typer.Exit(2)
+    typer.echo(json.dumps(reply, indent=2, sort_keys=True))
+    if "error" in reply:
+        raise typer.Exit(1)
 
 
-@app.command(help="Diff two runs to see what's new/removed.")
+@app.command(help="Diff two runs: new/removed hosts and changed DNS records.")
 def diff(
     a: Path = typer.Option(..., exists=True, help="Path to older run dir."),
     b: Path = typer.Option(..., exists=True, help="Path to newer run dir."),
     out: Path = typer.Option(Path("diff.md"), help="Output markdown path."),
+    json_out: Optional[Path] = typer.Option(
+        None, "--json", help="Machine-readable diff path (default: next to --out, with a .json suffix)."
+    ),
+):
+    json_path = json_out or out.with_suffix(".json")
+    counts = write_diff(a, b, out, json_path)
+    # typer.echo, not the rich console: diff and query stay off the run stack's imports
+    typer.echo(f"+{counts['added']} new, -{counts['removed']} removed, ~{counts['changed']} changed host(s)")
+    typer.echo(f"{typer.style('✔', fg='green')} Wrote diff → {out}")
+    typer.echo(f"{typer.style('✔', fg='green')} Wrote JSON → {json_path}")
+
+
+@app.command(help="Query run history: first/last seen, flapping hosts, new hosts since a run.")
+def query(
+    out: Path = typer.Option(Path("runs"), help="Output directory base holding the runs."),
+    host: Optional[str] = typer.Option(None, "--host", help="Show first/last seen, runs and latest records for one host."),
+    flapped: bool = typer.Option(False, "--flapped", help="Hosts that disappeared and came back."),
+    since: Optional[str] = typer.Option(
+        None, "--since", help="Hosts first seen in RUN or later (run directory name, e.g. run-20250101-000000Z)."
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print JSON instead of text."),
 ):
-    hosts_a = set(read_json(a / "artifacts" / "inventory_hosts.json"))
-    hosts_b = set(read_json(b / "artifacts" / "inventory_hosts.json"))
-    new = sorted(list(hosts_b - hosts_a))
-    gone = sorted(list(hosts_a - hosts_b))
-
-    lines = ["# ReconPilot Diff\n"]
-    lines.append(f"**New hosts:** {len(new)}\n")
-    for h in new:
-        lines.append(f"- `{h}`\n")
-    lines.append("\n")
-    lines.append(f"**Removed hosts:** {len(gone)}\n")
-    for h in gone:
-        lines.append(f"- `{h}`\n")
-
-    with open(out, "w", encoding="utf-8") as f:
-        f.writelines(lines)
-
-    console.print(f"[green]✔[/] Wrote diff → {out}")
+    if not out.is_dir():
+        typer.echo(f"No runs directory at {out}.")
+        raise typer.Exit(2)
+    db = HistoryDB(history_path(out))
+    try:
+        db.backfill(out)
+        if host:
+            result = db.host(host)
+            if result is None:
+                typer.echo(f"{host}: never seen in {out}.")
+                raise typer.Exit(1)
+        elif flapped:
+            result = db.flapped()
+        elif since:
+            result = db.first_seen(since)
+        else:
+            result = db.runs()
+    finally:
+        db.close()
+
+    if as_json:
+        typer.echo(json.dumps(result, indent=2))
+        return
+    if host:
+        typer.echo(f"{typer.style(result['host'], bold=True)}: first seen {result['first_seen']}, "
+                   f"last seen {result['last_seen']} ({result['runs_seen']} run(s))")
+        for rt, values in result["records"].items():
+            typer.echo(f"  {rt}: {', '.join(values)}")
+        for f in result["findings"]:
+            typer.echo(f"  {typer.style(f['title'], fg='yellow')} ({f['run']})")
+    elif flapped:
+        for r in result:
+            typer.echo(f"{r['host']}  {r['first_seen']} → {r['last_seen']}  missed {r['runs_missed']} run(s)")
+        typer.secho(f"{len(result)} flapping host(s)", dim=True)
+    elif since:
+        for r in result:
+            typer.echo(f"{r['host']}  first {r['first_seen']}  last {r['last_seen']}")
+        typer.secho(f"{len(result)} host(s) first seen since {since}", dim=True)
+    else:
+        for r in result:
+            typer.echo(f"{r['run']}  {r['hosts']} host(s)  {r['org']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+
+class _LazyConsole:
+    """rich's Console, created on first use (rich is not imported until something prints)."""
+
+    _console = None
+
+    def __getattr__(self, name: str):
+        if _LazyConsole._console is None:
+            from rich.console import Console
+            _LazyConsole._console = Console()
+        return getattr(_LazyConsole._console, name)
+
+
+console = _LazyConsole()
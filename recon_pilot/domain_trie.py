@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+
+class _Node:
+    __slots__ = ("children", "end", "below")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.end = None    # value: pattern ends here; this name and everything under it match
+        self.below = None  # value: leading "*." pattern; only names strictly under this one match
+
+
+class DomainTrie:
+    """
+    Domain patterns compiled into a reversed-label trie; a lookup costs O(labels in the
+    host), not O(patterns).
+
+    Pattern syntax (case-insensitive, trailing dots ignored):
+      example.com         example.com and every name under it
+      *.example.com       every name under example.com, but not example.com itself
+      api.*.example.com   "*" in the middle matches exactly one label
+                          (api.eu.example.com and names under it)
+
+    Each pattern carries a value (default True); match() returns the value of the
+    most specific matching pattern, or None.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._root = _Node()
+        self._size = 0
+        for p in patterns:
+            self.add(p)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def labels(name: str) -> List[str]:
+        """Reversed labels of a normalised name: www.example.com -> [com, example, www]."""
+        name = name.strip().lower().strip(".")
+        return name.split(".")[::-1] if name else []
+
+    def add(self, pattern: str, value=True) -> None:
+        labels = self.labels(pattern)
+        if not labels:
+            return
+        leading_star = labels[-1] == "*"
+        if leading_star:
+            labels = labels[:-1]
+        node = self._root
+        for label in labels:
+            node = node.children.setdefault(label, _Node())
+        if leading_star:
+            node.below = value
+        else:
+            node.end = value
+        self._size += 1
+
+    def match_labels(self, labels: List[str]):
+        return self._match(self._root, labels, 0)
+
+    def _match(self, node: _Node, labels: List[str], i: int):
+        # deeper (more specific) patterns win, so descend before looking at this node
+        if i < len(labels):
+            child = node.children.get(labels[i])
+            if child is not None:
+                hit = self._match(child, labels, i + 1)
+                if hit is not None:
+                    return hit
+            star = node.children.get("*")
+            if star is not None:
+                hit = self._match(star, labels, i + 1)
+                if hit is not None:
+                    return hit
+            if node.below is not None:
+                return node.below
+        return node.end
+
+    def matches(self, name: str) -> List:
+        """Values of every pattern covering `name`, most specific first."""
+        out: List = []
+        self._collect(self._root, self.labels(name), 0, out)
+        return out
+
+    def _collect(self, node: _Node, labels: List[str], i: int, out: List) -> None:
+        if i < len(labels):
+            for key in dict.fromkeys((labels[i], "*")):
+                child = node.children.get(key)
+                if child is not None:
+                    self._collect(child, labels, i + 1, out)
+            if node.below is not None:
+                out.append(node.below)
+        if node.end is not None:
+            out.append(node.end)
+
+    def match(self, name: str):
+        """Value of the most specific pattern covering `name`, or None."""
+        return self.match_labels(self.labels(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self.match(name) is not None
+
+    def longest_suffix(self, name: str) -> Optional[str]:
+        """The longest literal pattern (no wildcards) that `name` equals or sits under."""
+        labels = self.labels(name)
+        node, best = self._root, None
+        for i, label in enumerate(labels):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.end is not None:
+                best = i + 1
+        return ".".join(reversed(labels[:best])) if best else None
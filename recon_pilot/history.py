@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+import sqlite3
+import threading
+
+from .inventory import HostList
+from .utils import find_artifact, iter_artifact
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY,
+        name   TEXT NOT NULL UNIQUE,
+        org    TEXT,
+        hosts  INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hosts (
+        host   TEXT NOT NULL,
+        run_id INTEGER NOT NULL,
+        PRIMARY KEY (host, run_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS hosts_by_run ON hosts (run_id, host)",
+    """
+    CREATE TABLE IF NOT EXISTS records (
+        host   TEXT NOT NULL,
+        run_id INTEGER NOT NULL,
+        rtype  TEXT NOT NULL,
+        value  TEXT NOT NULL,
+        PRIMARY KEY (host, run_id, rtype, value)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS records_by_run ON records (run_id)",
+    """
+    CREATE TABLE IF NOT EXISTS findings (
+        run_id INTEGER NOT NULL,
+        title  TEXT NOT NULL,
+        asset  TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS findings_by_run ON findings (run_id)",
+    "CREATE INDEX IF NOT EXISTS findings_by_asset ON findings (asset)",
+)
+
+# rows buffered before one executemany
+BATCH = 5000
+
+# per-host span across runs: first/last run it was seen in and how many runs that was
+_SPANS = """
+    SELECT h.host, MIN(r.name) AS first, MAX(r.name) AS last, COUNT(*) AS seen
+    FROM hosts h JOIN runs r ON r.run_id = h.run_id
+"""
+
+
+class HistoryDB:
+    """
+    Run history for one output directory (SQLite): hosts, DNS records and findings
+    per run, indexed by host and by run.
+
+    Runs are ordered by name (run-YYYYMMDD-HHMMSSZ[-tag] sorts chronologically),
+    so runs imported late by backfill() still land in the right place.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self._db.execute(stmt)
+        self._lock = threading.Lock()
+
+    def _many(self, sql: str, rows: Iterable[tuple]) -> None:
+        buf: List[tuple] = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= BATCH:
+                self._db.executemany(sql, buf)
+                buf = []
+        if buf:
+            self._db.executemany(sql, buf)
+
+    def record_run(
+        self,
+        name: str,
+        hosts: Iterable[str],
+        records: Iterable[dict] = (),
+        findings: Iterable[dict] = (),
+        org: str = "",
+    ) -> None:
+        """Store (or replace) one run: its hosts, {"host", "records"} items and findings."""
+        if not isinstance(hosts, HostList):
+            hosts = sorted(set(hosts))
+        with self._lock:
+            cur = self._db.execute("SELECT run_id FROM runs WHERE name=?", (name,))
+            row = cur.fetchone()
+            if row:
+                for table in ("hosts", "records", "findings"):
+                    self._db.execute(f"DELETE FROM {table} WHERE run_id=?", (row[0],))
+                self._db.execute("UPDATE runs SET org=?, hosts=? WHERE run_id=?", (org, len(hosts), row[0]))
+                run_id = row[0]
+            else:
+                run_id = self._db.execute(
+                    "INSERT INTO runs (name, org, hosts) VALUES (?, ?, ?)", (name, org, len(hosts))
+                ).lastrowid
+            self._many("INSERT OR IGNORE INTO hosts VALUES (?, ?)", ((h, run_id) for h in hosts))
+            self._many(
+                "INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?)",
+                (
+                    (item["host"], run_id, rtype, str(v))
+                    for item in records
+                    for rtype, values in (item.get("records") or {}).items()
+                    for v in values
+                ),
+            )
+            self._many(
+                "INSERT INTO findings VALUES (?, ?, ?)",
+                ((run_id, f.get("title", ""), f.get("asset", "")) for f in findings),
+            )
+            self._db.commit()
+
+    def has_run(self, name: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM runs WHERE name=?", (name,)).fetchone() is not None
+
+    def backfill(self, out_dir: Path) -> int:
+        """
+        Import run-* directories under `out_dir` that are not in the history yet
+        (hosts and DNS records from their artifacts). Runs without an inventory are skipped.
+        """
+        added = 0
+        for run_dir in sorted(p for p in out_dir.glob("run-*") if p.is_dir()):
+            if self.has_run(run_dir.name):
+                continue
+            artifacts = run_dir / "artifacts"
+            inv = find_artifact(artifacts, "inventory_hosts")
+            if inv is None:
+                continue
+            try:
+                hosts = [str(h).strip().lower() for h in iter_artifact(inv)]
+                recs = find_artifact(artifacts, "dns_records")
+                records = [r for r in iter_artifact(recs) if isinstance(r, dict)] if recs else []
+            except Exception:
+                logging.debug(f"History: could not read {run_dir.name}; skipped")
+                continue
+            self.record_run(run_dir.name, [h for h in hosts if h], records)
+            added += 1
+        if added:
+            logging.info(f"History: imported {added} earlier run(s) into {self.path}")
+        return added
+
+    def runs(self) -> List[Dict[str, object]]:
+        with self._lock:
+            rows = self._db.execute("SELECT name, org, hosts FROM runs ORDER BY name").fetchall()
+        return [{"run": n, "org": o or "", "hosts": c} for n, o, c in rows]
+
+    def previous_run(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name FROM runs WHERE name < ? ORDER BY name DESC LIMIT 1", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def delta(self, name: str) -> Dict[str, object]:
+        """New/removed hosts of run `name` against the run before it (same shape as delta.json)."""
+        prev = self.previous_run(name)
+        if prev is None:
+            return {"prev_run": None, "counts": {"new": 0, "removed": 0}, "new_hosts": [], "removed_hosts": []}
+        q = """
+            SELECT host FROM hosts WHERE run_id = (SELECT run_id FROM runs WHERE name=?)
+            EXCEPT
+            SELECT host FROM hosts WHERE run_id = (SELECT run_id FROM runs WHERE name=?)
+            ORDER BY host
+        """
+        with self._lock:
+            new_hosts = [r[0] for r in self._db.execute(q, (name, prev))]
+            removed_hosts = [r[0] for r in self._db.execute(q, (prev, name))]
+        return {
+            "prev_run": prev,
+            "counts": {"new": len(new_hosts), "removed": len(removed_hosts)},
+            "new_hosts": new_hosts,
+            "removed_hosts": removed_hosts,
+        }
+
+    def host(self, host: str) -> Optional[Dict[str, object]]:
+        """First/last run a host was seen in, every run it appeared in, and its latest records."""
+        host = host.strip().lower().strip(".")
+        with self._lock:
+            seen = [
+                r[0]
+                for r in self._db.execute(
+                    "SELECT r.name FROM hosts h JOIN runs r ON r.run_id = h.run_id WHERE h.host=? ORDER BY r.name",
+                    (host,),
+                )
+            ]
+            if not seen:
+                return None
+            records: Dict[str, List[str]] = {}
+            for rtype, value in self._db.execute(
+                "SELECT rtype, value FROM records WHERE host=? AND run_id = (SELECT run_id FROM runs WHERE name=?) "
+                "ORDER BY rtype, value",
+                (host, seen[-1]),
+            ):
+                records.setdefault(rtype, []).append(value)
+            findings = [
+                {"run": n, "title": t}
+                for n, t in self._db.execute(
+                    "SELECT r.name, f.title FROM findings f JOIN runs r ON r.run_id = f.run_id "
+                    "WHERE f.asset=? ORDER BY r.name",
+                    (host,),
+                )
+            ]
+        return {
+            "host": host,
+            "first_seen": seen[0],
+            "last_seen": seen[-1],
+            "runs_seen": len(seen),
+            "runs": seen,
+            "records": records,
+            "findings": findings,
+        }
+
+    def first_seen(self, since: Optional[str] = None) -> List[Dict[str, object]]:
+        """Hosts with their first/last run; only those first seen at or after `since` if given."""
+        q = _SPANS + " GROUP BY h.host"
+        args: tuple = ()
+        if since:
+            q += " HAVING first >= ?"
+            args = (since,)
+        with self._lock:
+            rows = self._db.execute(q + " ORDER BY first, h.host", args).fetchall()
+        return [{"host": h, "first_seen": f, "last_seen": l, "runs_seen": n} for h, f, l, n in rows]
+
+    def flapped(self) -> List[Dict[str, object]]:
+        """Hosts missing from at least one run between their first and last sighting."""
+        q = f"""
+            WITH spans AS ({_SPANS} GROUP BY h.host)
+            SELECT s.host, s.first, s.last, s.seen,
+                   (SELECT COUNT(*) FROM runs WHERE name BETWEEN s.first AND s.last) AS span
+            FROM spans s
+            WHERE s.seen < span
+            ORDER BY s.host
+        """
+        with self._lock:
+            rows = self._db.execute(q).fetchall()
+        return [
+            {"host": h, "first_seen": f, "last_seen": l, "runs_seen": n, "runs_missed": span - n}
+            for h, f, l, n, span in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def history_path(out_dir: Path) -> Path:
+    return out_dir / "history.sqlite"
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import time
+import zlib
+
+from .inventory import Inventory
+from .modules.dns_planner import HostResult
+from .utils import find_artifact, iter_artifact
+
+# `recon monitor`: the last run's inventory per output directory (one per scheduled scope),
+# kept so that scope's next cycle does not read it back from disk
+_KEEP = False
+_LAST: Dict[Path, Tuple[Path, Inventory]] = {}
+
+
+def keep_last(on: bool = True) -> None:
+    global _KEEP
+    _KEEP = on
+    _LAST.clear()
+
+
+def remember(run_dir: Path, inventory: Inventory) -> None:
+    """Offer a finished run's inventory to the next CarryForward (only after keep_last())."""
+    if _KEEP:
+        _LAST[run_dir.parent] = (run_dir, inventory)
+
+
+class CarryForward:
+    """
+    Decides, host by host, whether an incremental run must resolve a host again or can
+    carry the previous run's answer forward. A host is resolved when it is
+
+      new       not in the previous run's dns_records
+      expired   resolved_at + ttl has passed (or the previous run did not record a TTL)
+      sampled   in this run's slice of the rotating sample (see below)
+
+    and carried otherwise. The sample re-checks about `sample` of the carried hosts per
+    run, in rotation: host slot = crc32(host) % period, with period = round(1 / sample),
+    and run `slot` (e.g. the run's index) re-checks the hosts in slot `slot % period`, so
+    every host is re-resolved at least once every `period` runs even with long TTLs.
+    """
+
+    def __init__(self, prev_run: Path, sample: float = 0.0, slot: int = 0, now: Optional[float] = None):
+        self.prev_run = prev_run.name
+        self.now = time.time() if now is None else now
+        self.period = max(1, round(1 / sample)) if sample > 0 else 0
+        self.slot = slot % self.period if self.period else 0
+        self.counts: Counter = Counter()
+        self._prev: Dict[str, dict] = {}
+        # kept inventory of the same run: host -> entry index, items unpacked on demand
+        kept_run, kept = _LAST.get(prev_run.parent, (None, None))
+        self._inventory = kept if kept_run == prev_run else None
+        self._index: Dict[str, int] = {}
+        if self._inventory is not None:
+            self._index = {self._inventory.host(i).lower(): i for i in range(len(self._inventory))}
+            return
+        path = find_artifact(prev_run / "artifacts", "dns_records")
+        if path is not None:
+            for item in iter_artifact(path):
+                if isinstance(item, dict) and item.get("host"):
+                    self._prev[str(item["host"]).lower()] = item
+
+    def __len__(self) -> int:
+        return len(self._index) if self._inventory is not None else len(self._prev)
+
+    def _item(self, host: str) -> Optional[dict]:
+        if self._inventory is not None:
+            i = self._index.get(host)
+            return None if i is None else self._inventory.item(i)
+        return self._prev.get(host)
+
+    def origin(self, host: str) -> str:
+        """Run that actually resolved a carried host (carried answers keep their first origin)."""
+        item = self._item(host) or {}
+        return item.get("carried_from") or self.prev_run
+
+    def carry(self, host: str) -> Optional[HostResult]:
+        """The previous result to reuse for `host`, or None if it must be resolved."""
+        item = self._item(host)
+        if item is None:
+            self.counts["new"] += 1
+            return None
+        ttl, at = item.get("ttl"), item.get("resolved_at")
+        if ttl is None or at is None or at + ttl <= self.now:
+            self.counts["expired"] += 1
+            return None
+        if self.period and zlib.crc32(host.encode()) % self.period == self.slot:
+            self.counts["sampled"] += 1
+            return None
+        self.counts["carried"] += 1
+        return HostResult(item.get("records") or {}, bool(item.get("wildcard")), ttl=ttl, resolved_at=at)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+import socket
+import sys
+
+# record types with a column of their own, in summary order; A/AAAA values are packed
+RTYPES = ("A", "AAAA", "CNAME", "MX", "TXT", "NS")
+_BIT = {rt: 1 << i for i, rt in enumerate(RTYPES)}
+_WILDCARD = 1
+
+
+class HostList:
+    """
+    Sorted, de-duplicated host names in one bytes blob plus an offsets array (about
+    len(name) + 8 bytes per host instead of a str object and a list slot).
+    Sequence-like: len(), iteration, indexing and `in` (binary search).
+    """
+
+    __slots__ = ("_blob", "_off")
+
+    def __init__(self, hosts: Iterable[str] = ()):
+        blob = bytearray()
+        off = array("Q", [0])
+        last = None
+        for h in hosts if isinstance(hosts, HostList) else sorted(set(hosts)):
+            if h == last:
+                continue
+            blob += h.encode("utf-8")
+            off.append(len(blob))
+            last = h
+        self._blob = bytes(blob)
+        self._off = off
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def _key(self, i: int) -> bytes:
+        return self._blob[self._off[i]:self._off[i + 1]]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._key(i).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        blob, off = self._blob, self._off
+        for i in range(len(off) - 1):
+            yield blob[off[i]:off[i + 1]].decode("utf-8")
+
+    def __contains__(self, host: object) -> bool:
+        if not isinstance(host, str):
+            return False
+        key = host.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(self) and self._key(lo) == key
+
+
+def _pack(rtype: str, values: List[str]) -> Optional[bytes]:
+    """A/AAAA values as 4/16-byte addresses, or None if any would not read back verbatim."""
+    family = socket.AF_INET if rtype == "A" else socket.AF_INET6
+    out = bytearray()
+    for v in values:
+        try:
+            b = socket.inet_pton(family, v)
+        except (OSError, ValueError):
+            return None
+        if socket.inet_ntop(family, b) != v:
+            return None
+        out += b
+    return bytes(out)
+
+
+class Inventory:
+    """
+    Column store for the DNS inventory of a run: one entry per host, kept in typed
+    arrays instead of a dict (records dict, value lists, strings) per host.
+
+      names       one bytes blob + offsets
+      A / AAAA    packed 4 / 16-byte addresses
+      CNAME/MX/…  ids into a table of interned strings (targets, MX and NS repeat a lot)
+      ttl etc.    int arrays; carried_from / failed / odd values are sparse dicts
+
+    add() takes the dns_records item shape ({"host", "records", "ttl", …}); iterating
+    gives the same items back, one at a time, in host order once sort() was called.
+    """
+
+    def __init__(self):
+        self._names = bytearray()
+        self._name_off = array("Q", [0])
+        self._mask = array("B")  # which RTYPES are present
+        self._flags = array("B")
+        self._ttl = array("q")  # -1: none
+        self._at = array("q")  # resolved_at, -1: none
+        self._count = array("I")  # values per present rtype, in RTYPES order
+        self._count_start = array("Q")
+        self._ip4 = bytearray()
+        self._ip4_start = array("Q")
+        self._ip6 = bytearray()
+        self._ip6_start = array("Q")
+        self._vals = array("I")  # string ids for CNAME/MX/TXT/NS
+        self._vals_start = array("Q")
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._extra: Dict[int, dict] = {}  # index -> rare keys (carried_from, failed, unpackable records)
+        self._order: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self._mask)
+
+    def _intern(self, s: str) -> int:
+        sid = self._string_ids.get(s)
+        if sid is None:
+            sid = self._string_ids[s] = len(self._strings)
+            self._strings.append(sys.intern(s))
+        return sid
+
+    def add(self, item: dict) -> None:
+        i = len(self._mask)
+        self._names += str(item["host"]).encode("utf-8")
+        self._name_off.append(len(self._names))
+        self._flags.append(_WILDCARD if item.get("wildcard") else 0)
+        ttl, at = item.get("ttl"), item.get("resolved_at")
+        self._ttl.append(-1 if ttl is None else int(ttl))
+        self._at.append(-1 if at is None else int(at))
+        self._count_start.append(len(self._count))
+        self._ip4_start.append(len(self._ip4))
+        self._ip6_start.append(len(self._ip6))
+        self._vals_start.append(len(self._vals))
+
+        extra: Dict[str, object] = {}
+        odd: Dict[str, List[str]] = {}
+        mask = 0
+        for rtype, values in (item.get("records") or {}).items():
+            values = [str(v) for v in values or []]
+            if rtype not in _BIT or not values:
+                odd[rtype] = values
+                continue
+            if rtype in ("A", "AAAA"):
+                packed = _pack(rtype, values)
+                if packed is None:
+                    odd[rtype] = values
+                    continue
+                (self._ip4 if rtype == "A" else self._ip6).extend(packed)
+            else:
+                self._vals.extend(self._intern(v) for v in values)
+            mask |= _BIT[rtype]
+        # counts go in RTYPES order so they can be read back without per-host keys
+        records = item.get("records") or {}
+        for rtype in RTYPES:
+            if mask & _BIT[rtype]:
+                self._count.append(len(records[rtype]))
+        self._mask.append(mask)
+
+        if odd:
+            extra["records"] = odd
+        for key in ("carried_from", "failed"):
+            if item.get(key):
+                extra[key] = item[key]
+        if extra:
+            self._extra[i] = extra
+        self._order = None
+
+    def host(self, i: int) -> str:
+        return self._names[self._name_off[i]:self._name_off[i + 1]].decode("utf-8")
+
+    def records(self, i: int) -> Dict[str, List[str]]:
+        mask = self._mask[i]
+        out: Dict[str, List[str]] = {}
+        c = self._count_start[i]
+        ip4, ip6, v = self._ip4_start[i], self._ip6_start[i], self._vals_start[i]
+        for rtype in RTYPES:
+            if not mask & _BIT[rtype]:
+                continue
+            n = self._count[c]
+            c += 1
+            if rtype == "A":
+                out[rtype] = [socket.inet_ntop(socket.AF_INET, self._ip4[ip4 + 4 * k:ip4 + 4 * k + 4]) for k in range(n)]
+                ip4 += 4 * n
+            elif rtype == "AAAA":
+                out[rtype] = [socket.inet_ntop(socket.AF_INET6, self._ip6[ip6 + 16 * k:ip6 + 16 * k + 16]) for k in range(n)]
+                ip6 += 16 * n
+            else:
+                out[rtype] = [self._strings[s] for s in self._vals[v:v + n]]
+                v += n
+        odd = self._extra.get(i, {}).get("records")
+        if odd:
+            out.update(odd)
+        return out
+
+    def item(self, i: int) -> dict:
+        """Entry i in the dns_records shape."""
+        out: Dict[str, object] = {"host": self.host(i), "records": self.records(i)}
+        if self._ttl[i] >= 0:
+            out["ttl"] = self._ttl[i]
+        out["resolved_at"] = self._at[i] if self._at[i] >= 0 else None
+        extra = self._extra.get(i)
+        if extra:
+            for key in ("carried_from", "failed"):
+                if key in extra:
+                    out[key] = extra[key]
+        if self._flags[i] & _WILDCARD:
+            out["wildcard"] = True
+        return out
+
+    def sort(self) -> None:
+        """Iterate in host order from now on (the entries themselves do not move)."""
+        names, off = self._names, self._name_off
+        self._order = array("Q", sorted(range(len(self)), key=lambda i: names[off[i]:off[i + 1]]))
+
+    def indices(self) -> Iterable[int]:
+        return self._order if self._order is not None else range(len(self))
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in self.indices():
+            yield self.item(i)
+
+    def summary(self, i: int) -> str:
+        """'A:2, CNAME:1' style line for the casefile, without unpacking values."""
+        mask = self._mask[i]
+        counts: Dict[str, int] = {}
+        c = self._count_start[i]
+        for rtype in RTYPES:
+            if mask & _BIT[rtype]:
+                counts[rtype] = self._count[c]
+                c += 1
+        for rtype, values in (self._extra.get(i, {}).get("records") or {}).items():
+            counts[rtype] = len(values)
+        bits = [f"{rt}:{counts[rt]}" for rt in RTYPES if counts.get(rt)]
+        line = ", ".join(bits) if bits else "(no records)"
+        if self._flags[i] & _WILDCARD:
+            line += " (wildcard answer)"
+        return line
+
+    def iter_summary(self) -> Iterator[Dict[str, str]]:
+        """{"host", "records_summary"} per entry, for the casefile inventory."""
+        for i in self.indices():
+            yield {"host": self.host(i), "records_summary": self.summary(i)}
+
+    def nbytes(self) -> int:
+        """Approximate payload size (arrays and blobs; string table excluded)."""
+        cols = (
+            self._names, self._name_off, self._mask, self._flags, self._ttl, self._at, self._count,
+            self._count_start, self._ip4, self._ip4_start, self._ip6, self._ip6_start, self._vals, self._vals_start,
+        )
+        return sum(len(c) * getattr(c, "itemsize", 1) for c in cols)
+
+
+class SummaryView:
+    """Sized, lazily iterated casefile inventory (what render.write_casefile pages through)."""
+
+    __slots__ = ("_inv",)
+
+    def __init__(self, inventory: Inventory):
+        self._inv = inventory
+
+    def __len__(self) -> int:
+        return len(self._inv)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return self._inv.iter_summary()
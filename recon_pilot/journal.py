@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import logging
+import threading
+
+from .modules.dns_planner import HostResult
+
+JOURNAL_NAME = "journal.ndjson"
+
+
+@dataclass
+class JournalState:
+    """What an interrupted run had finished, replayed from its journal."""
+    scope: Optional[dict] = None
+    ct: Dict[str, List[str]] = field(default_factory=dict)
+    hosts: Dict[str, HostResult] = field(default_factory=dict)
+    done: bool = False  # journals written before completion removed them
+
+
+class Journal:
+    """
+    Append-only checkpoint log of a run (run_dir/journal.ndjson), one JSON entry per line:
+
+      {"t": "start", "scope": {...}}                    run began (scope as data)
+      {"t": "ct", "domain", "hosts", "status"}          CT fetched for a scope domain
+                                                        (status "ok"; failures are not done)
+      {"t": "host", "host", "records", "wildcard",     DNS finished for a host ("failed"
+       "ttl", "resolved_at"[, "failed"]}                only when a lookup failed)
+
+    Every entry is flushed as it is written, so a killed run loses at most the line in
+    progress; load() ignores a truncated last line. Safe to write from several threads.
+    A completed run has its artifacts, so finish() removes the journal.
+    """
+
+    def __init__(self, run_dir: Path):
+        self.path = run_dir / JOURNAL_NAME
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def _write(self, entry: dict) -> None:
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if not self._f.closed:
+                self._f.write(line)
+
+    def start(self, scope: dict) -> None:
+        self._write({"t": "start", "scope": scope})
+
+    def ct(self, domain: str, hosts: List[str], status: str) -> None:
+        self._write({"t": "ct", "domain": domain, "hosts": hosts, "status": status})
+
+    def host(self, host: str, result: HostResult) -> None:
+        self._write({
+            "t": "host", "host": host, "records": result.records, "wildcard": result.wildcard,
+            "ttl": result.ttl, "resolved_at": result.resolved_at,
+            **({"failed": result.failed} if result.failed else {}),
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+    def finish(self) -> None:
+        """The run completed: close and delete the journal (the artifacts hold it all)."""
+        self.close()
+        try:
+            self.path.unlink()
+        except OSError as e:
+            logging.debug(f"Journal: could not remove {self.path}: {e}")
+
+    @staticmethod
+    def load(run_dir: Path) -> JournalState:
+        """Replay run_dir/journal.ndjson (empty state if there is none)."""
+        state = JournalState()
+        path = run_dir / JOURNAL_NAME
+        if not path.exists():
+            return state
+        with open(path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    logging.debug(f"Journal: skipping unreadable line {n} of {path}")
+                    continue
+                t = e.get("t")
+                if t == "start":
+                    state.scope = state.scope or e.get("scope")
+                elif t == "ct":
+                    if e.get("status", "ok") == "ok":  # a failed fetch is fetched again
+                        state.ct[e["domain"]] = e.get("hosts") or []
+                elif t == "host":
+                    state.hosts[e["host"]] = HostResult(
+                        e.get("records") or {}, bool(e.get("wildcard")),
+                        ttl=e.get("ttl"), resolved_at=e.get("resolved_at"), failed=e.get("failed") or {},
+                    )
+                elif t == "done":
+                    state.done = True
+        return state
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+# DNS/HTTP latency buckets (seconds); +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        out, total = [], 0
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        q-quantile, interpolated linearly inside its bucket (as Prometheus'
+        histogram_quantile does); the last bound if it lies beyond it, None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for le, c in zip(self.buckets, self.cumulative()):
+            if c >= rank:
+                inside = c - below
+                return round(lower + (le - lower) * ((rank - below) / inside if inside else 1.0), 6)
+            lower, below = le, c
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Process-wide run instrumentation (thread-safe): phase wall/CPU time, counters,
+    gauges and latency histograms, keyed by name + labels. reset() starts a new run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.phases: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[Tuple[str, Labels], float] = {}
+            self.gauges: Dict[Tuple[str, Labels], float] = {}
+            self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    @staticmethod
+    def clock() -> Tuple[float, float]:
+        """(wall, process CPU) now; hand it to end_phase() later."""
+        return time.perf_counter(), time.process_time()
+
+    def end_phase(self, name: str, started: Tuple[float, float]) -> None:
+        wall, cpu = started
+        self.record_phase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block: wall clock and process CPU (CPU overlaps when phases run concurrently)."""
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.end_phase(name, started)
+
+    def record_phase(self, name: str, wall_s: float, cpu_s: float) -> None:
+        with self._lock:
+            p = self.phases.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            p["wall_s"] += wall_s
+            p["cpu_s"] += cpu_s
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram()
+            h.observe(value)
+
+    def counter(self, name: str, **match) -> float:
+        """Sum of a counter over every label set that includes `match`."""
+        want = set(_labels(match))
+        with self._lock:
+            return sum(v for (n, labels), v in self.counters.items() if n == name and want <= set(labels))
+
+    def snapshot(self) -> dict:
+        """Plain-data view for metrics.json."""
+        def _named(items):
+            out: Dict[str, List[dict]] = {}
+            for (name, labels), value in sorted(items, key=lambda kv: kv[0]):
+                out.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            return out
+
+        with self._lock:
+            hist: Dict[str, List[dict]] = {}
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                hist.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                    "buckets": {str(le): c for le, c in zip(h.buckets, h.cumulative())},
+                })
+            return {
+                "phases": {k: {m: round(v, 3) for m, v in p.items()} for k, p in self.phases.items()},
+                "counters": _named(self.counters.items()),
+                "gauges": _named(self.gauges.items()),
+                "histograms": hist,
+            }
+
+    def to_prometheus(self, prefix: str = "recon_") -> str:
+        """Prometheus text exposition (for node_exporter's textfile collector)."""
+        def _fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            lines.append(f"# TYPE {prefix}phase_wall_seconds gauge")
+            for name, p in sorted(self.phases.items()):
+                lines.append(f'{prefix}phase_wall_seconds{{phase="{name}"}} {p["wall_s"]:.6f}')
+            lines.append(f"# TYPE {prefix}phase_cpu_seconds gauge")
+            for name, p in sorted(self.phases.items()):
+                lines.append(f'{prefix}phase_cpu_seconds{{phase="{name}"}} {p["cpu_s"]:.6f}')
+
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                seen = set()
+                for (name, labels), value in sorted(items.items(), key=lambda kv: kv[0]):
+                    if name not in seen:
+                        lines.append(f"# TYPE {prefix}{name} {kind}")
+                        seen.add(name)
+                    lines.append(f"{prefix}{name}{_fmt(labels)} {value:g}")
+
+            seen = set()
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                if name not in seen:
+                    lines.append(f"# TYPE {prefix}{name} histogram")
+                    seen.add(name)
+                for le, c in zip(h.buckets, h.cumulative()):
+                    lines.append(f"{prefix}{name}_bucket{_fmt(labels, (('le', f'{le:g}'),))} {c}")
+                lines.append(f"{prefix}{name}_bucket{_fmt(labels, (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{prefix}{name}_sum{_fmt(labels)} {h.sum:.6f}")
+                lines.append(f"{prefix}{name}_count{_fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process (None where the platform cannot tell)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return int(rss if sys.platform == "darwin" else rss * 1024)
+
+
+def write_textfile(path: Path, text: str) -> None:
+    """Atomic write, so the textfile collector never scrapes a half-written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+# one registry per process; the CLI resets it at the start of each run
+METRICS = Metrics()
@@ -1,20 +1,89 @@
-from typing import List, Set
-import requests, os, time
+from typing import Iterator, Optional, Set
+import requests, os, threading, time
+from requests.adapters import HTTPAdapter
+
+from ..metrics import METRICS
+from ..utils import iter_json_array
 
 # Query for all subdomains of {domain}
-CRT_URL = "https://crt.sh/?q=%25.{domain}&output=json"
+CRT_URL = os.getenv("RECON_CT_URL", "https://crt.sh/?q=%25.{domain}&output=json")
+
+# bytes per read from the response stream; only one chunk + one row is held at a time
+CHUNK_SIZE = 64 * 1024
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+class CTHTTPError(Exception):
+    """crt.sh answered with a non-200 status."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"crt.sh returned HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
 
+def _ua() -> str:
+    return os.getenv("RECON_CT_UA", "ReconPilot/0.2 (+https://example.invalid)")
 
-def fetch_ct_domains(domain: str, delay: float = 1.0) -> List[str]:
+
+def get_session() -> requests.Session:
+    """
+    Process-wide HTTP session: keeps TLS connections to crt.sh alive between domains
+    and always negotiates gzip (requests decodes it transparently while streaming).
     """
-    Fetch subdomains from crt.sh for a given base domain.
-    Returns a list of unique, lowercased FQDNs.
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": _ua(), "Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+            _SESSION = s
+    return _SESSION
+
+
+def _retry_after(r: requests.Response) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
 
-    Resilience:
-      - Retries on timeouts / transient network errors.
-      - Treats non-JSON or non-200 responses as empty (keeps the run going).
 
-    Tunables via environment (no code changes needed):
+def _counted(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    for chunk in chunks:
+        METRICS.inc("ct_bytes_total", len(chunk))
+        yield chunk
+
+
+def _stream_rows(domain: str, timeout: float, exclude_expired: bool = False) -> Iterator[dict]:
+    url = CRT_URL.format(domain=domain)
+    if exclude_expired:
+        url += ("&" if "?" in url else "?") + "exclude=expired"
+    started = time.perf_counter()
+    with get_session().get(url, timeout=timeout, stream=True) as r:
+        METRICS.inc("ct_requests_total", status=r.status_code)
+        METRICS.observe("ct_response_seconds", time.perf_counter() - started)
+        if r.status_code != 200:
+            raise CTHTTPError(r.status_code, _retry_after(r))
+        # ct_bytes_total counts decoded JSON (after any gzip transfer encoding)
+        for row in iter_json_array(_counted(r.iter_content(chunk_size=CHUNK_SIZE))):
+            if isinstance(row, dict):
+                METRICS.inc("ct_rows_total")
+                yield row
+
+
+def iter_ct_rows(domain: str, strict: bool = False, exclude_expired: bool = False) -> Iterator[dict]:
+    """
+    Stream crt.sh JSON rows for a base domain without loading the response into memory.
+    Transient network errors restart the request, so rows may repeat after a restart;
+    once retries run out the stream just ends, unless `strict` re-raises the error.
+    `exclude_expired` asks crt.sh for unexpired certificates only (a much smaller answer).
+    Raises CTHTTPError on non-200 and ValueError on non-JSON bodies.
+
+    Tunables via environment:
       RECON_CT_TIMEOUT   seconds per request     (default: 30)
       RECON_CT_RETRIES   extra retry attempts    (default: 1)  # total attempts = retries + 1
       RECON_CT_SLEEP     seconds between retries (default: 1.0)
@@ -23,40 +92,11 @@ def fetch_ct_domains(domain: str, delay: float = 1.0) -> List[str]:
     timeout = int(os.getenv("RECON_CT_TIMEOUT", "30"))
     retries = int(os.getenv("RECON_CT_RETRIES", "1"))
     sleep_s = float(os.getenv("RECON_CT_SLEEP", "1.0"))
-    ua = os.getenv("RECON_CT_UA", "ReconPilot/0.2 (+https://example.invalid)")
-
-    url = CRT_URL.format(domain=domain)
 
     for attempt in range(retries + 1):
         try:
-            r = requests.get(url, timeout=timeout, headers={"User-Agent": ua})
-            if r.status_code != 200:
-                return []
-            try:
-                data = r.json()
-            except Exception:
-                # crt.sh can serve HTML or broken JSON under load; treat as empty
-                return []
-
-            names: Set[str] = set()
-            for row in data:
-                # both fields can contain names; split lines to flatten
-                for key in ("name_value", "common_name"):
-                    v = row.get(key, "") or ""
-                    for line in str(v).splitlines():
-                        s = line.strip().lower()
-                        if not s:
-                            continue
-                        # drop wildcard prefix; skip bare base domain
-                        if s.startswith("*."):
-                            s = s[2:]
-                        if s and s != domain:
-                            names.add(s)
-
-            # polite pause between domain queries (not related to retry backoff)
-            time.sleep(delay)
-            return sorted(names)
-
+            yield from _stream_rows(domain, timeout, exclude_expired)
+            return
         except (
             requests.exceptions.ReadTimeout,
             requests.exceptions.ConnectionError,
@@ -66,5 +106,35 @@ def fetch_ct_domains(domain: str, delay: float = 1.0) -> List[str]:
             if attempt < retries:
                 time.sleep(sleep_s * (attempt + 1))  # simple linear backoff
                 continue
-            return []
+            if strict:
+                raise
+            return
 
+
+def row_names(row: dict, domain: str) -> Iterator[str]:
+    """Cleaned names from one crt.sh row (both fields, one pass)."""
+    for key in ("name_value", "common_name"):
+        v = row.get(key, "") or ""
+        for line in str(v).splitlines():
+            s = line.strip().lower()
+            if not s:
+                continue
+            # drop wildcard prefix; skip bare base domain
+            if s.startswith("*."):
+                s = s[2:]
+            if s and s != domain:
+                yield s
+
+
+def iter_ct_names(domain: str, strict: bool = False) -> Iterator[str]:
+    """
+    Yield unique, lowercased FQDNs for `domain` as they appear in the crt.sh stream.
+    CTHTTPError / ValueError propagate so callers can decide how to degrade; with
+    `strict`, so do network errors that outlast the retries (see iter_ct_rows).
+    """
+    seen: Set[str] = set()
+    for row in iter_ct_rows(domain, strict=strict):
+        for name in row_names(row, domain):
+            if name not in seen:
+                seen.add(name)
+                yield name
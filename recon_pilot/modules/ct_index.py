@@ -0,0 +1,142 @@
+from pathlib import Path
+from typing import Iterable, List, Tuple
+import logging
+import sqlite3
+import threading
+import time
+
+from .ct import iter_ct_rows, row_names
+from ..utils import cache_dir
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS certs (
+        domain     TEXT NOT NULL,
+        cert_id    INTEGER NOT NULL,
+        not_before TEXT,
+        PRIMARY KEY (domain, cert_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS names (
+        domain  TEXT NOT NULL,
+        name    TEXT NOT NULL,
+        cert_id INTEGER NOT NULL,
+        PRIMARY KEY (domain, name, cert_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fetches (
+        domain     TEXT PRIMARY KEY,
+        fetched_at REAL NOT NULL,
+        max_id     INTEGER NOT NULL
+    )
+    """,
+)
+
+# rows buffered before one executemany/commit
+BATCH = 2000
+
+
+class CTIndex:
+    """
+    Local certificate index (SQLite): cert id, not_before and names per base domain,
+    deduplicated by certificate id.
+
+    update(domain) streams crt.sh and stores only certificates above the highest id
+    already indexed for that domain (after the first pull, only unexpired certificates
+    are requested); names(domain) replays the index with no network.
+    Safe to share between the CT scheduler's worker threads.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self._db.execute(stmt)
+        self._lock = threading.Lock()
+
+    def max_id(self, domain: str) -> int:
+        """High-water mark: highest cert id seen by the last *complete* fetch of `domain`."""
+        with self._lock:
+            row = self._db.execute("SELECT max_id FROM fetches WHERE domain=?", (domain,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _insert(self, certs: List[Tuple], names: List[Tuple]) -> None:
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO certs VALUES (?, ?, ?)", certs)
+            self._db.executemany("INSERT OR IGNORE INTO names VALUES (?, ?, ?)", names)
+            self._db.commit()
+
+    def add_rows(self, domain: str, rows: Iterable[dict], above: int = 0) -> int:
+        """
+        Index crt.sh rows with id > `above`; returns how many certificates were new.
+        The high-water mark only moves once `rows` is exhausted, so the delta of an
+        interrupted stream is read again next time (rows already stored are ignored).
+        """
+        certs: List[Tuple] = []
+        names: List[Tuple] = []
+        added = 0
+        top = above
+        for row in rows:
+            try:
+                cert_id = int(row.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if cert_id <= above:
+                continue
+            top = max(top, cert_id)
+            certs.append((domain, cert_id, row.get("not_before")))
+            names.extend((domain, n, cert_id) for n in set(row_names(row, domain)))
+            if len(certs) >= BATCH:
+                self._insert(certs, names)
+                added += len(certs)
+                certs, names = [], []
+        if certs:
+            self._insert(certs, names)
+            added += len(certs)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fetches VALUES (?, ?, ?)", (domain, time.time(), top)
+            )
+            self._db.commit()
+        return added
+
+    def update(self, domain: str) -> int:
+        """
+        Pull the delta for `domain` from crt.sh. The crt.sh JSON API has no id or date
+        filter, so rows at or below the high-water mark are skipped while streaming.
+        Once the domain is indexed, expired certificates are excluded from the request:
+        the first pull stored them, and a new certificate is rarely expired already.
+        CTHTTPError / ValueError / network errors propagate.
+        """
+        above = self.max_id(domain)
+        return self.add_rows(domain, iter_ct_rows(domain, strict=True, exclude_expired=above > 0), above)
+
+    def fetch(self, domain: str) -> List[str]:
+        """Merge the crt.sh delta into the index and return every indexed name for `domain`."""
+        added = self.update(domain)
+        logging.debug(f"CT index: +{added} new certificate(s) for {domain}")
+        return self.names(domain)
+
+    def has(self, domain: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM fetches WHERE domain=?", (domain,)).fetchone() is not None
+
+    def names(self, domain: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT name FROM names WHERE domain=? ORDER BY name", (domain,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def default_index_path() -> Path:
+    return cache_dir() / "ct_index.sqlite"
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging, os, random, threading, time
+import requests
+
+from .ct import CTHTTPError, iter_ct_names
+
+# statuses that mean "slow down", not "no data"
+THROTTLE_STATUSES = (429, 502, 503, 504)
+
+
+class RateLimiter:
+    """Spaces request starts at most `rps` per second across all threads (0 = unlimited)."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def penalize(self, seconds: float) -> None:
+        """Push every thread's next start back (server asked us to slow down)."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def fetch_names(domain: str) -> List[str]:
+    # strict: a stream cut off by the network is a failed fetch (retried / index fallback),
+    # not an "ok" with whatever names arrived before the break
+    return sorted(set(iter_ct_names(domain, strict=True)))
+
+
+def _fetch_with_backoff(
+    domain: str,
+    fetch: Callable[[str], List[str]],
+    limiter: RateLimiter,
+    attempts: int,
+    backoff: float,
+) -> Tuple[List[str], str]:
+    for attempt in range(1, attempts + 1):
+        limiter.acquire()
+        try:
+            return fetch(domain), "ok"
+        except CTHTTPError as e:
+            if e.status not in THROTTLE_STATUSES:
+                return [], f"HTTP {e.status}"
+            if attempt == attempts:
+                return [], f"HTTP {e.status} after {attempts} attempt(s)"
+            wait = e.retry_after if e.retry_after is not None else backoff * (2 ** (attempt - 1))
+            wait *= random.uniform(1.0, 1.25)  # jitter so workers do not retry in lockstep
+            logging.debug(f"CT: crt.sh {e.status} for {domain}; backing off {wait:.1f}s (attempt {attempt}/{attempts})")
+            limiter.penalize(wait)
+        except ValueError:
+            # crt.sh can serve HTML or broken JSON under load
+            return [], "non-JSON response"
+        except requests.exceptions.RequestException as e:
+            return [], f"network error: {type(e).__name__}"
+    return [], "gave up"
+
+
+def collect_ct(
+    domains: Iterable[str],
+    workers: int = 1,
+    rps: float = 1.0,
+    on_result: Optional[Callable[[str, List[str], str], None]] = None,
+    fetch: Callable[[str], List[str]] = fetch_names,
+    fallback: Optional[Callable[[str], List[str]]] = None,
+) -> Dict[str, List[str]]:
+    """
+    Fetch CT names for several base domains concurrently.
+
+      workers  concurrent crt.sh requests (cap)
+      rps      request starts per second across all workers (politeness budget)
+
+    Throttling answers (429/502/503/504) are retried with exponential backoff
+    (Retry-After is honoured) instead of being treated as "no names".
+    `on_result(domain, names, status)` is called on the calling thread as each
+    domain finishes; status is "ok" or a short reason the fetch failed.
+
+    `fetch(domain)` returns the names (default: stream crt.sh); when it fails,
+    `fallback(domain)` (e.g. a local index) supplies the names instead of [].
+
+    Tunables via environment:
+      RECON_CT_ATTEMPTS  attempts per domain when throttled (default: 5)
+      RECON_CT_BACKOFF   first backoff in seconds, doubled per attempt (default: 5)
+    """
+    attempts = max(1, int(os.getenv("RECON_CT_ATTEMPTS", "5")))
+    backoff = float(os.getenv("RECON_CT_BACKOFF", "5"))
+    limiter = RateLimiter(rps)
+    domains = list(domains)
+    results: Dict[str, List[str]] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = {ex.submit(_fetch_with_backoff, d, fetch, limiter, attempts, backoff): d for d in domains}
+        for done, fut in enumerate(as_completed(futures), 1):
+            domain = futures[fut]
+            names, status = fut.result()
+            if status != "ok" and fallback is not None:
+                names = fallback(domain)
+                status += "; using local index"
+            results[domain] = names
+            if on_result:
+                on_result(domain, names, status)
+            logging.debug(f"CT progress: {done}/{len(domains)} domains")
+    return results
@@ -0,0 +1,254 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+
+from .ct_index import CTIndex
+from .ct_scheduler import collect_ct, fetch_names
+from ..utils import cache_dir, external_sort
+
+
+class CTSource(ABC):
+    """
+    Where CT names come from. `names(domain)` returns the unique names under a base
+    domain (it may raise CTHTTPError / ValueError / network errors, which the CT
+    scheduler turns into backoff or an empty result).
+
+      remote    True if requests should go through the politeness budget
+      fallback  optional names(domain) used when `names` fails
+    """
+    label = "ct"
+    remote = False
+    fallback: Optional[Callable[[str], List[str]]] = None
+
+    @abstractmethod
+    def names(self, domain: str) -> List[str]:
+        ...
+
+    def collect(
+        self,
+        domains: Sequence[str],
+        workers: int = 1,
+        rps: float = 1.0,
+        on_result: Optional[Callable[[str, List[str], str], None]] = None,
+    ) -> Dict[str, List[str]]:
+        """All domains through the CT scheduler; local sources skip the politeness budget."""
+        if not self.remote:
+            workers, rps = 1, 0
+        return collect_ct(domains, workers, rps, on_result, fetch=self.names, fallback=self.fallback)
+
+    def close(self) -> None:
+        pass
+
+
+class CrtShSource(CTSource):
+    label = "crt.sh"
+    remote = True
+
+    def names(self, domain: str) -> List[str]:
+        return fetch_names(domain)
+
+
+class IndexSource(CTSource):
+    """crt.sh through the local certificate index (delta fetch), or the index alone when offline."""
+
+    def __init__(self, index: CTIndex, offline: bool = False):
+        self.index = index
+        self.offline = offline
+        self.remote = not offline
+        self.label = f"local index {index.path}" if offline else "crt.sh (indexed)"
+        self.fallback = None if offline else index.names
+
+    def names(self, domain: str) -> List[str]:
+        return self.index.names(domain) if self.offline else self.index.fetch(domain)
+
+    def close(self) -> None:
+        self.index.close()
+
+
+# --- bulk dumps ---
+
+# fields that may carry names in JSONL/CSV dumps (crt.sh export columns first)
+NAME_FIELDS = ("name_value", "common_name", "name", "names", "domain", "dns_names", "san")
+
+
+def _open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def _values(v) -> Iterator[str]:
+    if isinstance(v, list):
+        for x in v:
+            yield from _values(x)
+    elif v:
+        yield from str(v).splitlines()
+
+
+def _clean(name: str) -> str:
+    s = name.strip().strip(".").lower()
+    return s[2:] if s.startswith("*.") else s
+
+
+def iter_dump_names(path: Path) -> Iterator[str]:
+    """Names from one JSONL or CSV dump (optionally .gz); unparseable lines are skipped."""
+    kind = path.suffixes[-2] if path.suffix == ".gz" and len(path.suffixes) > 1 else path.suffix
+    with _open_text(path) as f:
+        if kind == ".csv":
+            reader = csv.DictReader(f)
+            fields = [c for c in (reader.fieldnames or []) if c in NAME_FIELDS]
+            if not fields:
+                # headerless single-column dump: one name per row
+                f.seek(0)
+                for row in csv.reader(f):
+                    if row:
+                        yield _clean(row[0])
+                return
+            for row in reader:
+                for c in fields:
+                    for v in _values(row.get(c)):
+                        yield _clean(v)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(row, str):
+                yield _clean(row)
+                continue
+            if not isinstance(row, dict):
+                continue
+            for c in NAME_FIELDS:
+                for v in _values(row.get(c)):
+                    yield _clean(v)
+
+
+def reverse_labels(name: str) -> str:
+    """www.example.com -> com.example.www (so every name under a domain sorts together)."""
+    return ".".join(reversed(name.split(".")))
+
+
+class BulkFileSource(CTSource):
+    """
+    Offline CT names from local JSONL/CSV dumps (crt.sh exports or internal mirrors).
+
+    On first use the dumps are flattened once into a sorted, de-duplicated file of
+    reversed-label names (com.example.www). That index is memory-mapped, and
+    "all names under X" becomes a binary search for the contiguous range
+    [rev(X) + ".", rev(X) + "/") because '/' is the byte right after '.'.
+    The index is rebuilt when any dump changes (path, size or mtime).
+    """
+
+    def __init__(self, dumps: Sequence[Path], index_dir: Optional[Path] = None):
+        self.dumps = sorted(Path(p).expanduser().resolve() for p in dumps)
+        self.label = f"{len(self.dumps)} bulk dump(s)"
+        sig = hashlib.sha256(
+            json.dumps([[str(p), p.stat().st_size, p.stat().st_mtime_ns] for p in self.dumps]).encode()
+        ).hexdigest()[:16]
+        self.index_path = (index_dir or cache_dir() / "bulk") / f"{sig}.ridx"
+        if not self.index_path.exists():
+            self._build()
+        self._file = open(self.index_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _build(self) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        logging.info(f"CT bulk: indexing {self.label} → {self.index_path}")
+
+        def _reversed() -> Iterator[str]:
+            for p in self.dumps:
+                for name in iter_dump_names(p):
+                    if name and " " not in name:
+                        yield reverse_labels(name)
+
+        tmp = self.index_path.with_suffix(".tmp")
+        count = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for line in external_sort(_reversed(), unique=True):
+                f.write(line + "\n")
+                count += 1
+        tmp.replace(self.index_path)
+        logging.info(f"CT bulk: {count} unique name(s) indexed.")
+
+    def _lower_bound(self, target: bytes, lo: int = 0) -> int:
+        """Offset of the first line >= target (lines are sorted bytewise)."""
+        mm = self._mm
+        hi = len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b"\n", 0, mid) + 1
+            if start < lo:
+                start = lo
+            end = mm.find(b"\n", start)
+            if end < 0:
+                end = hi
+            if mm[start:end] < target:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _scan(self, start: int, stop: bytes) -> Iterator[str]:
+        mm = self._mm
+        pos, n = start, len(mm)
+        while pos < n:
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = n
+            line = mm[pos:end]
+            if line >= stop:
+                break
+            yield reverse_labels(line.decode("utf-8"))
+            pos = end + 1
+
+    @staticmethod
+    def _bounds(domain: str):
+        key = reverse_labels(_clean(domain)).encode()
+        return key + b".", key + b"/"
+
+    def names(self, domain: str) -> List[str]:
+        if self._mm is None:
+            return []
+        first, stop = self._bounds(domain)
+        return sorted(self._scan(self._lower_bound(first), stop))
+
+    def lookup_many(self, domains: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Answer every domain in one forward pass: domains are visited in order of their
+        range's lower bound (rev + ".", so example-x.com comes before example.com, as in
+        the index) and each search starts where the previous range began.
+        """
+        out: Dict[str, List[str]] = {}
+        lo = 0
+        for d in sorted(set(domains), key=lambda d: self._bounds(d)[0]):
+            if self._mm is None:
+                out[d] = []
+                continue
+            first, stop = self._bounds(d)
+            lo = self._lower_bound(first, lo)
+            out[d] = sorted(self._scan(lo, stop))
+        return out
+
+    def collect(self, domains, workers=1, rps=1.0, on_result=None) -> Dict[str, List[str]]:
+        results = self.lookup_many(domains)
+        for d in domains:
+            if on_result:
+                on_result(d, results[d], "ok")
+        return results
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
@@ -1,20 +1,241 @@
-from typing import Dict, List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import time
+import dns.exception
+import dns.nameserver
+import dns.rdatatype
 import dns.resolver
 
+from .dns_planner import HostResult, WildcardProfile, drive, plan_host, wildcard_for
+from .dns_pool import GOOD, ResolverPool, get_pool
+from ..metrics import METRICS
+
 RECORD_TYPES = ["A","AAAA","CNAME","MX","TXT","NS"]
 
-def query_dns(host: str, resolvers: List[str]) -> Dict[str, List[str]]:
-    results: Dict[str, List[str]] = {}
-    resolver = dns.resolver.Resolver(configure=True)
-    if resolvers:
-        resolver.nameservers = resolvers
-    for rtype in RECORD_TYPES:
-        try:
-            answers = resolver.resolve(host, rtype, lifetime=5)
-            values = []
-            for rr in answers:
-                values.append(str(rr.to_text()))
-            results[rtype] = sorted(values)
-        except Exception:
+# seconds per query (all retries across nameservers included)
+LIFETIME = 5
+# negative answers without an SOA in the authority section
+DEFAULT_NEGATIVE_TTL = 300
+
+_POOL: Dict[Tuple[str, ...], dns.resolver.Resolver] = {}
+_POOL_LOCK = threading.Lock()
+
+# --dns-balance runs each query on a helper thread so a slow one can be hedged
+HEDGE_THREADS = int(os.getenv("RECON_DNS_HEDGE_THREADS", "256"))
+_HEDGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+@dataclass
+class Answer:
+    """
+    Outcome of one (name, rtype) query.
+      status: NOERROR | NXDOMAIN | NOANSWER | TIMEOUT | SERVFAIL | ERROR
+      ttl:    seconds the answer may be reused (0 for failures that must not be cached)
+    """
+    status: str
+    values: List[str] = field(default_factory=list)
+    ttl: int = 0
+    nameserver: str = ""  # server that answered, when known
+
+    @property
+    def cacheable(self) -> bool:
+        return self.status in ("NOERROR", "NXDOMAIN", "NOANSWER") and self.ttl > 0
+
+
+def resolver_key(resolvers: Sequence[str]) -> str:
+    """Stable identity of a resolver set (cache key component)."""
+    return ",".join(sorted(resolvers)) if resolvers else "system"
+
+
+def parse_resolver(spec: str) -> Tuple[str, int]:
+    """'1.1.1.1', '127.0.0.1:5353', '[::1]:5353' or '::1' -> (address, port)."""
+    spec = spec.strip()
+    if spec.startswith("["):
+        addr, _, rest = spec[1:].partition("]")
+        return addr, int(rest[1:]) if rest.startswith(":") else 53
+    if spec.count(":") == 1:
+        addr, port = spec.split(":")
+        return addr, int(port)
+    return spec, 53
+
+
+def configure_nameservers(resolver: dns.resolver.BaseResolver, resolvers: Sequence[str]) -> None:
+    """Point a resolver at `resolvers` (entries may carry a port, see parse_resolver)."""
+    # explicit nameserver objects: nameserver_ports is keyed by address, so it cannot
+    # hold two ports on one host (several local resolvers on 127.0.0.1)
+    resolver.nameservers = [dns.nameserver.Do53Nameserver(addr, port) for addr, port in map(parse_resolver, resolvers)]
+
+
+def get_resolver(resolvers: Sequence[str]) -> dns.resolver.Resolver:
+    """
+    Process-wide resolver per resolver set. System config is read once and
+    dnspython's in-memory cache is shared by every host of the run.
+    Resolver objects are safe to share between threads once configured.
+    """
+    key = tuple(resolvers or ())
+    with _POOL_LOCK:
+        resolver = _POOL.get(key)
+        if resolver is None:
+            resolver = dns.resolver.Resolver(configure=True)
+            if resolvers:
+                configure_nameservers(resolver, resolvers)
+            resolver.cache = dns.resolver.LRUCache()
+            _POOL[key] = resolver
+    return resolver
+
+
+def _negative_ttl(response) -> int:
+    """RFC 2308: negative answers live for min(SOA TTL, SOA MINIMUM)."""
+    if response is not None:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return int(min(rrset.ttl, rrset[0].minimum))
+    return DEFAULT_NEGATIVE_TTL
+
+
+def answer_from_result(answers) -> Answer:
+    values = sorted(str(rr.to_text()) for rr in answers)
+    server = str(getattr(answers, "nameserver", "") or "")
+    port = getattr(answers, "port", 53)
+    if server and port != 53:
+        server = f"[{server}]:{port}" if ":" in server else f"{server}:{port}"
+    return Answer("NOERROR", values, int(answers.rrset.ttl), server)
+
+
+def answer_from_error(exc: Exception) -> Answer:
+    if isinstance(exc, dns.resolver.NXDOMAIN):
+        responses = list(exc.responses().values())
+        return Answer("NXDOMAIN", [], _negative_ttl(responses[0] if responses else None))
+    if isinstance(exc, dns.resolver.NoAnswer):
+        return Answer("NOANSWER", [], _negative_ttl(exc.response()))
+    if isinstance(exc, dns.exception.Timeout):
+        return Answer("TIMEOUT")
+    if isinstance(exc, dns.resolver.NoNameservers):
+        return Answer("SERVFAIL")
+    return Answer("ERROR")
+
+
+def record_query(answer: Answer, rtype: str, rkey: str, seconds: float) -> None:
+    """Count one on-the-wire query (status per resolver/rtype) and its latency."""
+    resolver = answer.nameserver or rkey or "system"
+    METRICS.inc("dns_queries_total", resolver=resolver, rtype=rtype, status=answer.status)
+    METRICS.observe("dns_query_seconds", seconds, resolver=resolver, rtype=rtype)
+
+
+def _ask(resolver: dns.resolver.Resolver, host: str, rtype: str) -> Answer:
+    try:
+        return answer_from_result(resolver.resolve(host, rtype, lifetime=LIFETIME))
+    except Exception as exc:
+        return answer_from_error(exc)
+
+
+def _ask_member(pool: ResolverPool, name: str, host: str, rtype: str) -> Answer:
+    started = time.perf_counter()
+    answer = _ask(get_resolver([name]), host, rtype)
+    answer.nameserver = answer.nameserver or name
+    pool.report(name, answer.status, time.perf_counter() - started)
+    return answer
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _HEDGE_EXECUTOR
+    with _POOL_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            _HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="dns-hedge")
+    return _HEDGE_EXECUTOR
+
+
+def ask_balanced(pool: ResolverPool, host: str, rtype: str) -> Answer:
+    """
+    One query through a ResolverPool: sent to a resolver picked by score, hedged on a
+    second one once it runs past the first one's p95, and failed over once if the first
+    answer is a failure. The first good answer wins; a hedge that loses is left to finish.
+    """
+    ex = _hedge_executor()
+    names = {}
+
+    def _send(name: str) -> None:
+        names[ex.submit(_ask_member, pool, name, host, rtype)] = name
+
+    primary = pool.pick()
+    _send(primary)
+    pending = set(names)
+    timeout = pool.hedge_after(primary) if pool.hedging else None
+    answer = Answer("SERVFAIL")
+    while pending:
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        timeout = None
+        if not done:
+            backup = pool.pick(exclude=names.values())
+            if backup is not None:
+                pool.hedged(primary, backup)
+                _send(backup)
+                pending = {f for f in names if not f.done()}
             continue
-    return results
+        for fut in done:
+            answer = fut.result()
+            if answer.status in GOOD:
+                if names[fut] != primary:
+                    pool.hedge_won(names[fut])
+                return answer
+        if not pending and len(names) < 2:
+            other = pool.pick(exclude=names.values())
+            if other is not None:
+                _send(other)
+                pending = {f for f in names if not f.done()}
+    return answer
+
+
+def resolve_one(
+    resolver, host: str, rtype: str, cache=None, rkey: str = "", gate=None,
+) -> Answer:
+    """
+    Resolve one (host, rtype), consulting and filling `cache` (a DnsCache) when given.
+    `resolver` is a dnspython Resolver, or a ResolverPool (--dns-balance).
+    `gate` (a dns_adaptive.ThreadGate) bounds the queries in flight and is told how each went.
+    """
+    if cache is not None:
+        hit = cache.get(host, rtype, rkey)
+        if hit is not None:
+            return hit
+    with gate or nullcontext():
+        started = time.perf_counter()
+        if isinstance(resolver, ResolverPool):
+            answer = ask_balanced(resolver, host, rtype)
+        else:
+            answer = _ask(resolver, host, rtype)
+        seconds = time.perf_counter() - started
+        if gate is not None:
+            gate.done(answer, seconds)
+    record_query(answer, rtype, rkey, seconds)
+    if cache is not None:
+        cache.put(host, rtype, rkey, answer)
+    return answer
+
+
+def query_host(
+    host: str,
+    resolvers: List[str],
+    record_types: Sequence[str] = RECORD_TYPES,
+    cache=None,
+    wildcards: Optional[Dict[str, WildcardProfile]] = None,
+    gate=None,
+    balance: bool = False,
+) -> HostResult:
+    """
+    Resolve one host through the query planner (NXDOMAIN and wildcard short-circuits).
+    `balance` spreads the queries over `resolvers` by score (see dns_pool) instead of
+    dnspython's in-order failover.
+    """
+    resolver = get_pool(resolvers) if balance else get_resolver(resolvers)
+    rkey = resolver_key(resolvers)
+    plan = plan_host(record_types, wildcard_for(host, wildcards))
+    started = time.perf_counter()
+    result = drive(plan, lambda rtype: resolve_one(resolver, host, rtype, cache, rkey, gate))
+    METRICS.observe("dns_host_seconds", time.perf_counter() - started)
+    return result
+
@@ -0,0 +1,140 @@
+# Adaptive DNS concurrency (AIMD), shared by the threaded and asyncio engines.
+#
+# Queries pass through a gate that admits at most `limit` at once. Every window of
+# completed queries (about `limit` of them, so roughly one round trip) is judged:
+#
+#   errors    TIMEOUT/SERVFAIL/ERROR share above ERROR_BUDGET -> limit × BACKOFF
+#   slow      median latency above LATENCY_FACTOR × the best window seen -> hold
+#   healthy   limit doubles until the first cut (slow start), then +1 per window
+#
+# so throughput climbs until the resolvers push back, and backs off quickly when they do.
+
+from typing import List, Optional
+import asyncio
+import os
+import statistics
+import threading
+
+from .dns import Answer
+from ..metrics import METRICS
+
+# statuses that say "try again later" rather than "no such record"
+TRANSIENT = ("TIMEOUT", "SERVFAIL", "ERROR")
+
+INITIAL_LIMIT = int(os.getenv("RECON_DNS_ADAPTIVE_START", "8"))
+MIN_WINDOW = 16
+ERROR_BUDGET = float(os.getenv("RECON_DNS_ERROR_BUDGET", "0.02"))
+LATENCY_FACTOR = 2.0
+# latencies this close to the best window count as healthy (loopback resolvers answer in µs)
+LATENCY_SLACK = 0.01
+BACKOFF = 0.5
+# thread cap when --dns-adaptive runs without --dns-workers
+ADAPTIVE_THREADS = int(os.getenv("RECON_DNS_ADAPTIVE_THREADS", "64"))
+# passes over hosts whose lookups failed transiently
+RETRY_ROUNDS = int(os.getenv("RECON_DNS_RETRIES", "2"))
+
+
+class AIMD:
+    """The limit and its window bookkeeping; not thread-safe on its own (the gates lock it)."""
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: int = INITIAL_LIMIT):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.ssthresh = float(self.maximum)
+        self.peak = self.limit
+        self.cuts = 0
+        self.baseline: Optional[float] = None
+        self._seen = 0
+        self._errors = 0
+        self._latencies: List[float] = []
+
+    def observe(self, status: str, seconds: float) -> bool:
+        """Count one finished query; True when the limit grew (waiters may proceed)."""
+        self._seen += 1
+        if status in TRANSIENT:
+            self._errors += 1
+        else:
+            self._latencies.append(seconds)
+        if self._seen < max(MIN_WINDOW, int(self.limit)):
+            return False
+
+        errors = self._errors / self._seen
+        median = statistics.median(self._latencies) if self._latencies else None
+        self._seen, self._errors, self._latencies = 0, 0, []
+        if median is not None and (self.baseline is None or median < self.baseline):
+            self.baseline = median
+
+        before = self.limit
+        if errors > ERROR_BUDGET:
+            self.limit = max(float(self.minimum), self.limit * BACKOFF)
+            self.ssthresh = self.limit
+            self.cuts += 1
+        elif median is not None and median > LATENCY_FACTOR * self.baseline + LATENCY_SLACK:
+            self.ssthresh = min(self.ssthresh, self.limit)
+        elif self.limit < self.ssthresh:
+            self.limit = min(self.limit * 2, self.ssthresh)
+        else:
+            self.limit = min(self.limit + 1, float(self.maximum))
+        self.peak = max(self.peak, self.limit)
+        METRICS.set("dns_concurrency_limit", int(self.limit))
+        return self.limit > before
+
+    def summary(self) -> str:
+        return f"limit {int(self.limit)} (peak {int(self.peak)}, cap {self.maximum}), {self.cuts} backoff(s)"
+
+
+class ThreadGate:
+    """`with gate:` around one blocking query; call done() before leaving the block."""
+
+    def __init__(self, control: AIMD):
+        self.control = control
+        self.inflight = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self) -> "ThreadGate":
+        with self._cond:
+            self._cond.wait_for(lambda: self.inflight < int(self.control.limit))
+            self.inflight += 1
+        return self
+
+    def done(self, answer: Answer, seconds: float) -> None:
+        with self._cond:
+            if self.control.observe(answer.status, seconds):
+                self._cond.notify_all()
+
+    def __exit__(self, *exc) -> None:
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+
+
+class AsyncGate:
+    """Drop-in for the asyncio.Semaphore query budget; call done() inside the block."""
+
+    def __init__(self, control: AIMD):
+        self.control = control
+        self.inflight = 0
+        self._grew = False
+        self._cond: Optional[asyncio.Condition] = None  # bound to the running loop on first use
+
+    async def __aenter__(self) -> "AsyncGate":
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < int(self.control.limit))
+            self.inflight += 1
+        return self
+
+    def done(self, answer: Answer, seconds: float) -> None:
+        if self.control.observe(answer.status, seconds):
+            self._grew = True
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self.inflight -= 1
+            if self._grew:
+                self._grew = False
+                self._cond.notify_all()
+            else:
+                self._cond.notify()
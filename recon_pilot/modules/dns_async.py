@@ -0,0 +1,321 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Sized, Tuple
+import asyncio
+import concurrent.futures
+import threading
+import time
+import dns.asyncresolver
+import dns.resolver
+
+from .dns import (
+    RECORD_TYPES, LIFETIME, Answer, answer_from_error, answer_from_result, configure_nameservers, record_query,
+    resolver_key,
+)
+from .dns_planner import (
+    DEFAULT_CONCURRENCY, HostResult, WildcardProfile, WILDCARD_PROBE_TYPES, build_profile, plan_host,
+    probe_names, wildcard_for,
+)
+from .dns_adaptive import AIMD, AsyncGate
+from .dns_pool import GOOD, ResolverPool, get_pool
+from ..metrics import METRICS
+
+_POOL: Dict[Tuple[str, ...], dns.asyncresolver.Resolver] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def get_async_resolver(resolvers: Sequence[str]) -> dns.asyncresolver.Resolver:
+    """Process-wide async resolver per resolver set (see dns.get_resolver)."""
+    key = tuple(resolvers or ())
+    with _POOL_LOCK:
+        resolver = _POOL.get(key)
+        if resolver is None:
+            resolver = dns.asyncresolver.Resolver(configure=True)
+            if resolvers:
+                configure_nameservers(resolver, resolvers)
+            resolver.cache = dns.resolver.LRUCache()
+            _POOL[key] = resolver
+    return resolver
+
+
+async def _ask_async(resolver: dns.asyncresolver.Resolver, host: str, rtype: str) -> Answer:
+    try:
+        return answer_from_result(await resolver.resolve(host, rtype, lifetime=LIFETIME))
+    except Exception as exc:
+        return answer_from_error(exc)
+
+
+async def _ask_member_async(pool: ResolverPool, name: str, host: str, rtype: str) -> Answer:
+    started = time.perf_counter()
+    answer = await _ask_async(get_async_resolver([name]), host, rtype)
+    answer.nameserver = answer.nameserver or name
+    pool.report(name, answer.status, time.perf_counter() - started)
+    return answer
+
+
+async def ask_balanced_async(pool: ResolverPool, host: str, rtype: str) -> Answer:
+    """Async ask_balanced: the losing query of a hedge is cancelled."""
+    names: Dict[asyncio.Task, str] = {}
+
+    def _send(name: str) -> None:
+        names[asyncio.ensure_future(_ask_member_async(pool, name, host, rtype))] = name
+
+    primary = pool.pick()
+    _send(primary)
+    pending = set(names)
+    timeout = pool.hedge_after(primary) if pool.hedging else None
+    answer = Answer("SERVFAIL")
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            timeout = None
+            if not done:
+                backup = pool.pick(exclude=names.values())
+                if backup is not None:
+                    pool.hedged(primary, backup)
+                    _send(backup)
+                    pending = {t for t in names if not t.done()}
+                continue
+            for task in done:
+                answer = task.result()
+                if answer.status in GOOD:
+                    if names[task] != primary:
+                        pool.hedge_won(names[task])
+                    return answer
+            if not pending and len(names) < 2:
+                other = pool.pick(exclude=names.values())
+                if other is not None:
+                    _send(other)
+                    pending = {t for t in names if not t.done()}
+        return answer
+    finally:
+        for task in names:
+            task.cancel()
+
+
+async def resolve_one_async(
+    resolver,
+    host: str,
+    rtype: str,
+    budget: asyncio.Semaphore,
+    cache=None,
+    rkey: str = "",
+) -> Answer:
+    """Async resolve_one; only a cache miss takes a slot of `budget`."""
+    if cache is not None:
+        hit = cache.get(host, rtype, rkey)
+        if hit is not None:
+            return hit
+    async with budget:
+        started = time.perf_counter()
+        if isinstance(resolver, ResolverPool):
+            answer = await ask_balanced_async(resolver, host, rtype)
+        else:
+            answer = await _ask_async(resolver, host, rtype)
+        seconds = time.perf_counter() - started
+        if isinstance(budget, AsyncGate):
+            budget.done(answer, seconds)
+        record_query(answer, rtype, rkey, seconds)
+    if cache is not None:
+        cache.put(host, rtype, rkey, answer)
+    return answer
+
+
+async def _gather_batch(
+    resolver: dns.asyncresolver.Resolver,
+    host: str,
+    batch: Sequence[str],
+    budget: asyncio.Semaphore,
+    cache,
+    rkey: str,
+) -> Dict[str, Answer]:
+    answers = await asyncio.gather(
+        *(resolve_one_async(resolver, host, rt, budget, cache, rkey) for rt in batch)
+    )
+    return dict(zip(batch, answers))
+
+
+async def query_host_async(
+    host: str,
+    resolver: dns.asyncresolver.Resolver,
+    budget: asyncio.Semaphore,
+    record_types: Sequence[str] = RECORD_TYPES,
+    cache=None,
+    rkey: str = "",
+    wildcard: Optional[WildcardProfile] = None,
+) -> HostResult:
+    """
+    Async counterpart of query_host: each planner batch for `host` is sent at once.
+    Each query holds one slot of the shared `budget` while it is on the wire.
+    """
+    plan = plan_host(record_types, wildcard)
+    started = time.perf_counter()
+    try:
+        batch = next(plan)
+        while True:
+            batch = plan.send(await _gather_batch(resolver, host, batch, budget, cache, rkey))
+    except StopIteration as stop:
+        METRICS.observe("dns_host_seconds", time.perf_counter() - started)
+        return stop.value
+
+
+async def _resolve_all(
+    hosts: Iterable[str],
+    resolvers: List[str],
+    concurrency: int,
+    record_types: Sequence[str],
+    on_result: Callable[[str, HostResult], None],
+    cache,
+    wildcards: Optional[Dict[str, WildcardProfile]],
+    adaptive: Optional[AIMD] = None,
+    balance: bool = False,
+) -> None:
+    resolver = get_pool(resolvers) if balance else get_async_resolver(resolvers)
+    rkey = resolver_key(resolvers)
+    # a fresh gate per event loop; the AIMD state it steers carries over between passes
+    budget = AsyncGate(adaptive) if adaptive is not None else asyncio.Semaphore(concurrency)
+    # enough host workers to keep the query budget full
+    n_workers = max(1, concurrency // max(1, len(record_types)))
+    feeder = None
+    stop = threading.Event()
+
+    if isinstance(hosts, Sized):
+        pending = iter(hosts)
+
+        async def _next() -> Optional[str]:
+            return next(pending, None)
+    else:
+        # a live feed (e.g. a pipeline.HostFeed) may block: read it on a helper thread
+        # and hand hosts over through a bounded asyncio queue
+        loop = asyncio.get_running_loop()
+        handoff: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+
+        def _hand_over(item: Optional[str]) -> bool:
+            """Queue one item; False once `stop` is set (nobody is left to take it)."""
+            put = asyncio.run_coroutine_threadsafe(handoff.put(item), loop)
+            while True:
+                try:
+                    put.result(timeout=0.2)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        put.cancel()
+                        return False
+
+        def _feed() -> None:
+            for h in hosts:
+                if not _hand_over(h):
+                    return
+            for _ in range(n_workers):
+                if not _hand_over(None):
+                    return
+
+        feeder = loop.run_in_executor(None, _feed)
+        _next = handoff.get
+
+    async def _worker() -> None:
+        # all workers pull from the same source; safe on a single event loop
+        while True:
+            host = await _next()
+            if host is None:
+                return
+            result = await query_host_async(
+                host, resolver, budget, record_types, cache, rkey, wildcard_for(host, wildcards)
+            )
+            on_result(host, result)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(n_workers)]
+    try:
+        # a failing feed fails the gather instead of starving the workers
+        await asyncio.gather(*workers, *([feeder] if feeder is not None else []))
+    except BaseException:
+        # a failed worker leaves nobody to drain the hand-off: release the feeder thread
+        # (and end a live feed's iteration), or asyncio.run() waits for it forever when
+        # it shuts its executor down
+        stop.set()
+        abort = getattr(hosts, "abort", None)
+        if feeder is not None and abort is not None:
+            abort()
+        for w in workers:
+            w.cancel()
+        raise
+
+
+async def _probe_all(bases: Sequence[str], resolvers: List[str], concurrency: int) -> Dict[str, WildcardProfile]:
+    resolver = get_async_resolver(resolvers)
+    budget = asyncio.Semaphore(concurrency)
+
+    async def _probe(base: str) -> WildcardProfile:
+        # never cached: the names are random and the answer must be fresh
+        answers = await asyncio.gather(
+            *(_gather_batch(resolver, name, WILDCARD_PROBE_TYPES, budget, None, "") for name in probe_names(base))
+        )
+        return build_profile(base, answers)
+
+    profiles = await asyncio.gather(*(_probe(b) for b in bases))
+    return {p.base: p for p in profiles if p}
+
+
+def probe_wildcards(
+    bases: Iterable[str],
+    resolvers: List[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Dict[str, WildcardProfile]:
+    """
+    Ask each base domain for random labels; returns {base: fingerprint} for the
+    zones that answered (i.e. have wildcard records).
+    """
+    bases = sorted({b.lower().strip(".") for b in bases if b})
+    return asyncio.run(_probe_all(bases, resolvers, max(1, concurrency)))
+
+
+async def _resolve_names(
+    names: Sequence[str], resolvers: List[str], rtype: str, concurrency: int, cache, balance: bool,
+) -> Dict[str, Answer]:
+    resolver = get_pool(resolvers) if balance else get_async_resolver(resolvers)
+    rkey = resolver_key(resolvers)
+    budget = asyncio.Semaphore(concurrency)
+    answers = await asyncio.gather(*(resolve_one_async(resolver, n, rtype, budget, cache, rkey) for n in names))
+    return dict(zip(names, answers))
+
+
+def resolve_names(
+    names: Iterable[str],
+    resolvers: List[str],
+    rtype: str = "A",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache=None,
+    balance: bool = False,
+) -> Dict[str, Answer]:
+    """
+    One `rtype` query per distinct name (e.g. the CNAME targets of a run), at most
+    `concurrency` in flight, through `cache` when given; returns {name: Answer}.
+    """
+    names = sorted({n.lower().strip(".") for n in names if n})
+    return asyncio.run(_resolve_names(names, resolvers, rtype, max(1, concurrency), cache, balance))
+
+
+def resolve_hosts(
+    hosts: Iterable[str],
+    resolvers: List[str],
+    on_result: Callable[[str, HostResult], None],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    record_types: Sequence[str] = RECORD_TYPES,
+    cache=None,
+    wildcards: Optional[Dict[str, WildcardProfile]] = None,
+    adaptive: Optional[AIMD] = None,
+    balance: bool = False,
+) -> None:
+    """
+    Resolve `hosts` on an asyncio event loop with at most `concurrency` queries in flight
+    (with `adaptive`, as many as its AIMD limit allows, up to `concurrency`).
+    `balance` spreads queries over the resolvers by score, with hedging (see dns_pool).
+    `hosts` may also be an unsized, blocking iterable (a pipeline feed); it is read on a
+    helper thread so resolution starts with the first host.
+    `on_result(host, result)` is called (on the loop thread) as each host completes;
+    result is a HostResult (HostResult.records: rtype -> values). `cache` is an optional DnsCache,
+    `wildcards` the output of probe_wildcards().
+    """
+    asyncio.run(
+        _resolve_all(
+            hosts, resolvers, max(1, concurrency), record_types, on_result, cache, wildcards, adaptive, balance
+        )
+    )
@@ -0,0 +1,151 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+from .dns import Answer
+from ..utils import cache_dir
+
+# Cap how long any answer is reused, whatever the zone says (seconds).
+MAX_TTL = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    name    TEXT NOT NULL,
+    rtype   TEXT NOT NULL,
+    rset    TEXT NOT NULL,
+    status  TEXT NOT NULL,
+    vals    TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (name, rtype, rset)
+) WITHOUT ROWID
+"""
+
+
+class DnsCache:
+    """
+    Persistent DNS answer cache (SQLite), keyed by (name, rtype, resolver set).
+
+    Positive answers live for their record TTL; NXDOMAIN/NODATA answers for the
+    RFC 2308 negative TTL. Timeouts and SERVFAIL are never stored. Writes are
+    batched; call close() (or flush()) at the end of a run.
+
+    memory=True also keeps every row read or written in a dict, so a long-lived
+    process (`recon monitor`) answers repeat lookups without touching SQLite.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 1000, memory: bool = False):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, str], Tuple[str, str, float]] = {}
+        self._flush_every = flush_every
+        self._mem: Optional[Dict[Tuple[str, str, str], Tuple[str, str, float]]] = {} if memory else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, rtype: str, rkey: str) -> Optional[Answer]:
+        key = (name.lower().rstrip("."), rtype, rkey)
+        now = time.time()
+        with self._lock:
+            row = self._pending.get(key)
+            if row is None and self._mem is not None:
+                row = self._mem.get(key)
+            if row is None:
+                row = self._db.execute(
+                    "SELECT status, vals, expires FROM answers WHERE name=? AND rtype=? AND rset=?", key
+                ).fetchone()
+                if row is not None and self._mem is not None:
+                    self._mem[key] = row
+            if row is None or row[2] <= now:
+                self.misses += 1
+                return None
+            self.hits += 1
+        status, vals, expires = row
+        values: List[str] = json.loads(vals)
+        return Answer(status, values, int(expires - now))
+
+    def put(self, name: str, rtype: str, rkey: str, answer: Answer) -> None:
+        if not answer.cacheable:
+            return
+        key = (name.lower().rstrip("."), rtype, rkey)
+        expires = time.time() + min(answer.ttl, MAX_TTL)
+        with self._lock:
+            self._pending[key] = (answer.status, json.dumps(answer.values), expires)
+            if self._mem is not None:
+                self._mem[key] = self._pending[key]
+            if len(self._pending) >= self._flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO answers (name, rtype, rset, status, vals, expires) VALUES (?, ?, ?, ?, ?, ?)",
+            [k + v for k, v in self._pending.items()],
+        )
+        self._db.commit()
+        self._pending.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def purge_expired(self) -> int:
+        """Drop expired rows; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute("DELETE FROM answers WHERE expires <= ?", (now,))
+            self._db.commit()
+            if self._mem is not None:
+                for key in [k for k, row in self._mem.items() if row[2] <= now]:
+                    del self._mem[key]
+            return cur.rowcount
+
+    def close(self) -> None:
+        self.flush()
+        self.purge_expired()
+        with self._lock:
+            self._db.close()
+
+
+def default_cache_path() -> Path:
+    return cache_dir() / "dns_cache.sqlite"
+
+
+# `recon monitor`: caches stay open (and in memory) from one run to the next
+_KEPT: Dict[Path, DnsCache] = {}
+_KEPT_LOCK = threading.Lock()
+_KEEP = False
+
+
+def keep_open(on: bool = True) -> None:
+    global _KEEP
+    _KEEP = on
+
+
+def open_cache(path: Path) -> DnsCache:
+    """A cache for one run; with keep_open() the same in-memory cache every time."""
+    if not _KEEP:
+        return DnsCache(path)
+    with _KEPT_LOCK:
+        cache = _KEPT.get(path)
+        if cache is None:
+            cache = _KEPT[path] = DnsCache(path, memory=True)
+    cache.hits = cache.misses = 0
+    return cache
+
+
+def release_cache(cache: DnsCache) -> None:
+    """End of a run: close the cache, or only flush it if it is kept open."""
+    if _KEPT.get(cache.path) is cache:
+        cache.flush()
+        cache.purge_expired()
+    else:
+        cache.close()
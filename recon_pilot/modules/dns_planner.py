@@ -0,0 +1,136 @@
+# DNS query planner shared by the serial/threaded and asyncio engines.
+#
+# A plan is a generator: it yields the batch of record types to ask next, is sent
+# back {rtype: Answer}, and finally returns a HostResult. Engines only decide *how*
+# a batch goes on the wire (one by one, or all at once on an event loop).
+#
+#   1) probe first (CNAME when requested, else the first record type);
+#      an authoritative NXDOMAIN ends the plan: no other type can exist.
+#   2) under a wildcard zone, fetch A next; if the answers are the zone's
+#      wildcard fingerprint the host is marked and the plan ends.
+#   3) everything else goes out as one batch.
+
+from dataclasses import dataclass, field
+from typing import Dict, Generator, Iterable, List, Optional, Sequence, Set
+import secrets
+
+
+@dataclass
+class HostResult:
+    records: Dict[str, List[str]] = field(default_factory=dict)
+    wildcard: bool = False  # answers are the zone's wildcard synthesis
+    queries: int = 0
+    ttl: Optional[int] = None  # shortest TTL among the answers (0: a lookup failed)
+    resolved_at: Optional[int] = None  # epoch seconds; set when the result is recorded
+    failed: Dict[str, str] = field(default_factory=dict)  # rtype -> TIMEOUT | SERVFAIL | ERROR
+
+
+@dataclass
+class WildcardProfile:
+    """Answers a zone synthesizes for names that do not exist."""
+    base: str
+    a: Set[str] = field(default_factory=set)
+    aaaa: Set[str] = field(default_factory=set)
+    cname: Set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.a or self.aaaa or self.cname)
+
+    def matches(self, recs: Dict[str, List[str]]) -> bool:
+        cname = recs.get("CNAME")
+        if cname:
+            return set(cname) <= self.cname
+        a = recs.get("A")
+        if a and self.a:
+            return set(a) <= self.a
+        aaaa = recs.get("AAAA")
+        if aaaa and self.aaaa:
+            return set(aaaa) <= self.aaaa
+        return False
+
+
+Plan = Generator[List[str], Dict[str, object], HostResult]
+
+# --dns-async: queries in flight across all hosts (one asyncio budget, not one thread per
+# host). Each in-flight UDP query holds a socket, so keep this below `ulimit -n`.
+# Here rather than in dns_async so the CLI can show it without importing dnspython.
+DEFAULT_CONCURRENCY = 500
+
+# labels per base domain used to fingerprint wildcard answers
+WILDCARD_PROBES = 2
+WILDCARD_PROBE_TYPES = ("A", "AAAA", "CNAME")
+
+
+def probe_names(base: str, count: int = WILDCARD_PROBES) -> List[str]:
+    """Random labels under `base` that should not exist unless the zone has a wildcard."""
+    return [f"rp-{secrets.token_hex(8)}.{base}" for _ in range(count)]
+
+
+def build_profile(base: str, answers: Iterable[Dict[str, object]]) -> WildcardProfile:
+    """Fold probe answers ({rtype: Answer} per random name) into one fingerprint."""
+    profile = WildcardProfile(base)
+    for by_type in answers:
+        for rtype, answer in by_type.items():
+            if answer.status != "NOERROR":
+                continue
+            target = {"A": profile.a, "AAAA": profile.aaaa, "CNAME": profile.cname}.get(rtype)
+            if target is not None:
+                target.update(answer.values)
+    return profile
+
+
+def wildcard_for(host: str, wildcards: Optional[Dict[str, WildcardProfile]]) -> Optional[WildcardProfile]:
+    """Closest wildcard zone strictly above `host` (the apex itself is never synthesized)."""
+    if not wildcards:
+        return None
+    labels = host.lower().strip(".").split(".")
+    for i in range(1, len(labels)):
+        profile = wildcards.get(".".join(labels[i:]))
+        if profile is not None:
+            return profile
+    return None
+
+
+def plan_host(record_types: Sequence[str], wildcard: Optional[WildcardProfile] = None) -> Plan:
+    result = HostResult()
+    todo = list(record_types)
+    if not todo:
+        return result
+    probe = "CNAME" if "CNAME" in todo else todo[0]
+    todo.remove(probe)
+
+    def _take(answers: Dict[str, object]) -> None:
+        result.queries += len(answers)
+        for rtype, answer in answers.items():
+            result.ttl = answer.ttl if result.ttl is None else min(result.ttl, answer.ttl)
+            if answer.status == "NOERROR":
+                result.records[rtype] = answer.values
+            elif answer.status in ("TIMEOUT", "SERVFAIL", "ERROR"):
+                result.failed[rtype] = answer.status
+
+    answers = yield [probe]
+    _take(answers)
+    if answers[probe].status == "NXDOMAIN":
+        return result
+
+    if wildcard:
+        if "CNAME" not in result.records and "A" in todo:
+            todo.remove("A")
+            _take((yield ["A"]))
+        if wildcard.matches(result.records):
+            result.wildcard = True
+            return result
+
+    if todo:
+        _take((yield todo))
+    return result
+
+
+def drive(plan: Plan, lookup) -> HostResult:
+    """Run a plan synchronously; `lookup(rtype)` returns an Answer."""
+    try:
+        batch = next(plan)
+        while True:
+            batch = plan.send({rt: lookup(rt) for rt in batch})
+    except StopIteration as stop:
+        return stop.value
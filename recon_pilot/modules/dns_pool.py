@@ -0,0 +1,153 @@
+# Resolver scheduling for --dns-balance: health/latency scores, hedging, quarantine.
+#
+# Each resolver in the scope gets its own score instead of dnspython's in-order failover:
+#
+#   weight     health² / latency  (EWMAs of good answers and of answer time); queries are
+#              spread at random in proportion to it, so fast clean resolvers get most
+#   hedge      a query still unanswered after its resolver's p95 is sent once more to
+#              another resolver; the first good answer wins
+#   quarantine QUARANTINE_AFTER failures in a row bench a resolver for COOLDOWN seconds
+#              (doubling on each relapse, up to MAX_COOLDOWN); then it gets traffic again
+#
+# This module only keeps the scores; dns.py / dns_async.py put the queries on the wire.
+
+from typing import Dict, Iterable, List, Optional
+import os
+import random
+import threading
+import time
+
+from ..metrics import Histogram, METRICS
+
+# answers that settle a query (anything else may do better on another resolver)
+GOOD = ("NOERROR", "NXDOMAIN", "NOANSWER")
+
+HEDGE = os.getenv("RECON_DNS_HEDGE", "1") != "0"
+# until a resolver has this many answers its p95 is not trusted; hedge after DEFAULT_HEDGE_AFTER
+MIN_SAMPLES = 20
+DEFAULT_HEDGE_AFTER = 1.0
+MIN_HEDGE_AFTER = 0.005
+QUARANTINE_AFTER = 5
+COOLDOWN = float(os.getenv("RECON_DNS_COOLDOWN", "30"))
+MAX_COOLDOWN = 300.0
+# EWMA weights: latency follows the last ~10 answers, health the last ~20
+LATENCY_ALPHA = 0.1
+HEALTH_ALPHA = 0.05
+
+
+class ResolverStats:
+    __slots__ = (
+        "name", "latency", "health", "hist", "streak", "until", "quarantines",
+        "queries", "failures", "hedges", "hedge_wins",
+    )
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency = 0.05
+        self.health = 1.0
+        self.hist = Histogram()
+        self.streak = 0  # failures in a row
+        self.until = 0.0  # quarantined until (monotonic)
+        self.quarantines = 0
+        self.queries = 0
+        self.failures = 0
+        self.hedges = 0  # times its query was hedged
+        self.hedge_wins = 0  # times it answered first as the backup (hedge or failover)
+
+    @property
+    def weight(self) -> float:
+        return max(self.health, 0.01) ** 2 / max(self.latency, 0.001)
+
+
+class ResolverPool:
+    """Scores for one resolver set; thread-safe, shared by every engine of the run."""
+
+    def __init__(self, resolvers: Iterable[str], hedging: bool = HEDGE, seed: Optional[int] = None):
+        self.stats: Dict[str, ResolverStats] = {r: ResolverStats(r) for r in resolvers}
+        self.hedging = hedging and len(self.stats) > 1
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def pick(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """A resolver drawn by weight among those not quarantined (None if all are excluded)."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self.stats.values() if s.name not in exclude]
+            if not candidates:
+                return None
+            healthy = [s for s in candidates if s.until <= now]
+            if not healthy:
+                # everyone is benched: the one closest to parole
+                return min(candidates, key=lambda s: s.until).name
+            return self._rng.choices(healthy, weights=[s.weight for s in healthy])[0].name
+
+    def hedge_after(self, name: str) -> float:
+        """Seconds to wait on `name` before hedging: its observed p95."""
+        with self._lock:
+            s = self.stats[name]
+            if s.hist.count < MIN_SAMPLES:
+                return DEFAULT_HEDGE_AFTER
+            return max(MIN_HEDGE_AFTER, s.hist.quantile(0.95) or DEFAULT_HEDGE_AFTER)
+
+    def report(self, name: str, status: str, seconds: float) -> None:
+        """Score one finished query."""
+        good = status in GOOD
+        with self._lock:
+            s = self.stats[name]
+            s.queries += 1
+            s.health += HEALTH_ALPHA * ((1.0 if good else 0.0) - s.health)
+            if good:
+                s.latency += LATENCY_ALPHA * (seconds - s.latency)
+                s.hist.observe(seconds)
+                s.streak = 0
+                return
+            s.failures += 1
+            s.streak += 1
+            if s.streak >= QUARANTINE_AFTER and s.until <= time.monotonic():
+                cooldown = min(MAX_COOLDOWN, COOLDOWN * 2 ** s.quarantines)
+                s.until = time.monotonic() + cooldown
+                s.quarantines += 1
+                s.streak = 0
+                METRICS.inc("dns_resolver_quarantines_total", resolver=name)
+
+    def hedged(self, primary: str, backup: str) -> None:
+        with self._lock:
+            self.stats[primary].hedges += 1
+        METRICS.inc("dns_hedges_total", resolver=primary, backup=backup)
+
+    def hedge_won(self, backup: str) -> None:
+        with self._lock:
+            self.stats[backup].hedge_wins += 1
+        METRICS.inc("dns_hedge_wins_total", resolver=backup)
+
+    def summary(self) -> List[str]:
+        """One line per resolver; also publishes the scores as gauges."""
+        lines = []
+        with self._lock:
+            for s in self.stats.values():
+                p95 = s.hist.quantile(0.95)
+                METRICS.set("dns_resolver_health", round(s.health, 3), resolver=s.name)
+                METRICS.set("dns_resolver_latency_seconds", round(s.latency, 6), resolver=s.name)
+                lines.append(
+                    f"{s.name}: {s.queries} queries, {s.failures} failed, "
+                    f"p95 {p95 * 1000 if p95 is not None else 0:.0f}ms, health {s.health:.2f}, "
+                    f"hedged {s.hedges}, won {s.hedge_wins} hedge(s), quarantined {s.quarantines}x"
+                )
+        return lines
+
+
+_POOLS: Dict[tuple, ResolverPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(resolvers: Iterable[str]) -> ResolverPool:
+    """Process-wide pool per resolver set (scores carry over between passes of a run)."""
+    key = tuple(resolvers or ())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = ResolverPool(key)
+    return pool
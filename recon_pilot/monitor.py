@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+# `recon monitor`: one long-lived process running scopes on a schedule.
+#
+# Each cycle is an ordinary `recon run` (run-* directory, artifacts, delta, history),
+# called in-process, so what a cold run rebuilds every time stays warm in between:
+#
+#   resolvers    the process-wide dnspython resolvers and --dns-balance scores
+#   DNS cache    kept open with an in-memory layer (dns_cache.keep_open)
+#   inventory    each scope's last Inventory feeds its next --incremental (incremental.keep_last)
+#   CT           pulled through the local index every --ct-every; the cycles in
+#                between replay the index (--ct-offline) instead of streaming crt.sh
+#
+# A unix socket takes one-line commands: `status`, `run [SCOPE]`, `stop`.
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import json
+import logging
+import os
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+# run options the monitor sets itself
+OWN_OPTIONS = ("--scope", "--out", "--resume", "--shard", "--interactive", "-i")
+# run options that make CT local already (nothing to schedule)
+LOCAL_CT = ("--ct-bulk", "--ct-offline")
+
+
+def parse_interval(text: str) -> float:
+    """Seconds in "90", "90s", "15m", "6h", "1d" or "1h30m"."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*([smhd]?)", text or "")
+    if not parts or re.sub(r"[\d.\ssmhd]", "", text):
+        raise ValueError(f"expected an interval like 30m, 6h or 1d, got {text!r}")
+    return sum(float(n) * _UNITS[u or "s"] for n, u in parts)
+
+
+def _span(seconds: float) -> str:
+    seconds = int(max(seconds, 0))
+    h, rest = divmod(seconds, 3600)
+    return f"{h}h{rest // 60:02d}m" if h else f"{rest // 60}m{rest % 60:02d}s"
+
+
+@dataclass
+class Job:
+    """One scope on the schedule."""
+    scope: Path
+    out: Path
+    every: float
+    jitter: float = 0.1
+    ct_every: float = 86400.0
+    next_due: float = 0.0
+    last_ct: float = 0.0
+    cycles: int = 0
+    failures: int = 0
+    last_run: Optional[str] = None
+    last_status: str = "pending"
+    last_seconds: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.scope.stem
+
+    def schedule(self, rng: random.Random, now: Optional[float] = None) -> None:
+        """Next cycle one interval on, give or take `jitter` of it (scopes drift apart)."""
+        now = time.time() if now is None else now
+        self.next_due = now + self.every * (1 + rng.uniform(-self.jitter, self.jitter))
+
+    def status(self, now: float) -> dict:
+        return {
+            "scope": str(self.scope),
+            "out": str(self.out),
+            "cycles": self.cycles,
+            "failures": self.failures,
+            "last_run": self.last_run,
+            "last_status": self.last_status,
+            "last_seconds": round(self.last_seconds, 3),
+            "next_in": round(max(self.next_due - now, 0), 1),
+            "ct_in": round(max(self.last_ct + self.ct_every - now, 0), 1),
+        }
+
+
+class Monitor:
+    """
+    The schedule and its one worker (runs share the process-wide metrics, so cycles
+    never overlap). `run_once(args)` runs `recon run` with those arguments and
+    returns its exit code.
+    """
+
+    def __init__(self, jobs: List[Job], run_once: Callable[[List[str]], int], extra: List[str] = (), seed: Optional[int] = None):
+        self.jobs = jobs
+        self.extra = list(extra)
+        self.started = time.time()
+        self.running: Optional[str] = None
+        self._run_once = run_once
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._local_ct = any(a.split("=", 1)[0] in LOCAL_CT for a in self.extra)
+        # first cycles right away, spread over a few seconds when there are several scopes
+        for k, job in enumerate(jobs):
+            job.next_due = self.started + k * self._rng.uniform(1, 5)
+
+    def args(self, job: Job, now: float) -> List[str]:
+        args = ["--scope", str(job.scope), "--out", str(job.out), "--dns-cache", "--incremental"]
+        if not self._local_ct:
+            args.append("--ct-index" if now >= job.last_ct + job.ct_every else "--ct-offline")
+        return args + self.extra
+
+    def trigger(self, name: Optional[str] = None) -> List[str]:
+        """Make `name` (or every scope) due now; returns the scopes queued."""
+        with self._lock:
+            queued = [j for j in self.jobs if name in (None, j.name, str(j.scope))]
+            for job in queued:
+                job.next_due = time.time()
+        self._wake.set()
+        return [j.name for j in queued]
+
+    def stop(self) -> None:
+        """Stop after the cycle in progress."""
+        self._stop.set()
+        self._wake.set()
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "uptime": round(now - self.started, 1),
+                "running": self.running,
+                "jobs": {j.name: j.status(now) for j in self.jobs},
+            }
+
+    def _cycle(self, job: Job) -> None:
+        now = time.time()
+        args = self.args(job, now)
+        pulls_ct = "--ct-index" in args
+        with self._lock:
+            self.running = job.name
+        logging.info(f"Monitor: {job.name}: cycle {job.cycles + 1} ({'CT pull' if pulls_ct else 'CT from index'}).")
+        started = time.monotonic()
+        try:
+            code = self._run_once(args) or 0
+            status = "ok" if code == 0 else f"exit {code}"
+        except Exception as e:  # a failed cycle must not take the daemon down
+            code, status = 1, f"error: {e}"
+        runs = sorted(job.out.glob("run-*"))
+        with self._lock:
+            self.running = None
+            job.cycles += 1
+            job.last_seconds = time.monotonic() - started
+            job.last_status = status
+            job.last_run = runs[-1].name if runs else None
+            if code == 0 and pulls_ct:
+                job.last_ct = now
+            if code:
+                job.failures += 1
+            job.schedule(self._rng)
+        log = logging.info if code == 0 else logging.warning
+        log(
+            f"Monitor: {job.name}: {status} in {job.last_seconds:.1f}s ({job.last_run or 'no run'}); "
+            f"next in {_span(job.next_due - time.time())}."
+        )
+
+    def serve_forever(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                job = min(self.jobs, key=lambda j: j.next_due)
+                wait = job.next_due - time.time()
+            if wait > 0:
+                self._wake.wait(min(wait, 60))
+                self._wake.clear()
+                continue
+            self._cycle(job)
+
+
+# --- control socket ---
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        monitor: Monitor = self.server.monitor  # type: ignore[attr-defined]
+        words = self.rfile.readline(4096).decode("utf-8", "replace").split()
+        cmd, arg = (words[0].lower() if words else ""), (words[1] if len(words) > 1 else None)
+        if cmd == "status":
+            reply: Dict[str, object] = monitor.status()
+        elif cmd == "run":
+            queued = monitor.trigger(arg)
+            reply = {"queued": queued} if queued else {"error": f"no scope named {arg!r}"}
+        elif cmd == "stop":
+            monitor.stop()
+            reply = {"stopping": True}
+        else:
+            reply = {"error": "commands: status | run [SCOPE] | stop"}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, monitor: Monitor):
+        if path.exists():
+            try:
+                send(path, "status", timeout=1.0)
+            except OSError:
+                path.unlink()  # left behind by a monitor that died
+            else:
+                raise RuntimeError(f"another monitor is listening on {path}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.monitor = monitor
+        old = os.umask(0o177)  # owner only: the socket can start runs
+        try:
+            super().__init__(str(path), _Handler)
+        finally:
+            os.umask(old)
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, name="monitor-control", daemon=True).start()
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def send(path: Path, command: str, timeout: float = 10.0) -> dict:
+    """One command to a running monitor; its JSON reply. OSError if nobody listens."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(path))
+        s.sendall((command.strip() + "\n").encode("utf-8"))
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    return json.loads(buf.decode("utf-8") or "{}")
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Set
+import os
+import queue
+import threading
+
+# hosts waiting between CT and DNS before CT producers block (backpressure)
+DEFAULT_QUEUE = int(os.getenv("RECON_PIPELINE_QUEUE", "10000"))
+
+_DONE = object()
+
+
+class FeedAborted(Exception):
+    """The consuming side of a HostFeed went away."""
+
+
+class HostFeed:
+    """
+    Bounded, de-duplicating hand-off between producers (CT results, seeds) and DNS
+    consumers. put() blocks while the queue is full; iterating blocks until a host
+    arrives and ends once close() was called and the queue is drained. Safe to iterate
+    from several threads.
+
+      accept  optional predicate; rejected hosts are counted in `.skipped`
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE, accept: Optional[Callable[[str], bool]] = None):
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(0, maxsize))
+        self._lock = threading.Lock()
+        self._aborted = threading.Event()
+        self.accept = accept
+        self.seen: Set[str] = set()
+        self.skipped = 0
+
+    def _put(self, item: Any) -> None:
+        while True:
+            if self._aborted.is_set():
+                raise FeedAborted()
+            try:
+                self._q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def put(self, hosts: Iterable[str]) -> int:
+        """Queue the hosts not seen before; returns how many were new."""
+        new = 0
+        for h in hosts:
+            with self._lock:
+                if h in self.seen:
+                    continue
+                if self.accept is not None and not self.accept(h):
+                    self.skipped += 1
+                    continue
+                self.seen.add(h)
+            self._put(h)
+            new += 1
+        return new
+
+    def close(self) -> None:
+        """No more hosts; consumers finish what is queued, then stop."""
+        try:
+            self._put(_DONE)
+        except FeedAborted:
+            pass
+
+    def abort(self) -> None:
+        """Stop early: producers' put() raises FeedAborted and iteration ends."""
+        self._aborted.set()
+
+    @property
+    def count(self) -> int:
+        return len(self.seen)
+
+    def __iter__(self) -> Iterator[str]:
+        while not self._aborted.is_set():
+            try:
+                item = self._q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                self._q.put(_DONE)  # let the other consumers see it too
+                return
+            yield item
+
+
+class Producer(threading.Thread):
+    """Run `target()` on a background thread, close `feed` when it ends, re-raise on join()."""
+
+    def __init__(self, target: Callable[[], Any], feed: HostFeed, name: str = "producer"):
+        super().__init__(name=name, daemon=True)
+        self._target_fn = target
+        self.feed = feed
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        try:
+            self._target_fn()
+        except FeedAborted:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.feed.close()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        super().join(timeout)
+        if self.error is not None:
+            raise self.error
+
+
+def bounded_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    workers: int,
+    on_done: Callable[[Any], None],
+    inflight: int = 0,
+) -> None:
+    """
+    ThreadPoolExecutor over a (possibly blocking, unbounded) iterable: at most `inflight`
+    (default 2 × workers) tasks are queued at once, and `on_done(result)` runs on the
+    calling thread.
+    """
+    limit = inflight or 2 * max(1, workers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        pending = set()
+        for item in items:
+            pending.add(ex.submit(fn, item))
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    on_done(fut.result())
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                on_done(fut.result())
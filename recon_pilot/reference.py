@@ -0,0 +1,239 @@
+# `recon --help`: the full command reference. Only imported when the top-level help is
+# rendered, so subcommands do not pay for it.
+
+APP_HELP = """\
+ReconPilot Command Reference (dev-box edition)
+
+Run from the repo root and use `./recon` in all examples below. Only if you explicitly
+make it global (see the end of this help) can you omit the `./` prefix.
+
+──────────────────────────────── Core ────────────────────────────────
+• Health check
+  ./recon doctor
+
+• Run (interactive prompts)
+  ./recon run -i --out runs --tag normal
+
+• Run (from a scope file)
+  ./recon run --scope scope.yaml --out runs --tag LABEL
+
+• Diff two runs
+  ./recon diff --a runs/run-OLD --b runs/run-NEW --out runs/diff.md
+
+──────────────────── New Opt-In Flags (Speed & Visibility) ────────────────────
+• Verbose progress
+  -v / --verbose — live spinner + periodic progress (heartbeats).
+
+• DNS fast path (A/AAAA only)
+  --dns-fast — only A and AAAA records are queried and stored (faster I/O + less query volume).
+
+• Skip internal-looking hosts
+  --skip-internal — ignores internal-looking names (e.g., *.corp.*, .internal, .local, .lan).
+
+• Parallel DNS workers
+  --dns-workers N — run DNS lookups in parallel (e.g., 10–50).
+  Default behavior is unchanged unless you opt in.
+
+• Concurrent CT discovery
+  --ct-workers N — fetch up to N scope domains from crt.sh at once (default 1).
+  --ct-rps R — never start more than R crt.sh requests per second overall (default 1).
+  HTTP 429/503 are retried with exponential backoff (Retry-After honoured) instead of
+  counting as “0 hosts”; -v shows each backoff and CT progress.
+
+• Local CT index (incremental / offline)
+  --ct-index — keep every certificate seen (id, not_before, names) in a local SQLite index;
+  later runs only add certificates above the highest id already indexed, and fall back to the
+  index when crt.sh is unavailable. The first run downloads the full crt.sh history; updates
+  request unexpired certificates only, but still all of them (crt.sh has no id/date filter).
+  --ct-offline — replay CT names from the index only; no crt.sh requests at all.
+  Stored in ~/.cache/recon-pilot/ct_index.sqlite (RECON_CACHE_DIR or --ct-index-path to move it).
+
+• Offline bulk CT dumps
+  --ct-bulk FILE — read names from local JSONL/CSV cert dumps (.gz ok; repeat for several files)
+  instead of crt.sh. The dumps are indexed once (sorted reversed-label file under
+  ~/.cache/recon-pilot/bulk/), then every scope domain is a memory-mapped range lookup.
+
+• Asyncio DNS engine
+  --dns-async — resolve on one event loop; all record types for a host go out at once.
+  --dns-concurrency N — queries in flight across all hosts (default 500; keep below `ulimit -n`).
+  Combined with --dns-fast, only A/AAAA are queried at all.
+
+• Adaptive DNS concurrency
+  --dns-adaptive — start at 8 queries in flight, double while answers stay fast and clean, then
+  +1 per round trip; halve on timeout/SERVFAIL spikes. --dns-workers N (threads, default 64) or
+  --dns-concurrency N (with --dns-async) is the cap. Hosts with failed lookups get up to two
+  retry passes (RECON_DNS_RETRIES). Whatever still fails is listed in artifacts/dns_failures.
+
+• Several resolvers of mixed quality
+  --dns-balance — score each scope resolver (health × latency) and spread queries by score instead
+  of always asking the first one. A query slower than its resolver's p95 is hedged on a second
+  resolver (first good answer wins; RECON_DNS_HEDGE=0 turns hedging off). Five failures in a row
+  bench a resolver for 30s (RECON_DNS_COOLDOWN), doubling on relapse. -v logs per-resolver stats.
+
+• Persistent DNS answer cache
+  --dns-cache — reuse answers across runs until their TTL (or negative TTL) expires.
+  Stored in ~/.cache/recon-pilot/dns_cache.sqlite (RECON_CACHE_DIR or --dns-cache-path to move it).
+
+• Compact streaming artifacts
+  --artifact-format ndjson — list artifacts as one JSON record per line; dns_records is
+  written host by host as results arrive (completion order) instead of in one burst.
+  --compress gzip|zstd — compress list artifacts (.gz / .zst; zstd needs `pip install zstandard`).
+  `recon diff` and the run-to-run delta read every format.
+
+• Incremental re-resolution
+  --incremental — reuse the newest earlier run's DNS answers while their TTL lasts; only new,
+  expired and sampled hosts are queried. Carried records are marked "carried_from" in dns_records.
+  --refresh-sample F — also re-check about F of the carried hosts each run, rotating (default 0.1).
+
+• Pipelined CT → DNS
+  --pipeline — resolve each CT domain's hosts (and the seeds) while the other domains are still
+  being fetched. A bounded queue (RECON_PIPELINE_QUEUE, default 10000) makes CT wait if DNS
+  falls behind. Works with --dns-workers and --dns-async; artifacts are the same.
+
+• Wildcard DNS detection
+  --wildcard-detect — probe each scope domain with random labels; hosts that only get the
+  wildcard answer are marked (and listed in artifacts/wildcard_hosts.json).
+  --collapse-wildcard — also drop those hosts from dns_records.json and the casefile inventory.
+  (Names that return NXDOMAIN are always answered with one query instead of six.)
+
+• Confirm dangling CNAMEs
+  --cname-check — after DNS, resolve every distinct CNAME target once (A query, shared by all
+  hosts pointing at it; --dns-cache applies). NXDOMAIN targets turn "Potential Dangling CNAME"
+  into a confirmed finding; statuses go to artifacts/cname_targets.json.
+
+Tip: when you don’t use any speed flags, the CLI hints:
+“Tip: for faster results, try --dns-fast, --skip-internal, --dns-workers N, or --dns-async.”
+
+──────────────────────────── Ready-Made Run Recipes ────────────────────────────
+• Normal (baseline, comprehensive)
+  ./recon run -i --out runs --tag normal
+
+• Normal + visibility (adds heartbeats/spinner only)
+  ./recon run -i -v --out runs --tag vis
+
+• DNS fast path + concurrency (keep everything in scope)
+  ./recon run -i -v --dns-fast --dns-workers 20 --out runs --tag turbo
+
+• Turbo + skip internal-looking (fastest on large orgs)
+  ./recon run -i -v --dns-fast --skip-internal --dns-workers 20 --out runs --tag turbo-skip
+
+• Scoped file + speed flags (skip prompts)
+  ./recon run --scope scope.yaml -v --dns-fast --dns-workers 20 --out runs --tag scoped-fast
+
+• Large scopes (tens of thousands of CT hosts)
+  ./recon run --scope scope.yaml -v --dns-async --dns-concurrency 1000 --out runs --tag async
+
+• Nightly run (CT delta + DNS cache), then a quick offline re-run of the same scope
+  ./recon run --scope scope.yaml -v --ct-index --dns-async --dns-cache --out runs --tag nightly
+  ./recon run --scope scope.yaml -v --ct-offline --dns-async --dns-cache --out runs --tag replay
+
+• Many scope domains (hundreds of apex domains)
+  ./recon run --scope scope.yaml -v --ct-workers 4 --ct-rps 2 --dns-async --pipeline --out runs --tag wide
+
+• Daily re-runs of the same scope (answers still within TTL come from cache)
+  ./recon run --scope scope.yaml -v --dns-async --dns-cache --out runs --tag daily
+
+• Frequent monitoring runs (only new / expired / sampled hosts are queried)
+  ./recon run --scope scope.yaml -v --dns-async --incremental --out runs --tag monitor
+
+──────────────────── Opening Reports (Newest or Specific) ──────────────────────
+• Open the newest HTML casefile — default browser (preferred)
+  xdg-open "$(ls -td runs/* | head -1)/casefile.html"
+
+• Open the newest HTML casefile — Firefox explicitly
+  firefox --new-window "$(ls -td runs/* | head -1)/casefile.html"
+
+• Open the newest Markdown casefile
+  xdg-open "$(ls -td runs/* | head -1)/casefile.md"
+  # or:
+  less "$(ls -td runs/* | head -1)/casefile.md"
+
+• Huge inventories: the casefile keeps the first 5000 hosts (RECON_INVENTORY_PAGE) and links
+  the rest as pages under the run's inventory/ folder (inventory-0002.html, …).
+
+• Work with a specific run
+  RUN="runs/run-YYYYMMDD-HHMMSSZ[-tag]"
+  xdg-open "$RUN/casefile.html"
+  # artifacts folder:
+  ls -lh "$RUN/artifacts"
+
+──────────────────── Helpful “During Run” & Diagnostics ────────────────────────
+• Watch newest run’s artifacts appear/grow
+  watch -n 1 -d 'ls -lh "$(ls -td runs/* | head -1)"/artifacts'
+
+• Time a run (wall/CPU/RSS)
+  /usr/bin/time -f 'Elapsed: %E  CPU: %P  RSS: %M KB' ./recon run -i --out runs --tag bench
+
+• Phase timings and resolver metrics (newest run)
+  jq .phases "$(ls -td runs/* | head -1)"/artifacts/metrics.json
+  Every run writes artifacts/metrics.json: wall/CPU per phase (ct, dns, findings, history, render,
+  total), CT bytes/rows, DNS queries per resolver/rtype/status with latency histograms, hosts/s
+  and peak RSS. -v prints a one-line summary.
+  --metrics-textfile /var/lib/node_exporter/textfile/recon.prom — same data for Prometheus.
+
+• Offline benchmark (stub DNS + fake crt.sh on localhost; hosts/s, p50/p99, peak RSS)
+  python benchmarks/run.py --workers 1,20,50 --sizes 500,5000 --latency-ms 20
+  # --save base.json, then --compare base.json exits 1 on a regression.
+  # Resolvers may carry a port (127.0.0.1:5353); RECON_CT_URL replaces the crt.sh URL template.
+
+• Diff two runs (new/removed hosts + changed A/AAAA/CNAME/MX/TXT/NS values)
+  ./recon diff --a runs/run-OLD --b runs/run-NEW --out runs/diff.md
+  xdg-open runs/diff.md
+  # runs/diff.json has the same changes for scripts (--json PATH to move it);
+  # both runs are streamed through a sorted merge, so memory stays flat on huge runs.
+
+• Resume an interrupted run (Ctrl-C, OOM, sleep) — finished CT domains/hosts come from its journal
+  ./recon run --resume runs/run-YYYYMMDD-HHMMSSZ-tag -v --dns-async
+  (repeat the original speed/output flags; the scope is read from RUN_DIR/journal.ndjson)
+
+• Split a big scope over processes or machines (CT by scope domain, DNS by host, both by hash)
+  for i in 1 2 3 4; do ./recon run --scope scope.yaml --out runs --shard $i/4 --dns-async & done; wait
+  ./recon merge runs/shard-*            # one run-* dir: artifacts, delta, history, casefile
+  (each domain's CT is pulled by one shard and read by the others from the shared --out,
+   waiting up to RECON_SHARD_WAIT seconds; merge refuses shards that did not finish)
+
+• Scheduled runs in one long-lived process (warm DNS cache, inventory and CT index between cycles)
+  ./recon monitor --scope scope.yaml --out runs --every 6h --ct-every 1d --dns-async
+  ./recon monitor-ctl status              # or: run [SCOPE] | stop   (socket: runs/monitor.sock)
+
+• Run history (runs/history.sqlite, filled by every run; older run dirs are imported once)
+  ./recon query --out runs                                  # runs and host counts
+  ./recon query --out runs --host api.example.com           # first/last seen, runs, latest records
+  ./recon query --out runs --flapped                        # hosts that disappeared and came back
+  ./recon query --out runs --since run-20250101-000000Z     # hosts first seen since a run
+  Add --json for machine-readable output; --no-history on `run` skips recording.
+
+────────────────── Make `recon` Globally Available (no ./) ────────────────────
+This is optional, but a nice QoL improvement. After this, you can type `recon` from any directory.
+
+• Per-user symlink into ~/.local/bin (recommended)
+  mkdir -p ~/.local/bin
+  ln -sf "$(pwd)/recon" ~/.local/bin/recon
+
+  # ensure ~/.local/bin is on PATH for your shell:
+  grep -q 'export PATH="$HOME/.local/bin:$PATH"' ~/.bashrc || \
+    echo 'export PATH="$HOME/.local/bin:$PATH"' >> ~/.bashrc
+  source ~/.bashrc
+  # now you can run globally:
+  recon doctor
+
+  # undo:
+  rm -f ~/.local/bin/recon
+
+• Temporary PATH for current shell (session-only)
+  export PATH="$(pwd):$PATH"
+  recon doctor
+
+Keep the symlink pointing at your dev-box repo. If you move the repo folder, update or recreate the link.
+
+──────────────────────────── Troubleshooting (Fast Answers) ───────────────────────────
+• “recon: command not found” → use ./recon from repo root, or add the symlink above.
+• “ModuleNotFoundError: typer” → run via the project’s venv (./setup_venv.sh again if needed).
+• “Run finished too fast / 0 hosts” → -v will show if crt.sh kept returning 429/503 after backoff
+  (the per-domain line says so too). Lower --ct-rps / --ct-workers, or re-try when:
+  curl -s -o /dev/null -w '%{http_code}\n' 'https://crt.sh/?q=%25.google.com&output=json'
+  returns 200.
+• DNS feels slow → try --dns-workers 20 and/or --dns-fast. Keep default for full coverage runs.
+  For very large scopes prefer --dns-async; thread count stops scaling long before the network does.
+• “Too many open files” with --dns-async → lower --dns-concurrency or raise `ulimit -n`.
+"""
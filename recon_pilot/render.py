@@ -1,39 +1,45 @@
 from __future__ import annotations
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 import html
+import os
+import re
+
+# inventory lines kept in the casefile itself; the rest goes to linked shard files
+INVENTORY_PAGE = int(os.getenv("RECON_INVENTORY_PAGE", "5000"))
+SHARD_DIR = "inventory"
 
 # --- Markdown (Jinja) ---
 
+@lru_cache(maxsize=None)
+def get_env(template_dir: str) -> Environment:
+    """One Jinja environment per template directory; templates compile once per process."""
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        autoescape=select_autoescape(disabled_extensions=("md",))
+    )
+
+
+def iter_casefile(template_dir: Path, context: dict) -> Iterator[str]:
+    """Stream the Markdown report from templates/casefile.md.j2 chunk by chunk."""
+    tpl = get_env(str(template_dir)).get_template("casefile.md.j2")
+    return tpl.generate(**context)
+
+
 def render_casefile(template_dir: Path, context: dict) -> str:
     """
     Render the Markdown report from templates/casefile.md.j2.
     The template can now reference 'delta' provided by cli.py.
     """
-    env = Environment(
-        loader=FileSystemLoader(str(template_dir)),
-        autoescape=select_autoescape(disabled_extensions=("md",))
-    )
-    tpl = env.get_template("casefile.md.j2")
-    return tpl.render(**context)
+    return "".join(iter_casefile(template_dir, context))
 
 # --- HTML helpers ---
 
-def render_casefile_html(template_dir: Path, context: Dict[str, Any]) -> str:
-    """
-    Convert the Jinja-rendered Markdown to HTML.
-    Uses the 'markdown' package if present; otherwise falls back to <pre>.
-    """
-    md = render_casefile(template_dir, context)
-    try:
-        from markdown import markdown as md_to_html
-        body = md_to_html(md, extensions=["fenced_code", "tables"])
-    except Exception:
-        body = f"<pre>{html.escape(md)}</pre>"
-
-    org = str(context.get("org", ""))
-    html_doc = f"""<!doctype html>
+def _html_head(org: str) -> str:
+    return f"""<!doctype html>
 <html lang="en">
 <head>
 <meta charset="utf-8">
@@ -55,11 +61,67 @@ def render_casefile_html(template_dir: Path, context: Dict[str, Any]) -> str:
 </head>
 <body>
   <div class="container">
-    {body}
+    """
+
+
+_HTML_TAIL = """
   </div>
 </body>
 </html>"""
-    return html_doc
+
+# links to inventory shards point at the .md files; the HTML report links the .html twins
+_SHARD_LINK = re.compile(r"\((\.\./casefile|" + SHARD_DIR + r"/[^)\s]+)\.md\)")
+
+
+def _md_converter() -> Callable[[str], str]:
+    """
+    Markdown → HTML for one section at a time; the converter is built once and reset
+    between sections. Uses the 'markdown' package if present; otherwise falls back to <pre>.
+    """
+    try:
+        import markdown
+        md = markdown.Markdown(extensions=["fenced_code", "tables"])
+    except Exception:
+        return lambda text: f"<pre>{html.escape(text)}</pre>"
+
+    def _convert(text: str) -> str:
+        md.reset()
+        return md.convert(_SHARD_LINK.sub(r"(\1.html)", text))
+    return _convert
+
+
+def iter_sections(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Regroup streamed Markdown into top-level sections (split before each '## ' heading,
+    never inside a fenced code block), so each one can be converted on its own.
+    """
+    section: List[str] = []
+    fenced = False
+    tail = ""
+    for chunk in chunks:
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            if line.startswith("```"):
+                fenced = not fenced
+            elif line.startswith("## ") and not fenced and section:
+                yield "\n".join(section) + "\n"
+                section = []
+            section.append(line)
+    if tail:
+        section.append(tail)
+    if section:
+        yield "\n".join(section) + "\n"
+
+
+def render_casefile_html(template_dir: Path, context: Dict[str, Any]) -> str:
+    """
+    Convert the Jinja-rendered Markdown to HTML.
+    Uses the 'markdown' package if present; otherwise falls back to <pre>.
+    """
+    convert = _md_converter()
+    body = "".join(convert(s) for s in iter_sections(iter_casefile(template_dir, context)))
+    return _html_head(str(context.get("org", ""))) + body + _HTML_TAIL
 
 def write_casefile_html(path: Path, template_dir: Path, context: Dict[str, Any]) -> None:
     """Write the HTML report to disk."""
@@ -67,3 +129,63 @@ def write_casefile_html(path: Path, template_dir: Path, context: Dict[str, Any])
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(html_doc, encoding="utf-8")
 
+# --- single-pass casefile (Markdown + HTML + inventory shards) ---
+
+def _write_pair(md_path: Path, html_path: Path, chunks: Iterable[str], org: str) -> None:
+    """Write streamed Markdown and its HTML twin together, one section in memory at a time."""
+    convert = _md_converter()
+    with open(md_path, "w", encoding="utf-8") as md_f, open(html_path, "w", encoding="utf-8") as html_f:
+        html_f.write(_html_head(org))
+
+        def _tee() -> Iterator[str]:
+            for chunk in chunks:
+                md_f.write(chunk)
+                yield chunk
+
+        for section in iter_sections(_tee()):
+            html_f.write(convert(section))
+        html_f.write(_HTML_TAIL)
+
+
+def _shard_chunks(org: str, page: Dict[str, Any], items: List[Dict[str, Any]]) -> Iterator[str]:
+    yield f"# ReconPilot Casefile — {org}\n\n"
+    yield f"## Inventory — hosts {page['first']}–{page['last']}\n\n"
+    yield "[← back to the casefile](../casefile.md)\n\n"
+    for item in items:
+        yield f"- `{item['host']}` — {item['records_summary']}\n"
+
+
+def write_casefile(run_dir: Path, template_dir: Path, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Render casefile.md and casefile.html in one template pass, streamed to disk.
+
+    Inventories longer than INVENTORY_PAGE (env RECON_INVENTORY_PAGE) keep their first
+    page in the casefile; the remaining hosts go to inventory/inventory-NNNN.md/.html
+    shards that the casefile links to (context: inventory_total, inventory_pages).
+    Returns the shard pages written.
+    """
+    org = str(context.get("org", ""))
+    # any sized iterable (e.g. inventory.SummaryView); only one page is held at a time
+    inventory = context.get("inventory") or []
+    total = len(inventory)
+    rows = iter(inventory)
+    page_size = max(1, INVENTORY_PAGE)
+    first = list(islice(rows, page_size))
+    pages: List[Dict[str, Any]] = []
+    if total > page_size:
+        (run_dir / SHARD_DIR).mkdir(parents=True, exist_ok=True)
+        for n, start in enumerate(range(page_size, total, page_size), 2):
+            items = list(islice(rows, page_size))
+            page = {
+                "n": n,
+                "first": start + 1,
+                "last": start + len(items),
+                "md": f"{SHARD_DIR}/inventory-{n:04d}.md",
+                "html": f"{SHARD_DIR}/inventory-{n:04d}.html",
+            }
+            _write_pair(run_dir / page["md"], run_dir / page["html"], _shard_chunks(org, page, items), org)
+            pages.append(page)
+
+    ctx = dict(context, inventory=first, inventory_total=total, inventory_pages=pages)
+    _write_pair(run_dir / "casefile.md", run_dir / "casefile.html", iter_casefile(template_dir, ctx), org)
+    return pages
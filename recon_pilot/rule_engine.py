@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .domain_trie import DomainTrie
+
+# `match:` conditions on record values: names under a domain pattern (suffix trie) ...
+DOMAIN_FIELDS = {"cname": "CNAME", "mx": "MX", "ns": "NS"}
+# ... or substrings anywhere in the value (one automaton for every rule)
+TEXT_FIELDS = {"txt": "TXT"}
+
+Hit = Tuple[str, Optional[str]]  # (rule name, provider)
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton: every pattern occurring in a string in one scan, however
+    many patterns there are. Matching is case-insensitive.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # values of the patterns ending in each state; _out adds those of its fail chain
+        self._own: List[tuple] = [()]
+        self._out: List[tuple] = [()]
+        for pattern, value in patterns:
+            self.add(pattern, value)
+        self._built = False
+
+    def add(self, pattern: str, value=True) -> None:
+        state = 0
+        for ch in pattern.lower():
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = self._goto[state][ch] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+                self._out.append(())
+            state = nxt
+        if state:
+            self._own[state] += (value,)
+        self._built = False
+
+    def _build(self) -> None:
+        # breadth-first: a state's fail link is the longest proper suffix that is also a prefix;
+        # outputs are merged afresh from _own, so add() after a search() rebuilds cleanly
+        self._out = list(self._own)
+        queue = list(self._goto[0].values())
+        for s in queue:
+            self._fail[s] = 0
+        for s in queue:
+            for ch, nxt in self._goto[s].items():
+                queue.append(nxt)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+        self._built = True
+
+    def search(self, text: str) -> List:
+        """Values of the patterns found in `text`, in order of where they end."""
+        if not self._built:
+            self._build()
+        goto, fail, out = self._goto, self._fail, self._out
+        found: List = []
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+@dataclass
+class Rule:
+    name: str
+    title: str = ""
+    # title once a DNS check backs the match up (e.g. the CNAME target is NXDOMAIN)
+    confirmed_title: str = ""
+    issue: str = ""
+    why: str = ""
+    next_steps: List[str] = field(default_factory=list)
+
+
+def _providers(spec) -> Iterable[Tuple[Optional[str], str]]:
+    """(provider, pattern) pairs from `{provider: [patterns]}` or a bare list of patterns."""
+    if isinstance(spec, dict):
+        for provider, patterns in spec.items():
+            for p in [patterns] if isinstance(patterns, str) else patterns or []:
+                yield str(provider), str(p)
+    else:
+        for p in [spec] if isinstance(spec, str) else spec or []:
+            yield None, str(p)
+
+
+class RuleEngine:
+    """
+    Finding rules from the rules YAML, with their `match:` conditions compiled once:
+
+      cname / mx / ns   domain patterns (DomainTrie syntax); a record value under one matches
+      txt               substrings of TXT values, all rules in one Aho-Corasick automaton
+      subdomains: N     zone-level: a scope domain with at least N direct subdomains
+
+    Patterns are given as a list, or grouped by provider ({"GitHub Pages": [github.io]})
+    so findings can name the provider. observe() checks one host against every rule at
+    once, so the cost per host depends on its record values, not on the number of rules.
+    """
+
+    def __init__(self, rules: dict, scope_domains: Iterable[str] = ()):
+        self.rules: Dict[str, Rule] = {}
+        self._domains: Dict[str, DomainTrie] = {}
+        self._text: Dict[str, Automaton] = {}
+        self._subdomains: Dict[str, int] = {}
+        self._scope = {d.lower().strip(".") for d in scope_domains}
+        self._bases: Counter = Counter()
+        self.fingerprints = 0
+
+        domain_hits: Dict[str, Dict[str, List[Hit]]] = {}
+        text_hits: Dict[str, List[Tuple[str, Hit]]] = {}
+        for name, spec in ((rules or {}).get("findings") or {}).items():
+            if not isinstance(spec, dict):
+                continue
+            self.rules[name] = Rule(
+                name=name,
+                title=str(spec.get("title") or name.replace("_", " ").title()),
+                confirmed_title=str(spec.get("confirmed_title") or ""),
+                issue=str(spec.get("issue") or name),
+                why=spec.get("why", ""),
+                next_steps=list(spec.get("next_steps") or []),
+            )
+            for cond, value in (spec.get("match") or {}).items():
+                if cond in DOMAIN_FIELDS:
+                    by_pattern = domain_hits.setdefault(DOMAIN_FIELDS[cond], {})
+                    for provider, pattern in _providers(value):
+                        by_pattern.setdefault(pattern.lower().strip("."), []).append((name, provider))
+                        self.fingerprints += 1
+                elif cond in TEXT_FIELDS:
+                    for provider, pattern in _providers(value):
+                        text_hits.setdefault(TEXT_FIELDS[cond], []).append((pattern, (name, provider)))
+                        self.fingerprints += 1
+                elif cond == "subdomains":
+                    try:
+                        self._subdomains[name] = int(value)
+                    except (TypeError, ValueError):
+                        logging.warning(f"Rules: {name}: 'subdomains' needs a number, got {value!r}")
+                else:
+                    logging.warning(f"Rules: {name}: unknown match condition '{cond}' ignored")
+
+        # one trie per record type; rules sharing a pattern share its node
+        for rtype, by_pattern in domain_hits.items():
+            trie = self._domains[rtype] = DomainTrie()
+            for pattern, hits in by_pattern.items():
+                trie.add(pattern, hits)
+        for rtype, patterns in text_hits.items():
+            self._text[rtype] = Automaton(patterns)
+
+    def rule(self, name: str) -> Rule:
+        return self.rules.get(name) or Rule(name=name)
+
+    def observe(self, host: str, records: Dict[str, List[str]], wildcard: bool = False) -> List[dict]:
+        """
+        Count the host for zone-level rules and match its records against every
+        record rule; returns one issue per matching rule (wildcard answers only count).
+        """
+        self._bases[host.split(".", maxsplit=1)[1] if "." in host else host] += 1
+        if wildcard or not records:
+            return []
+
+        # rule -> (provider of its most specific match, matched values)
+        hits: Dict[str, Tuple[Optional[str], List[str]]] = {}
+        for rtype, trie in self._domains.items():
+            for value in records.get(rtype) or ():
+                # MX values carry the preference: "10 mx.example.com."
+                target = value.split()[-1] if rtype == "MX" and value.strip() else value
+                for matched in trie.matches(target):
+                    for rule, provider in matched:
+                        _, values = hits.setdefault(rule, (provider, []))
+                        if value not in values:
+                            values.append(value)
+        for rtype, automaton in self._text.items():
+            for value in records.get(rtype) or ():
+                for rule, provider in automaton.search(value):
+                    _, values = hits.setdefault(rule, (provider, []))
+                    if value not in values:
+                        values.append(value)
+
+        issues = []
+        for name, (provider, values) in hits.items():
+            issue = {"host": host, "type": self.rules[name].issue, "rule": name, "evidence": values}
+            if provider:
+                issue["provider"] = provider
+            issues.append(issue)
+        return issues
+
+    def finding(self, issue: dict) -> dict:
+        """
+        The casefile finding for an issue from observe(). An issue may carry
+        "target_status" ({CNAME value: DNS status of the target}, see --cname-check);
+        an NXDOMAIN target confirms it.
+        """
+        rule = self.rule(issue.get("rule", ""))
+        status = issue.get("target_status") or {}
+        evidence = ", ".join(
+            f"{v} [{status[v]}]" if v in status else v for v in issue.get("evidence", [])
+        )
+        if issue.get("provider"):
+            evidence += f" ({issue['provider']})"
+        confirmed = "NXDOMAIN" in status.values()
+        return {
+            "title": rule.confirmed_title if confirmed and rule.confirmed_title else rule.title,
+            "asset": issue["host"],
+            "why": rule.why,
+            "evidence": evidence,
+            "next_steps": rule.next_steps,
+        }
+
+    def zone_findings(self) -> List[dict]:
+        """Findings of the zone-level rules, over every host observed so far."""
+        findings = []
+        for name, minimum in self._subdomains.items():
+            rule = self.rule(name)
+            for base, cnt in sorted(self._bases.items()):
+                if cnt >= minimum and base in self._scope:
+                    findings.append({
+                        "title": rule.title,
+                        "asset": base,
+                        "why": rule.why,
+                        "evidence": f"{cnt} subdomains observed in CT for {base}",
+                        "next_steps": rule.next_steps,
+                    })
+        return findings
@@ -0,0 +1,805 @@
+from __future__ import annotations
+
+# `recon run`, phase by phase. cli.run() turns its options into a RunState and hands it
+# to each phase in turn:
+#
+#   probe_zones(st)          --wildcard-detect fingerprints of the scope domains
+#   discover(st)             CT (pulled, replayed from the journal or read from the shard
+#                            that owns the domain) and seeds -> the hosts to resolve
+#   dns_phase(st, hosts)     journal replay, --incremental carry, the first pass,
+#                            --dns-adaptive retries, the --cname-check stage, DNS artifacts
+#   finish_run(st)           shard completion, or findings/history/delta/casefile; metrics
+#
+# Only modules without third-party imports up here: cli imports this at startup (see
+# benchmarks/import_budget.py); the CT/DNS engines load inside the phases.
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+import logging
+import sqlite3
+import threading
+import time
+
+from .console import console
+from .history import HistoryDB, history_path
+from .incremental import CarryForward, remember
+from .inventory import HostList, Inventory, SummaryView
+from .journal import Journal, JournalState
+from .metrics import METRICS, peak_rss_bytes, write_textfile
+from .pipeline import HostFeed, Producer, bounded_map
+from .shard import SHARD_WAIT, Shard, owner_ct, read_marker, update_marker, zones_artifact
+from .modules.dns_planner import DEFAULT_CONCURRENCY, HostResult, WildcardProfile
+from .rule_engine import RuleEngine
+from .utils import NdjsonWriter, artifact_path, find_artifact, iter_artifact, write_artifact, write_json
+
+if TYPE_CHECKING:
+    from .modules.ct_sources import CTSource
+    from .modules.dns_adaptive import AIMD, ThreadGate
+    from .modules.dns_cache import DnsCache
+    from .scope import Scope
+
+
+@dataclass
+class RunOptions:
+    """The `recon run` options the phases read (defaults as on the command line)."""
+    verbose: bool = False
+    dns_fast: bool = False
+    skip_internal: bool = False
+    ct_workers: int = 1
+    ct_rps: float = 1.0
+    ct_index: bool = False
+    ct_offline: bool = False
+    ct_index_path: Optional[Path] = None
+    ct_bulk: List[Path] = field(default_factory=list)
+    dns_workers: int = 0
+    dns_async: bool = False
+    dns_concurrency: int = DEFAULT_CONCURRENCY
+    dns_adaptive: bool = False
+    dns_balance: bool = False
+    dns_cache: bool = False
+    dns_cache_path: Optional[Path] = None
+    artifact_format: str = "json"
+    compress: str = "none"
+    wildcard_detect: bool = False
+    collapse_wildcard: bool = False
+    cname_check: bool = False
+    incremental: bool = False
+    refresh_sample: float = 0.1
+    pipeline: bool = False
+    history: bool = True
+    metrics_textfile: Optional[Path] = None
+
+
+@dataclass
+class RunState:
+    """
+    One run in progress: what it runs with (scope, options, shard, journal and the work
+    an interrupted run already did) and what it has found so far. DNS results arrive
+    from several threads; `lock` guards the result fields while they do.
+    """
+    scope: Scope
+    opts: RunOptions
+    run_dir: Path
+    out: Path
+    engine: RuleEngine
+    record_types: Sequence[str]
+    shard: Optional[Shard] = None
+    journal: Optional[Journal] = None
+    resumed: JournalState = field(default_factory=JournalState)
+    started: float = 0.0  # METRICS.clock() when the run began
+
+    # hosts found (a set until CT is done, then a HostList); --pipeline hands them to DNS through `feed`
+    hosts: Union[Set[str], HostList] = field(default_factory=set)
+    feed: Optional[HostFeed] = None
+    wildcards: Dict[str, WildcardProfile] = field(default_factory=dict)
+    inventory: Inventory = field(default_factory=Inventory)
+    dns_issues: List[Dict[str, object]] = field(default_factory=list)
+    dns_failures: List[Dict[str, object]] = field(default_factory=list)
+    wildcard_hosts: List[str] = field(default_factory=list)
+    queries: int = 0
+    # --cname-check: CNAME target -> hosts pointing at it
+    cname_refs: Optional[Dict[str, Set[str]]] = None
+    # NDJSON: dns_records written one line per host as it finishes
+    records_out: Optional[NdjsonWriter] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def artifacts_dir(self) -> Path:
+        return self.run_dir / "artifacts"
+
+    @property
+    def ct_domains(self) -> List[str]:
+        """Scope domains this run pulls CT for (--shard: its own; local CT is read whole)."""
+        if self.shard is not None and not (self.opts.ct_bulk or self.opts.ct_offline):
+            return self.shard.domains(self.scope.domains)
+        return list(self.scope.domains)
+
+    def artifact(self, stem: str, items) -> None:
+        write_artifact(self.artifacts_dir, stem, items, self.opts.artifact_format, self.opts.compress)
+
+    def total(self) -> int:
+        # pipelined runs only know the hosts CT has produced so far
+        return self.feed.count if self.feed is not None else len(self.hosts)
+
+
+# --- runs on disk ---
+
+def list_runs(out_dir: Path) -> List[Path]:
+    """Return run directories like run-YYYYMMDD-HHMMSSZ (oldest→newest)."""
+    return sorted([p for p in out_dir.glob("run-*") if p.is_dir()])
+
+
+def _load_hosts(artifacts_dir: Path) -> Set[str]:
+    """
+    Load inventory_hosts from a run's artifacts directory (JSON or NDJSON, any compression).
+    Accepts either a list of hosts or a dict with a 'hosts'/'items' list.
+    Returns an empty set on any error.
+    """
+    inv = find_artifact(artifacts_dir, "inventory_hosts")
+    if inv is None:
+        return set()
+    hosts: Set[str] = set()
+    try:
+        for x in iter_artifact(inv):
+            h = str(x).strip().lower()
+            if h:
+                hosts.add(h)
+    except Exception:
+        return set()
+    return hosts
+
+
+def previous_records_run(out_dir: Path, current: Path) -> Optional[Path]:
+    """Newest run in `out_dir` (other than `current`) that has a dns_records artifact."""
+    for run_dir in reversed(list_runs(out_dir)):
+        if run_dir.name < current.name and find_artifact(run_dir / "artifacts", "dns_records"):
+            return run_dir
+    return None
+
+
+def compute_delta(current_artifacts: Path, out_dir: Path, history: Optional[HistoryDB] = None):
+    """
+    Compare the current run's hosts to the previous run in `out_dir`.
+    Returns a dict:
+      {
+        "prev_run": "run-YYYYMMDD-HHMMSSZ[-tag]" | None,
+        "counts": {"new": int, "removed": int},
+        "new_hosts": [...], "removed_hosts": [...]
+      }
+    With a history database (which already holds the current run) this is an indexed
+    query; otherwise, or if the database fails, the run directories are re-read.
+    """
+    if history is not None:
+        try:
+            return history.delta(current_artifacts.parent.name)
+        except sqlite3.Error as e:
+            logging.warning(f"History: delta query failed ({e}); falling back to run directories.")
+
+    runs = list_runs(out_dir)
+    if not runs or len(runs) < 2:
+        return {
+            "prev_run": None,
+            "counts": {"new": 0, "removed": 0},
+            "new_hosts": [],
+            "removed_hosts": [],
+        }
+
+    prev_run = runs[-2]
+    prev_hosts = _load_hosts(prev_run / "artifacts")
+    curr_hosts = _load_hosts(current_artifacts)
+
+    new_hosts = sorted(curr_hosts - prev_hosts)
+    removed_hosts = sorted(prev_hosts - curr_hosts)
+
+    return {
+        "prev_run": prev_run.name,
+        "counts": {"new": len(new_hosts), "removed": len(removed_hosts)},
+        "new_hosts": new_hosts,
+        "removed_hosts": removed_hosts,
+    }
+
+
+def looks_internal(host: str) -> bool:
+    """
+    Heuristic for internal-looking hosts.
+    Conservative defaults: match *.corp.* or obvious internal suffixes.
+    (Skipped only when --skip-internal is set.)
+    """
+    h = host.lower()
+    if ".corp." in h:
+        return True
+    if h.endswith(".internal") or h.endswith(".local") or h.endswith(".lan"):
+        return True
+    return False
+
+
+# --- CT ---
+
+def probe_zones(st: RunState) -> None:
+    """--wildcard-detect: fingerprints only depend on the scope domains, so probe before any host is resolved."""
+    from .modules.dns_async import probe_wildcards
+    st.wildcards = probe_wildcards(st.scope.domains, st.scope.resolvers, max(st.opts.dns_concurrency, 1))
+    for base, profile in sorted(st.wildcards.items()):
+        answers = sorted(profile.cname | profile.a | profile.aaaa)
+        console.print(f"[yellow]dns:[/] wildcard zone *.{base} → {', '.join(answers)}")
+    logging.info(f"DNS: {len(st.wildcards)} wildcard zone(s) among {len(st.scope.domains)} base domain(s).")
+
+
+def open_ct_source(opts: RunOptions) -> CTSource:
+    from .modules.ct_index import CTIndex, default_index_path
+    from .modules.ct_sources import BulkFileSource, CrtShSource, IndexSource
+    if opts.ct_bulk:
+        return BulkFileSource(opts.ct_bulk)
+    if opts.ct_index or opts.ct_offline:
+        return IndexSource(CTIndex(opts.ct_index_path or default_index_path()), offline=opts.ct_offline)
+    return CrtShSource()
+
+
+def on_ct(st: RunState, base: str, names: List[str], status: str, via: Optional[str] = None) -> None:
+    """One scope domain's CT: pulled here, or `via` the journal or the shard that owns it."""
+    hosts = list(st.scope.filter_hosts(names))
+    note = f" [yellow]({status})[/]" if status != "ok" else (f" ({via})" if via else "")
+    console.print(f"  {base}: found {len(hosts)} hosts in-scope{note}")
+    if via is None:
+        st.artifact(f"ct_{base}", hosts)
+        if st.shard is not None:
+            update_marker(st.run_dir, ct=(base, status))  # the other shards read it from here
+    if st.journal is not None and status == "ok" and via != "from journal":
+        # a failed fetch is not done: --resume fetches it again
+        st.journal.ct(base, hosts, status)
+    if st.shard is not None:
+        hosts = st.shard.filter(hosts)
+    if st.feed is not None:
+        st.feed.put(hosts)
+    else:
+        st.hosts.update(hosts)
+
+
+def ct_from_shards(st: RunState, domains: List[str], poll: float = 2.0) -> List[str]:
+    """The other shards' CT, as their owners publish it; returns the domains that never came."""
+    shard = st.shard
+    since = (read_marker(st.run_dir) or {}).get("started", time.time()) - SHARD_WAIT
+    deadline = time.monotonic() + SHARD_WAIT
+    scope = st.scope.to_dict()
+    waiting = list(domains)
+    logging.info(f"Shard: waiting for the CT of {len(waiting)} domain(s) from the shards that own them.")
+    while True:
+        for base in list(waiting):
+            got = owner_ct(st.out, shard, scope, base, since)
+            if got is not None:
+                waiting.remove(base)
+                on_ct(st, base, got[0], got[1], via=f"from shard {shard.owner(base)}/{shard.count}")
+        if not waiting or time.monotonic() >= deadline:
+            return waiting
+        time.sleep(poll)
+
+
+def ct_phase(st: RunState, source: CTSource) -> None:
+    """CT for every scope domain: journal replay, then this run's own domains, then (--shard) the others."""
+    o = st.opts
+    started = METRICS.clock()
+    try:
+        for base in st.scope.domains:
+            if base in st.resumed.ct:
+                on_ct(st, base, st.resumed.ct[base], "ok", via="from journal")
+        own = st.ct_domains
+        todo = [d for d in own if d not in st.resumed.ct]
+        source.collect(todo, o.ct_workers, o.ct_rps, partial(on_ct, st))
+        others = [d for d in st.scope.domains if d not in own and d not in st.resumed.ct]
+        if st.shard is not None and others:
+            missing = ct_from_shards(st, others)
+            if missing:
+                logging.warning(
+                    f"Shard: no CT from the owning shard(s) within {SHARD_WAIT:g}s for "
+                    f"{', '.join(missing)}; pulling it here."
+                )
+                source.collect(missing, o.ct_workers, o.ct_rps, partial(on_ct, st))
+    finally:
+        source.close()
+        METRICS.end_phase("ct", started)
+    logging.info("CT: done.")
+
+
+def discover(st: RunState) -> Tuple[Iterable[str], Optional[Producer]]:
+    """
+    CT and seed hosts. Returns the hosts to resolve and, with --pipeline, the thread
+    running CT (the hosts are then its live feed; dns_phase joins it).
+    """
+    o = st.opts
+    if o.pipeline:
+        # CT results and seeds go straight to DNS through a bounded, de-duplicating feed
+        st.feed = HostFeed(accept=(lambda h: not looks_internal(h)) if o.skip_internal else None)
+
+    logging.info("CT: starting certificate transparency discovery...")
+    source = open_ct_source(o)
+    ct_domains = st.ct_domains
+    if st.shard is not None:
+        console.print(
+            f"[cyan]shard:[/] {st.shard} — CT for {len(ct_domains)} of {len(st.scope.domains)} scope "
+            f"domain(s), DNS for 1/{st.shard.count} of the hosts"
+        )
+    if o.ct_offline and not o.ct_bulk:
+        missing = [d for d in ct_domains if not source.index.has(d)]
+        if missing:
+            console.print(f"[yellow]ct:[/] not in the local index yet: {', '.join(missing)}")
+    if source.remote and o.ct_workers > 1:
+        logging.info(f"CT: {o.ct_workers} concurrent request(s), at most {o.ct_rps:g} request(s)/s.")
+    console.print(f"[cyan]ct:[/] querying {source.label} for {len(ct_domains)} domain(s)...")
+
+    # Include seed hosts from scope (filtered to in-scope)
+    seed_hosts = set(st.scope.filter_hosts(st.scope.seeds.get("hosts", [])))
+    if st.shard is not None:
+        seed_hosts = set(st.shard.filter(seed_hosts))
+    st.artifact("seed_hosts", sorted(seed_hosts))
+
+    if st.feed is not None:
+        logging.info("Pipeline: resolving hosts as CT results arrive.")
+        st.feed.seen.update(st.resumed.hosts)  # resolved before the interruption; replayed by dns_phase
+        st.feed.put(sorted(seed_hosts))
+        producer = Producer(partial(ct_phase, st, source), st.feed, name="ct")
+        producer.start()
+        return st.feed, producer
+
+    ct_phase(st, source)
+    st.hosts.update(seed_hosts)
+
+    # Optional host filtering (skip internal-looking hosts) — opt-in only
+    if o.skip_internal:
+        before = len(st.hosts)
+        st.hosts = {h for h in st.hosts if not looks_internal(h)}
+        logging.info(f"Scope filter: skipped {before - len(st.hosts)} internal-looking host(s).")
+
+    # compact sorted host list (names in one blob); the set goes away
+    st.hosts = HostList(st.hosts)
+    st.artifact("inventory_hosts", st.hosts)
+    if st.resumed.hosts:
+        return [h for h in st.hosts if h not in st.resumed.hosts], None
+    return st.hosts, None
+
+
+# --- DNS ---
+
+@dataclass
+class DnsSetup:
+    """How a run resolves: worker threads (0 = serial or async), balancing, --dns-adaptive, cache."""
+    threads: int = 0
+    balance: bool = False
+    # --dns-adaptive: one AIMD limit steers every pass (threads: ThreadGate; async: AsyncGate)
+    adaptive: Optional[AIMD] = None
+    gate: Optional[ThreadGate] = None
+    cache: Optional[DnsCache] = None
+
+
+def dns_setup(st: RunState) -> DnsSetup:
+    from .modules.dns_adaptive import ADAPTIVE_THREADS, AIMD, ThreadGate
+    from .modules.dns_cache import default_cache_path, open_cache
+    o = st.opts
+    d = DnsSetup(threads=o.dns_workers if o.dns_workers and o.dns_workers > 1 else 0, balance=o.dns_balance)
+    if o.dns_cache:
+        d.cache = open_cache(o.dns_cache_path or default_cache_path())
+        logging.info(f"DNS: answer cache at {d.cache.path}")
+    if o.dns_adaptive:
+        if o.dns_async:
+            d.adaptive = AIMD(o.dns_concurrency)
+        else:
+            d.threads = d.threads or ADAPTIVE_THREADS
+            d.adaptive = AIMD(d.threads)
+            d.gate = ThreadGate(d.adaptive)
+    if d.balance and len(st.scope.resolvers) < 2:
+        logging.warning("DNS: --dns-balance needs at least two resolvers in the scope; ignoring it.")
+        d.balance = False
+    return d
+
+
+def host_item(st: RunState, h: str, result: HostResult, carried_from: Optional[str] = None) -> Tuple[Dict[str, object], List[dict]]:
+    """A dns_records item for `h` and the per-host findings its records raise."""
+    recs = result.records
+    if st.opts.dns_fast:
+        # output-only: keep A/AAAA
+        recs = {k: v for k, v in recs.items() if k in ("A", "AAAA") and v}
+    item: Dict[str, object] = {"host": h, "records": recs}
+    if result.ttl is not None:
+        item["ttl"] = result.ttl
+    item["resolved_at"] = result.resolved_at
+    if carried_from:
+        item["carried_from"] = carried_from
+    if result.failed:
+        # lookups that timed out / SERVFAILed: missing types here are unknown, not absent
+        item["failed"] = result.failed
+    if result.wildcard:
+        # answer is the zone's wildcard synthesis; the zone-level finding covers it
+        item["wildcard"] = True
+    # provider fingerprints (dangling CNAMEs, consumer MX, …); wildcard hosts are only counted
+    return item, st.engine.observe(h, recs, bool(result.wildcard))
+
+
+def collect_host(st: RunState, h: str, result: HostResult, carried_from: Optional[str] = None) -> None:
+    """Record one host's result (journal, inventory, findings); safe from any thread."""
+    with st.lock:
+        if result.resolved_at is None:
+            result.resolved_at = int(time.time())
+        if st.journal is not None and h not in st.resumed.hosts and not carried_from:
+            st.journal.host(h, result)
+        st.queries += result.queries
+        item, issues = host_item(st, h, result, carried_from)
+        if result.failed:
+            st.dns_failures.append({"host": h, "failed": result.failed})
+        if item.get("wildcard"):
+            st.wildcard_hosts.append(h)
+            if st.opts.collapse_wildcard:
+                return
+        st.inventory.add(item)
+        if st.cname_refs is not None and not item.get("wildcard"):
+            for target in item["records"].get("CNAME") or ():
+                st.cname_refs.setdefault(target.lower().strip("."), set()).add(h)
+        if st.records_out is not None:
+            st.records_out.write(item)
+        st.dns_issues.extend(issues)
+
+
+def resolve(st: RunState, d: DnsSetup, hosts, on_host: Callable[[str, HostResult], None], label: str = "") -> None:
+    """One pass over `hosts` with the run's DNS engine; `on_host(host, result)` as each finishes."""
+    from .modules.dns import query_host
+    from .modules.dns_async import resolve_hosts
+    o = st.opts
+    done = 0
+
+    def _on_host(host: str, result: HostResult) -> None:
+        nonlocal done
+        on_host(host, result)
+        done += 1
+        if o.verbose and (done % (250 if o.dns_async else 25) == 0):
+            logging.debug(f"DNS{label} progress: {done}/{st.total() if not label else len(hosts)} hosts")
+
+    def _process_host(h: str) -> Tuple[str, HostResult]:
+        return h, query_host(h, st.scope.resolvers, st.record_types, d.cache, st.wildcards, d.gate, d.balance)
+
+    if o.dns_async:
+        with console.status(f"Resolving DNS{label} (async)…", spinner="dots"):
+            resolve_hosts(
+                hosts, st.scope.resolvers, _on_host, o.dns_concurrency, st.record_types, d.cache, st.wildcards,
+                d.adaptive, d.balance,
+            )
+    elif d.threads:
+        with console.status(f"Resolving DNS{label} (parallel)…", spinner="dots"):
+            bounded_map(_process_host, hosts, d.threads, lambda res: _on_host(*res))
+    else:
+        with console.status(f"Resolving DNS{label}…", spinner="dots"):
+            for h in hosts:
+                _on_host(*_process_host(h))
+
+
+def resolve_all(st: RunState, d: DnsSetup, hosts) -> None:
+    """
+    The first pass over `hosts`; with --dns-adaptive, hosts with transient failures wait
+    for the retry rounds instead of being recorded with holes in them.
+    """
+    from .modules.dns_adaptive import RETRY_ROUNDS
+    o = st.opts
+    retry: Dict[str, HostResult] = {}
+
+    def _first_pass(h: str, result: HostResult) -> None:
+        if d.adaptive is not None and result.failed:
+            with st.lock:
+                retry[h] = result
+        else:
+            collect_host(st, h, result)
+
+    if d.adaptive is not None:
+        logging.info(f"DNS: adaptive concurrency, starting at {int(d.adaptive.limit)} (cap {d.adaptive.maximum}).")
+    elif o.dns_async:
+        logging.info(f"DNS: asyncio engine enabled ({o.dns_concurrency} queries in flight).")
+    elif d.threads:
+        logging.info(f"DNS: parallel mode enabled with {d.threads} worker(s).")
+    resolve(st, d, hosts, _first_pass)
+    for attempt in range(1, RETRY_ROUNDS + 1):
+        if not retry:
+            break
+        logging.info(
+            f"DNS: retry {attempt}/{RETRY_ROUNDS} for {len(retry)} host(s) with failed lookups ({d.adaptive.summary()})."
+        )
+        earlier, retry = retry, {}
+
+        def _on_retry(h: str, result: HostResult) -> None:
+            # keep whichever attempt failed fewer lookups; the last round records it either way
+            if len(result.failed) > len(earlier[h].failed):
+                result = earlier[h]
+            if result.failed and attempt < RETRY_ROUNDS:
+                with st.lock:
+                    retry[h] = result
+            else:
+                collect_host(st, h, result)
+
+        resolve(st, d, sorted(earlier), _on_retry, f" retry {attempt}")
+    for h, result in sorted(retry.items()):
+        collect_host(st, h, result)
+
+
+def incremental_carry(st: RunState) -> Optional[CarryForward]:
+    """--incremental: the previous run's answers that may be carried forward (None: resolve everything)."""
+    prev_run = previous_records_run(st.out, st.run_dir)
+    if prev_run is None:
+        logging.info("Incremental: no previous run with DNS records; resolving everything.")
+        return None
+    carry = CarryForward(prev_run, st.opts.refresh_sample, slot=len(list_runs(st.out)))
+    logging.info(f"Incremental: {len(carry)} host(s) on record in {prev_run.name}.")
+    return carry
+
+
+def cname_stage(st: RunState, d: DnsSetup) -> None:
+    """--cname-check: each distinct CNAME target once, instead of once per referring host."""
+    from .modules.dns_async import resolve_names
+    refs = st.cname_refs
+    with METRICS.phase("cname"):
+        answers = resolve_names(refs, st.scope.resolvers, "A", max(st.opts.dns_concurrency, 1), d.cache, d.balance)
+    st.artifact("cname_targets", [
+        {"target": t, "status": answers[t].status, "hosts": sorted(refs[t])}
+        for t in sorted(answers)
+    ])
+    for issue in st.dns_issues:
+        status = {}
+        for value in issue.get("evidence", []):
+            target = value.lower().strip(".")
+            if target in answers and issue["host"] in refs[target]:
+                status[value] = answers[target].status
+        if status:
+            issue["target_status"] = status
+    gone = sum(1 for a in answers.values() if a.status == "NXDOMAIN")
+    logging.info(
+        f"CNAME check: {len(answers)} distinct target(s) for "
+        f"{sum(len(v) for v in refs.values())} host(s); {gone} NXDOMAIN."
+    )
+
+
+def dns_phase(st: RunState, hosts: Iterable[str], producer: Optional[Producer] = None) -> None:
+    """
+    DNS for `hosts` (the list or live feed from discover()), then the DNS artifacts:
+    dns_records, dns_issues, dns_failures (and wildcard_hosts, cname_targets).
+    """
+    from .modules.dns_cache import release_cache
+    from .modules.dns_pool import get_pool
+    o = st.opts
+    carry = incremental_carry(st) if o.incremental else None
+
+    logging.info("DNS: starting resolution pipeline...")
+    d = dns_setup(st)
+    st.cname_refs = {} if o.cname_check else None
+    if o.artifact_format == "ndjson":
+        # completion order instead of one dump at the end
+        st.records_out = NdjsonWriter(artifact_path(st.artifacts_dir, "dns_records", o.artifact_format, o.compress))
+
+    if st.resumed.hosts:
+        # hosts resolved before the interruption go straight to the artifacts again
+        wanted = None if st.feed is not None else st.hosts
+        replay = [h for h in sorted(st.resumed.hosts) if wanted is None or h in wanted]
+        for h in replay:
+            collect_host(st, h, st.resumed.hosts[h])
+        logging.info(f"DNS: {len(replay)} host(s) restored from the journal.")
+
+    if carry is not None:
+        def _needs_dns(names):
+            # hosts whose previous answer is still good are recorded, not queried
+            for h in names:
+                prev = carry.carry(h)
+                if prev is None:
+                    yield h
+                else:
+                    collect_host(st, h, prev, carry.origin(h))
+
+        hosts = _needs_dns(hosts) if st.feed is not None else list(_needs_dns(hosts))
+
+    # with --pipeline this spans CT as well (DNS waits on the feed)
+    dns_started = METRICS.clock()
+    try:
+        resolve_all(st, d, hosts)
+    except BaseException:
+        if st.feed is not None:
+            st.feed.abort()
+        raise
+    METRICS.end_phase("dns", dns_started)
+    if producer is not None:
+        producer.join()
+        if st.feed.skipped:
+            logging.info(f"Scope filter: skipped {st.feed.skipped} internal-looking host(s).")
+        st.hosts = HostList(st.feed.seen)
+        st.artifact("inventory_hosts", st.hosts)
+    # completion order is arbitrary; keep artifacts in host order like the serial path
+    st.inventory.sort()
+
+    if carry is not None:
+        c = carry.counts
+        logging.info(
+            f"Incremental: carried {c['carried']} host(s) from earlier runs; re-resolved {c['new']} new, "
+            f"{c['expired']} expired and {c['sampled']} sampled host(s)."
+        )
+    logging.info(
+        f"DNS: {st.queries} lookup(s) for {len(st.hosts)} host(s) "
+        f"(full sweep: {len(st.hosts) * len(st.record_types)})."
+    )
+    if st.wildcard_hosts:
+        st.wildcard_hosts.sort()
+        st.artifact("wildcard_hosts", st.wildcard_hosts)
+        verb = "collapsed out of" if o.collapse_wildcard else "marked in"
+        logging.info(f"DNS: {len(st.wildcard_hosts)} wildcard-answered host(s) {verb} the inventory.")
+
+    if st.cname_refs:
+        cname_stage(st, d)
+
+    if d.cache is not None:
+        release_cache(d.cache)
+        logging.info(f"DNS: cache {d.cache.hits} hit(s), {d.cache.misses} miss(es).")
+        METRICS.set("dns_cache_hits", d.cache.hits)
+        METRICS.set("dns_cache_misses", d.cache.misses)
+
+    if st.records_out is not None:
+        st.records_out.close()
+    else:
+        st.artifact("dns_records", st.inventory)
+    st.artifact("dns_issues", st.dns_issues)
+    st.dns_failures.sort(key=lambda item: item["host"])
+    st.artifact("dns_failures", st.dns_failures)
+    if d.adaptive is not None:
+        logging.info(f"DNS: adaptive concurrency ended at {d.adaptive.summary()}.")
+    if d.balance:
+        for line in get_pool(st.scope.resolvers).summary():
+            logging.info(f"DNS resolver {line}")
+    if st.dns_failures:
+        logging.warning(
+            f"DNS: {len(st.dns_failures)} host(s) still have failed lookups (timeouts/SERVFAIL); "
+            f"see artifacts/dns_failures. Their records may be incomplete."
+        )
+    logging.info("DNS: done.")
+
+
+# --- report ---
+
+def write_metrics(artifacts_dir: Path, textfile: Optional[Path], hosts: int, queries: int) -> None:
+    """Final gauges, then artifacts/metrics.json (+ the Prometheus textfile when asked)."""
+    dns_wall = METRICS.phases.get("dns", {}).get("wall_s", 0.0)
+    METRICS.set("hosts_total", hosts)
+    METRICS.set("dns_lookups_total", queries)
+    METRICS.set("hosts_per_second", round(hosts / dns_wall, 3) if dns_wall else 0.0)
+    rss = peak_rss_bytes()
+    if rss is not None:
+        METRICS.set("peak_rss_bytes", rss)
+    write_json(artifacts_dir / "metrics.json", METRICS.snapshot())
+    if textfile is not None:
+        write_textfile(textfile, METRICS.to_prometheus())
+
+    phases = ", ".join(f"{k} {v['wall_s']:.1f}s" for k, v in METRICS.phases.items())
+    timeouts = METRICS.counter("dns_queries_total", status="TIMEOUT")
+    rss_note = f"; peak RSS {rss / 2**20:.0f} MiB" if rss else ""
+    logging.info(
+        f"Metrics: {phases}; {hosts / dns_wall if dns_wall else 0:.0f} hosts/s, {timeouts:g} DNS timeout(s){rss_note}."
+    )
+
+
+def write_report(
+    run_dir: Path,
+    out: Path,
+    scope_obj: Scope,
+    engine: RuleEngine,
+    all_hosts: HostList,
+    inventory: Inventory,
+    wildcards: Dict[str, WildcardProfile],
+    wildcard_hosts: List[str],
+    dns_issues: List[Dict[str, object]],
+    history: bool,
+) -> dict:
+    """Findings, history, delta and casefile of a finished run (or of merged shards); returns the delta."""
+    from .render import write_casefile
+    artifacts_dir = run_dir / "artifacts"
+
+    # 3) Findings: map to rules/explanations (with safe fallback)
+    logging.info("Findings: analyzing artifacts…")
+    findings_started = METRICS.clock()
+    findings = []
+
+    # zone-level rules (wildcard exposure hint: many subdomains for a base), counted as hosts came in
+    findings.extend(engine.zone_findings())
+
+    for base, profile in sorted(wildcards.items()):
+        rule = engine.rule("wildcard_dns")
+        n = sum(1 for h in wildcard_hosts if h.endswith("." + base))
+        findings.append({
+            "title": "Wildcard DNS Zone",
+            "asset": f"*.{base}",
+            "why": rule.why,
+            "evidence": f"random labels resolve to {', '.join(sorted(profile.cname | profile.a | profile.aaaa))}; "
+                        f"{n} CT host(s) answered only with the wildcard",
+            "next_steps": rule.next_steps,
+        })
+
+    findings.extend(engine.finding(issue) for issue in dns_issues)
+
+    # Inventory summary lines (respect dns_fast output), produced lazily while rendering
+    inv_summary = SummaryView(inventory)
+
+    METRICS.end_phase("findings", findings_started)
+
+    # 4) Compute simple stats + delta vs previous run
+    history_started = METRICS.clock()
+    history_db: Optional[HistoryDB] = None
+    if history:
+        try:
+            history_db = HistoryDB(history_path(out))
+            history_db.record_run(run_dir.name, all_hosts, inventory, findings, scope_obj.org)
+            history_db.backfill(out)
+        except sqlite3.Error as e:
+            logging.warning(f"History: not recorded ({e}).")
+            history_db = None
+    delta = compute_delta(artifacts_dir, out, history_db)
+    if history_db is not None:
+        history_db.close()
+    write_json(artifacts_dir / "delta.json", delta)
+    METRICS.end_phase("history", history_started)
+
+    stats = {
+        "total_subdomains": len(all_hosts),
+        "new_subdomains": delta["counts"]["new"],
+        "dns_issues": dns_issues,
+    }
+
+    # 5) Render casefile (Markdown + HTML)
+    logging.info("Render: generating casefile.md + casefile.html…")
+    context = {
+        "org": scope_obj.org,
+        "run_time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "scope_domains": scope_obj.domains,
+        "stats": stats,
+        "findings": findings,
+        "inventory": inv_summary,
+        "delta": delta,  # so templates can show what's new/removed
+    }
+
+    template_dir = Path(__file__).parent / "templates"
+    # one template pass, Markdown and HTML streamed together; big inventories are paged out
+    with METRICS.phase("render"):
+        pages = write_casefile(run_dir, template_dir, context)
+    if pages:
+        logging.info(f"Render: inventory split into {len(pages) + 1} page(s) under {run_dir / 'inventory'}")
+    return delta
+
+
+def print_done(run_dir: Path, delta: dict) -> None:
+    console.print(f"\n[green]✔[/] Wrote artifacts → {run_dir / 'artifacts'}")
+    console.print(f"[green]✔[/] Wrote report → {run_dir / 'casefile.md'}")
+    console.print(f"[green]✔[/] Wrote HTML → {run_dir / 'casefile.html'}")
+    if delta["prev_run"]:
+        console.print(
+            f"[bold]Δ since {delta['prev_run']}:[/] +{delta['counts']['new']} new, -{delta['counts']['removed']} removed"
+        )
+    else:
+        console.print(f"[bold]Δ:[/] first run — no prior data")
+
+
+def finish_run(st: RunState) -> None:
+    """
+    A shard marks itself complete (findings, history, delta and the casefile come from
+    `recon merge` over all shards); a run writes its report. Then metrics; the journal last.
+    """
+    if st.shard is not None:
+        if st.wildcards:
+            st.artifact("wildcard_zones", zones_artifact(st.wildcards))
+        METRICS.end_phase("total", st.started)
+        write_metrics(st.artifacts_dir, st.opts.metrics_textfile, len(st.hosts), st.queries)
+        # last: `recon merge` refuses shards without it
+        update_marker(st.run_dir, complete=True)
+        console.print(f"\n[green]✔[/] Wrote shard {st.shard} artifacts → {st.artifacts_dir}")
+        console.print(
+            f"[dim]Combine all {st.shard.count} shard(s) with: recon merge SHARD_DIR... --out {st.out}[/dim]"
+        )
+    else:
+        delta = write_report(
+            st.run_dir, st.out, st.scope, st.engine, st.hosts, st.inventory, st.wildcards, st.wildcard_hosts,
+            st.dns_issues, st.opts.history,
+        )
+        METRICS.end_phase("total", st.started)
+        write_metrics(st.artifacts_dir, st.opts.metrics_textfile, len(st.hosts), st.queries)
+        print_done(st.run_dir, delta)
+        remember(st.run_dir, st.inventory)
+    if st.journal is not None:
+        st.journal.finish()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 import yaml
 
+from .domain_trie import DomainTrie
+
 
 def _normalize_scope_data(data: dict | None) -> dict:
     """Allow both top-level keys and nested under 'scope'."""
@@ -17,6 +19,9 @@ def _normalize_scope_data(data: dict | None) -> dict:
         sb_seeds = scope_block.get("seeds")
         if isinstance(sb_seeds, dict) and "hosts" in sb_seeds:
             data["seeds"] = sb_seeds
+    for key in ("include", "exclude"):
+        if key not in data and isinstance(scope_block, dict) and isinstance(scope_block.get(key), list):
+            data[key] = scope_block[key]
     return data
 
 
@@ -28,11 +33,20 @@ class Scope:
     notes: str = ""
     resolvers: List[str] = field(default_factory=lambda: ["1.1.1.1", "8.8.8.8"])
     seeds: dict = field(default_factory=lambda: {"hosts": []})
+    # extra patterns on top of `domains`: "*.example.net", "api.*.example.org"
+    include: List[str] = field(default_factory=list)
+    # patterns that are never in scope, unless a more specific include re-allows them
+    exclude: List[str] = field(default_factory=list)
+    _trie: Optional[DomainTrie] = field(default=None, init=False, repr=False, compare=False)
 
     @staticmethod
     def load(path: str) -> "Scope":
         with open(path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
+        return Scope.from_dict(data)
+
+    @staticmethod
+    def from_dict(data: dict | None) -> "Scope":
         data = _normalize_scope_data(data)
         return Scope(
             org=data.get("org", ""),
@@ -41,9 +55,45 @@ class Scope:
             notes=data.get("notes", ""),
             resolvers=data.get("resolvers", ["1.1.1.1", "8.8.8.8"]),
             seeds=data.get("seeds", {"hosts": []}),
+            include=data.get("include") or [],
+            exclude=data.get("exclude") or [],
         )
 
+    def to_dict(self) -> dict:
+        """Plain data (what from_dict() reads back), e.g. to store a scope next to a run."""
+        return {
+            "org": self.org,
+            "domains": list(self.domains),
+            "policy": dict(self.policy),
+            "notes": self.notes,
+            "resolvers": list(self.resolvers),
+            "seeds": dict(self.seeds),
+            "include": list(self.include),
+            "exclude": list(self.exclude),
+        }
+
+    def matcher(self) -> DomainTrie:
+        """
+        Scope compiled into one reversed-label trie (built on first use):
+        domains/include map to True, exclude to False; the most specific pattern wins.
+        """
+        if self._trie is None:
+            trie = DomainTrie()
+            for d in list(self.domains) + list(self.include):
+                trie.add(d, True)
+            for d in self.exclude:
+                trie.add(d, False)
+            self._trie = trie
+        return self._trie
+
     def in_scope_domain(self, host: str) -> bool:
-        host = host.lower().strip(".")
-        return any(host == d or host.endswith("." + d) for d in self.domains)
+        return self.matcher().match(host) is True
+
+    def filter_hosts(self, hosts: Iterable[str]) -> Iterator[str]:
+        """Yield the in-scope names of `hosts`, normalised (lowercase, no trailing dot)."""
+        match_labels = self.matcher().match_labels
+        for host in hosts:
+            h = host.strip().lower().strip(".")
+            if h and match_labels(h.split(".")[::-1]) is True:
+                yield h
 
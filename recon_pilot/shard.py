@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import json
+import logging
+import os
+import re
+import time
+import zlib
+
+from .inventory import HostList, Inventory
+from .modules.dns_planner import WildcardProfile
+from .utils import find_artifact, iter_artifact, write_artifact, write_json
+
+# written into every shard directory: which slice it holds, the scope it ran with, when it
+# started, the CT status of each domain it pulled so far ("ct", read by the other shards)
+# and whether it finished ("complete", set last)
+SHARD_FILE = "shard.json"
+# seconds a shard waits for another shard's CT before pulling the domain itself; shards
+# of one set must start within this long of each other
+SHARD_WAIT = float(os.getenv("RECON_SHARD_WAIT", "3600"))
+# statuses that say something about a name (a shard that timed out loses to one that knows)
+_DEFINITE = ("NOERROR", "NXDOMAIN", "NOANSWER")
+
+
+@dataclass
+class Shard:
+    """
+    `--shard i/N` (i = 1..N): this process pulls CT for the scope domains with
+    crc32(domain) % N == i - 1 and reads the other domains' CT from the shards that own
+    them, so every domain's CT is fetched once across the set. It resolves the hosts
+    with crc32(host) % N == i - 1, so even a single large domain is split N ways.
+    """
+    index: int
+    count: int
+
+    @staticmethod
+    def parse(spec: str) -> "Shard":
+        m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec or "")
+        if not m:
+            raise ValueError(f"expected i/N (e.g. 2/8), got {spec!r}")
+        shard = Shard(int(m.group(1)), int(m.group(2)))
+        if shard.count < 1 or not 1 <= shard.index <= shard.count:
+            raise ValueError(f"shard {shard} out of range: i must be 1..N")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}of{self.count}"
+
+    def owner(self, name: str) -> int:
+        """The shard (1..N) that owns `name`."""
+        return zlib.crc32(name.strip().lower().strip(".").encode("utf-8")) % self.count + 1
+
+    def owns(self, name: str) -> bool:
+        return self.owner(name) == self.index
+
+    def domains(self, scope_domains: Iterable[str]) -> List[str]:
+        """The scope domains this shard pulls CT for."""
+        return [d for d in scope_domains if self.owns(d)]
+
+    def filter(self, hosts: Iterable[str]) -> List[str]:
+        """The hosts this shard resolves."""
+        return [h for h in hosts if self.owns(h)]
+
+
+def _write_marker(run_dir: Path, marker: dict) -> None:
+    # other shards poll the marker: replace it whole, never let them read half of it
+    tmp = run_dir / f".{SHARD_FILE}.tmp"
+    write_json(tmp, marker)
+    os.replace(tmp, run_dir / SHARD_FILE)
+
+
+def write_marker(run_dir: Path, shard: Shard, scope: dict) -> None:
+    """A new shard directory: nothing pulled, not complete."""
+    _write_marker(run_dir, {
+        "shard": shard.index, "of": shard.count, "scope": scope, "started": time.time(), "ct": {}, "complete": False,
+    })
+
+
+def update_marker(run_dir: Path, ct: Optional[Tuple[str, str]] = None, complete: bool = False) -> None:
+    """Publish one pulled domain's CT status (its ct_ artifact is written already), or completion."""
+    marker = read_marker(run_dir) or {}
+    if ct is not None:
+        marker.setdefault("ct", {})[ct[0]] = ct[1]
+    if complete:
+        marker["complete"] = True
+    _write_marker(run_dir, marker)
+
+
+def read_marker(run_dir: Path) -> Optional[dict]:
+    try:
+        with open(run_dir / SHARD_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def owner_ct(out: Path, shard: Shard, scope: dict, domain: str, since: float) -> Optional[Tuple[List[str], str]]:
+    """
+    (in-scope hosts, status) of `domain` as published by its owner: the newest shard
+    directory under `out` of the same split and scope that started after `since` and has
+    pulled the domain. None while there is none yet.
+    """
+    owner = shard.owner(domain)
+    best: Optional[Tuple[float, Path, str]] = None
+    for d in out.glob("shard-*"):
+        m = read_marker(d)
+        if not m or m.get("shard") != owner or m.get("of") != shard.count or m.get("scope") != scope:
+            continue
+        status = (m.get("ct") or {}).get(domain)
+        started = m.get("started") or 0
+        if status is not None and started >= since and (best is None or started > best[0]):
+            best = (started, d, status)
+    if best is None:
+        return None
+    path = find_artifact(best[1] / "artifacts", f"ct_{domain}")
+    return ([str(h) for h in iter_artifact(path)] if path is not None else []), best[2]
+
+
+def _items(artifacts: Path, stem: str) -> Iterable:
+    path = find_artifact(artifacts, stem)
+    return iter_artifact(path) if path is not None else ()
+
+
+@dataclass
+class Merged:
+    """What `recon merge` needs after the artifacts are combined."""
+    scope: dict
+    hosts: HostList
+    inventory: Inventory
+    dns_issues: List[dict]
+    wildcard_hosts: List[str]
+    wildcards: Dict[str, WildcardProfile]
+    queries: int
+
+
+def check_shards(shard_dirs: List[Path]) -> List[dict]:
+    """
+    Markers of `shard_dirs`, in shard order; raises ValueError unless they are one
+    complete set (same N, every i once, every shard finished, same scope).
+    """
+    markers = []
+    for d in shard_dirs:
+        m = read_marker(d)
+        if m is None:
+            raise ValueError(f"{d}: no {SHARD_FILE} (not a --shard run)")
+        markers.append(dict(m, dir=d))
+    counts = {m["of"] for m in markers}
+    if len(counts) != 1:
+        raise ValueError(f"shards come from different splits (N = {', '.join(map(str, sorted(counts)))})")
+    n = counts.pop()
+    have = sorted(m["shard"] for m in markers)
+    if have != list(range(1, n + 1)):
+        missing = sorted(set(range(1, n + 1)) - set(have))
+        dup = sorted({i for i in have if have.count(i) > 1})
+        raise ValueError(
+            f"need shards 1..{n} once each"
+            + (f"; missing {', '.join(map(str, missing))}" if missing else "")
+            + (f"; duplicate {', '.join(map(str, dup))}" if dup else "")
+        )
+    # artifacts are written as a shard goes, so a shard that died mid-run still has some
+    unfinished = [m for m in markers if not m.get("complete")]
+    if unfinished:
+        raise ValueError(
+            "shard(s) did not finish: "
+            + ", ".join(f"{m['shard']}/{n} ({m['dir']})" for m in sorted(unfinished, key=lambda m: m["shard"]))
+            + "; finish them with `recon run --resume DIR`"
+        )
+    no_records = [m for m in markers if find_artifact(m["dir"] / "artifacts", "dns_records") is None]
+    if no_records:
+        raise ValueError(
+            "shard(s) without dns_records: " + ", ".join(str(m["dir"]) for m in no_records)
+        )
+    if any(m["scope"] != markers[0]["scope"] for m in markers):
+        logging.warning("Merge: shards were run with different scopes; using the first one.")
+    return sorted(markers, key=lambda m: m["shard"])
+
+
+def merge_shards(shard_dirs: List[Path], artifacts_dir: Path, fmt: str = "json", compress: str = "none") -> Merged:
+    """
+    Combine the artifacts of a complete shard set into `artifacts_dir`: host lists are
+    unioned and sorted, DNS records re-sorted by host, per-host lists concatenated.
+    """
+    markers = check_shards(shard_dirs)
+    dirs = [m["dir"] / "artifacts" for m in markers]
+
+    def _write(stem: str, items) -> None:
+        write_artifact(artifacts_dir, stem, items, fmt, compress)
+
+    # ct_<domain>: written by the shard owning the domain
+    for base in markers[0]["scope"].get("domains") or []:
+        stem = f"ct_{base}"
+        if any(find_artifact(a, stem) is not None for a in dirs):
+            _write(stem, sorted({str(h) for a in dirs for h in _items(a, stem)}))
+
+    seeds: Set[str] = set()
+    wildcard_hosts: Set[str] = set()
+    for a in dirs:
+        seeds.update(_items(a, "seed_hosts"))
+        wildcard_hosts.update(_items(a, "wildcard_hosts"))
+    _write("seed_hosts", sorted(seeds))
+    hosts = HostList(h for a in dirs for h in _items(a, "inventory_hosts"))
+    _write("inventory_hosts", hosts)
+
+    inventory = Inventory()
+    for a in dirs:
+        for item in _items(a, "dns_records"):
+            inventory.add(item)
+    inventory.sort()
+    _write("dns_records", inventory)
+
+    dns_issues = sorted((i for a in dirs for i in _items(a, "dns_issues")), key=lambda i: i["host"])
+    _write("dns_issues", dns_issues)
+    _write("dns_failures", sorted((i for a in dirs for i in _items(a, "dns_failures")), key=lambda i: i["host"]))
+    if wildcard_hosts:
+        _write("wildcard_hosts", sorted(wildcard_hosts))
+
+    # --cname-check: one entry per target, referring hosts unioned
+    targets: Dict[str, dict] = {}
+    for a in dirs:
+        for t in _items(a, "cname_targets"):
+            have = targets.setdefault(t["target"], {"target": t["target"], "status": t["status"], "hosts": []})
+            have["hosts"].extend(t["hosts"])
+            if have["status"] not in _DEFINITE and t["status"] in _DEFINITE:
+                have["status"] = t["status"]
+    if targets:
+        _write("cname_targets", [dict(t, hosts=sorted(set(t["hosts"]))) for _, t in sorted(targets.items())])
+
+    # every shard probed every scope domain; a zone's fingerprint is what any of them saw
+    wildcards: Dict[str, WildcardProfile] = {}
+    for a in dirs:
+        for z in _items(a, "wildcard_zones"):
+            p = wildcards.setdefault(z["base"], WildcardProfile(z["base"]))
+            p.a.update(z.get("a") or [])
+            p.aaaa.update(z.get("aaaa") or [])
+            p.cname.update(z.get("cname") or [])
+    if wildcards:
+        _write("wildcard_zones", zones_artifact(wildcards))
+
+    queries = 0
+    for a in dirs:
+        try:
+            with open(a / "metrics.json", "r", encoding="utf-8") as f:
+                gauges = json.load(f).get("gauges", {})
+            queries += int(sum(g["value"] for g in gauges.get("dns_lookups_total", [])))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    return Merged(
+        scope=markers[0]["scope"],
+        hosts=hosts,
+        inventory=inventory,
+        dns_issues=dns_issues,
+        wildcard_hosts=sorted(wildcard_hosts),
+        wildcards=wildcards,
+        queries=queries,
+    )
+
+
+def zones_artifact(wildcards: Dict[str, WildcardProfile]) -> List[dict]:
+    """wildcard_zones items: the fingerprint of each wildcard zone (what merge reads back)."""
+    return [
+        {"base": base, "a": sorted(p.a), "aaaa": sorted(p.aaaa), "cname": sorted(p.cname)}
+        for base, p in sorted(wildcards.items())
+    ]
@@ -1,6 +1,16 @@
+import codecs
+import gzip
 import hashlib
+import heapq
+import io
+import tempfile
 from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, List, Optional, Union
 import json
+import os
+
+# characters per read when streaming artifacts
+CHUNK = 64 * 1024
 
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
@@ -11,5 +21,207 @@ def write_json(path: Path, obj) -> None:
         json.dump(obj, f, indent=2, sort_keys=True)
 
 def read_json(path: Path):
-    with open(path, "r", encoding="utf-8") as f:
+    """Load a JSON artifact; NDJSON and compressed artifacts come back as a list."""
+    if ".ndjson" in path.suffixes:
+        return list(iter_artifact(path))
+    with open_text(path, "r") as f:
         return json.load(f)
+
+def cache_dir() -> Path:
+    """
+    Per-user cache directory shared across runs.
+    Override with RECON_CACHE_DIR; otherwise $XDG_CACHE_HOME/recon-pilot (~/.cache/recon-pilot).
+    """
+    override = os.getenv("RECON_CACHE_DIR")
+    if override:
+        return Path(override).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "recon-pilot"
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    """
+    Incrementally parse a top-level JSON array of objects/strings from a stream of chunks
+    (e.g. requests' iter_content), yielding each element as soon as it is complete.
+    Only one element is buffered at a time. Raises ValueError if the stream is not
+    an array or ends before the closing bracket.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, pos, started = "", 0, False
+    for chunk in chunks:
+        buf = buf[pos:] + (text.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        pos = 0
+        n = len(buf)
+        while True:
+            while pos < n and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= n:
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("stream is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element split across chunks; wait for more data
+            yield obj
+    raise ValueError("JSON array ended early")
+
+def external_sort(lines: Iterable[str], chunk_size: int = 1_000_000, unique: bool = False) -> Iterator[str]:
+    """
+    Sort newline-free strings with bounded memory: sorted runs of `chunk_size`
+    items spill to temporary files and are merged lazily. With `unique`,
+    duplicates are dropped. Small inputs never touch the disk.
+    """
+    runs: List[IO[str]] = []
+    chunk: List[str] = []
+
+    def _spill() -> None:
+        f = tempfile.TemporaryFile("w+", encoding="utf-8")
+        f.writelines(s + "\n" for s in sorted(set(chunk) if unique else chunk))
+        f.seek(0)
+        runs.append(f)
+        chunk.clear()
+
+    for s in lines:
+        chunk.append(s)
+        if len(chunk) >= chunk_size:
+            _spill()
+    if not runs:
+        merged: Iterator[str] = iter(sorted(set(chunk) if unique else chunk))
+    else:
+        if chunk:
+            _spill()
+        merged = heapq.merge(*((s[:-1] for s in f) for f in runs))
+    try:
+        prev = None
+        for s in merged:
+            if unique and s == prev:
+                continue
+            prev = s
+            yield s
+    finally:
+        for f in runs:
+            f.close()
+
+# --- artifacts: JSON (default) or NDJSON, optionally compressed ---
+
+ARTIFACT_FORMATS = ("json", "ndjson")
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def open_text(path: Path, mode: str = "r") -> IO[str]:
+    """Open a text file, (de)compressing transparently by suffix: .gz (gzip) or .zst (zstandard)."""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd artifacts need the 'zstandard' package (pip install zstandard)")
+        if "r" in mode:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        else:
+            raw = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def artifact_path(artifacts_dir: Path, stem: str, fmt: str = "json", compress: str = "none") -> Path:
+    return artifacts_dir / f"{stem}.{fmt}{COMPRESSIONS[compress]}"
+
+
+def find_artifact(artifacts_dir: Path, stem: str) -> Optional[Path]:
+    """The artifact `stem` in whichever format/compression the run wrote it, or None."""
+    for fmt in ARTIFACT_FORMATS:
+        for ext in COMPRESSIONS.values():
+            p = artifacts_dir / f"{stem}.{fmt}{ext}"
+            if p.exists():
+                return p
+    return None
+
+
+class NdjsonWriter:
+    """Append one compact JSON record per line as results arrive (context manager)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._f = open_text(path, "w")
+        self.count = 0
+
+    def write(self, obj) -> None:
+        self._f.write(json.dumps(obj, sort_keys=True, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "NdjsonWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_artifact(artifacts_dir: Path, stem: str, items: Iterable, fmt: str = "json", compress: str = "none") -> Path:
+    """Write a list artifact in the run's format, streamed item by item (no list is built)."""
+    path = artifact_path(artifacts_dir, stem, fmt, compress)
+    if fmt == "ndjson":
+        with NdjsonWriter(path) as w:
+            for item in items:
+                w.write(item)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open_text(path, "w") as f:
+            dump_json_array(f, items)
+    return path
+
+
+def dump_json_array(f: IO[str], items: Iterable) -> None:
+    """
+    Same text as json.dump(list(items), f, indent=2, sort_keys=True), written one item
+    at a time so the list never has to exist in memory.
+    """
+    first = True
+    for item in items:
+        f.write("[\n  " if first else ",\n  ")
+        f.write(json.dumps(item, indent=2, sort_keys=True).replace("\n", "\n  "))
+        first = False
+    f.write("[]" if first else "\n]")
+
+
+def iter_artifact(path: Path) -> Iterator[Any]:
+    """
+    Stream the records of a list artifact (NDJSON or a JSON array, any compression)
+    without loading it whole. A JSON object with a 'hosts'/'items' list yields that list.
+    """
+    with open_text(path, "r") as f:
+        if ".ndjson" in path.suffixes:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        head = f.read(CHUNK)
+        if head.lstrip().startswith("{"):
+            data = json.loads(head + f.read())
+            for k in ("hosts", "items"):
+                if isinstance(data.get(k), list):
+                    yield from data[k]
+                    return
+            return
+
+        def _chunks() -> Iterator[str]:
+            yield head
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+        yield from iter_json_array(_chunks())
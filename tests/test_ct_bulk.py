@@ -0,0 +1,31 @@
+import json
+
+from recon_pilot.modules.ct_sources import BulkFileSource
+
+
+def _source(tmp_path, names):
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text("".join(json.dumps({"name_value": n}) + "\n" for n in names), encoding="utf-8")
+    return BulkFileSource([dump], index_dir=tmp_path / "idx")
+
+
+def test_lookup_many_sibling_domains(tmp_path):
+    # "com.example-x." sorts before "com.example." ('-' < '.'), but after it by bare label
+    src = _source(tmp_path, ["a.example.com", "b.example.com", "a.example-x.com", "b.example-x.com"])
+    try:
+        many = src.lookup_many(["example.com", "example-x.com"])
+        assert many["example-x.com"] == src.names("example-x.com") == ["a.example-x.com", "b.example-x.com"]
+        assert many["example.com"] == src.names("example.com") == ["a.example.com", "b.example.com"]
+    finally:
+        src.close()
+
+
+def test_lookup_many_nested_domains(tmp_path):
+    src = _source(tmp_path, ["www.example.com", "x.dev.example.com", "other.org"])
+    try:
+        many = src.lookup_many(["dev.example.com", "example.com", "other.org"])
+        assert many["example.com"] == ["www.example.com", "x.dev.example.com"]
+        assert many["dev.example.com"] == ["x.dev.example.com"]
+        assert many["other.org"] == []  # only names under it, not the apex
+    finally:
+        src.close()
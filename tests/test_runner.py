@@ -0,0 +1,79 @@
+from typing import Dict, List
+
+from recon_pilot.journal import Journal, JournalState
+from recon_pilot.modules.ct_sources import CTSource
+from recon_pilot.pipeline import HostFeed
+from recon_pilot.rule_engine import RuleEngine
+from recon_pilot.runner import RunOptions, RunState, ct_phase
+from recon_pilot.scope import Scope
+from recon_pilot.shard import Shard, read_marker, write_marker
+
+DOMAINS = ["a.test", "b.test", "c.test"]
+
+
+class _Source(CTSource):
+    """Canned CT names; a domain mapped to None fails."""
+
+    def __init__(self, names: Dict[str, List[str]]):
+        self._names = names
+        self.fetched: List[str] = []
+
+    def names(self, domain: str) -> List[str]:
+        self.fetched.append(domain)
+        if self._names.get(domain) is None:
+            raise ValueError("bad response")
+        return self._names[domain]
+
+
+def _state(tmp_path, **kw) -> RunState:
+    scope = Scope(org="t", domains=list(DOMAINS))
+    run_dir = tmp_path / "run"
+    (run_dir / "artifacts").mkdir(parents=True)
+    return RunState(
+        scope=scope, opts=RunOptions(), run_dir=run_dir, out=tmp_path,
+        engine=RuleEngine({"findings": {}}, scope.domains), record_types=("A",), **kw,
+    )
+
+
+def _names(n: int = 20) -> Dict[str, List[str]]:
+    return {d: [f"h{i}.{d}" for i in range(n)] + ["out.of.scope.org"] for d in DOMAINS}
+
+
+def test_resume_skips_journaled_ct_and_refetches_failures(tmp_path):
+    names = _names()
+    names["b.test"] = None
+    resumed = JournalState(ct={"a.test": ["h0.a.test"]})
+    st = _state(tmp_path, resumed=resumed)
+    st.journal = Journal(st.run_dir)
+    ct_phase(st, _Source(names))
+    st.journal.close()
+
+    assert sorted(st.hosts) == ["h0.a.test"] + sorted(names["c.test"][:-1])
+    # a.test came from the journal and is not written again; failed b.test is not done
+    assert set(Journal.load(st.run_dir).ct) == {"c.test"}
+
+
+def test_shard_pulls_own_domains_and_keeps_its_hosts(tmp_path):
+    shard = Shard(1, 2)
+    st = _state(tmp_path, shard=shard)
+    write_marker(st.run_dir, shard, st.scope.to_dict())
+    own = shard.domains(DOMAINS)
+    # the other domains are already covered by the journal: no waiting on the other shard
+    st.resumed = JournalState(ct={d: [f"x.{d}"] for d in DOMAINS if d not in own})
+    source = _Source(_names())
+    ct_phase(st, source)
+
+    assert sorted(source.fetched) == sorted(own)
+    assert read_marker(st.run_dir)["ct"] == {d: "ok" for d in own}
+    found = [h for d in own for h in _names()[d][:-1]] + [f"x.{d}" for d in DOMAINS if d not in own]
+    assert sorted(st.hosts) == sorted(shard.filter(found))
+
+
+def test_pipeline_feeds_hosts_instead_of_collecting_them(tmp_path):
+    st = _state(tmp_path)
+    st.feed = HostFeed()
+    ct_phase(st, _Source(_names(5)))
+    st.feed.close()
+
+    assert not st.hosts
+    assert st.feed.count == 5 * len(DOMAINS)